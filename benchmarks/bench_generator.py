@@ -0,0 +1,276 @@
+"""
+Benchmarks du générateur de CV
+Mesure le coût du parsing d'export LinkedIn, du rendu et de l'écriture selon
+la taille du profil et le template, avec des profils synthétiques
+
+Usage:
+    python benchmarks/bench_generator.py --sizes mock,medium,large --output bench.json
+    python benchmarks/bench_generator.py --compare bench_reference.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from linkedin_cv_generator import TEMPLATES, LinkedInCVGenerator, Profile  # noqa: E402
+
+# Tailles de profil: de l'échantillon de generate_from_mock_data à des profils extrêmes
+SIZES = {
+    'mock': {'experiences': 3, 'education': 2, 'skills': 12, 'hobbies': 3},
+    'medium': {'experiences': 20, 'education': 5, 'skills': 100, 'hobbies': 10},
+    'large': {'experiences': 200, 'education': 20, 'skills': 2000, 'hobbies': 50},
+    'huge': {'experiences': 500, 'education': 50, 'skills': 5000, 'hobbies': 100}
+}
+
+TEMPLATE_CHOICES = ['1', '2', '3', '4']
+
+_WORDS = ('données analyse modèle production équipe client plateforme déploiement qualité '
+          'automatisation supervision conception développement migration sécurité performance').split()
+_MONTHS_FR = ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet', 'Août',
+              'Septembre', 'Octobre', 'Novembre', 'Décembre']
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def synthetic_profile(experiences: int = 3, education: int = 2, skills: int = 12, hobbies: int = 3,
+                      seed: int = 0) -> Dict:
+    """
+    Génère un profil au format attendu par les templates
+
+    Returns:
+        Dictionnaire structuré pour le template, comme generate_from_mock_data
+    """
+    rng = random.Random(seed)
+    data = {
+        'personal_info': {
+            'name': f'Candidat {seed}',
+            'headline': _sentence(rng, 6),
+            'location': 'Paris, Île-de-France, France',
+            'email': f'candidat{seed}@example.com',
+            'phone': '+33 6 12 34 56 78',
+            'linkedin_url': f'linkedin.com/in/candidat-{seed}',
+            'summary': _sentence(rng, 40),
+            'photo': ''
+        },
+        'experiences': [],
+        'education': [],
+        'skills': [],
+        'hobbies': [f'Hobby {i}' for i in range(hobbies)],
+        'generated_date': datetime.now().strftime('%d/%m/%Y')
+    }
+    for i in range(experiences):
+        year = 2024 - i
+        data['experiences'].append({
+            'title': f'Poste {i}',
+            'company': f'Entreprise {rng.randint(1, 999)}',
+            'location': 'Lyon, France',
+            'start_date': f'{rng.choice(_MONTHS_FR)} {year - 1}',
+            'end_date': 'Présent' if i == 0 else f'{rng.choice(_MONTHS_FR)} {year}',
+            'description': _sentence(rng, 30),
+            'is_current': i == 0
+        })
+    for i in range(education):
+        data['education'].append({
+            'school': f'École {i}',
+            'degree': 'Master',
+            'field': _sentence(rng, 3),
+            'start_date': str(2010 - 2 * i),
+            'end_date': str(2012 - 2 * i),
+            'description': _sentence(rng, 10)
+        })
+    for i in range(skills):
+        data['skills'].append({'name': f'Compétence {i}', 'endorsements': rng.randint(0, 99)})
+    return data
+
+
+def write_synthetic_export(directory: str, experiences: int = 3, education: int = 2, skills: int = 12,
+                           as_zip: bool = False, seed: int = 0) -> str:
+    """
+    Écrit un faux export LinkedIn (Profile, Positions, Education, Skills)
+
+    Returns:
+        Chemin du dossier d'export, ou de l'archive ZIP si as_zip
+    """
+    rng = random.Random(seed)
+    tables = {
+        'Profile.csv': (['First Name', 'Last Name', 'Headline', 'Summary', 'Location', 'Email Address',
+                         'Public Profile URL'],
+                        [['Candidat', str(seed), _sentence(rng, 6), _sentence(rng, 40), 'Paris',
+                          f'candidat{seed}@example.com', f'https://www.linkedin.com/in/candidat-{seed}']]),
+        'Positions.csv': (['Company Name', 'Title', 'Description', 'Location', 'Started On', 'Finished On'],
+                          [[f'Entreprise {i}', f'Poste {i}', _sentence(rng, 30), 'Lyon',
+                            f'{2023 - i}-{rng.randint(1, 12):02d}', '' if i == 0 else f'{2024 - i}-{rng.randint(1, 12):02d}']
+                           for i in range(experiences)]),
+        'Education.csv': (['School Name', 'Start Date', 'End Date', 'Notes', 'Degree Name', 'Activities'],
+                          [[f'École {i}', str(2010 - 2 * i), str(2012 - 2 * i), 'Informatique', 'Master', '']
+                           for i in range(education)]),
+        'Skills.csv': (['Name'], [[f'Compétence {i}'] for i in range(skills)])
+    }
+    export_dir = os.path.join(directory, f'export_{seed}')
+    os.makedirs(export_dir, exist_ok=True)
+    for name, (header, rows) in tables.items():
+        with open(os.path.join(export_dir, name), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    if not as_zip:
+        return export_dir
+    zip_path = export_dir + '.zip'
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in tables:
+            archive.write(os.path.join(export_dir, name), f'Basic_LinkedInDataExport_{seed}/{name}')
+    return zip_path
+
+
+def _time(func: Callable[[], object], repeat: int) -> Dict:
+    """Exécute func repeat fois et renvoie les statistiques en millisecondes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'repeat': repeat,
+        'mean_ms': statistics.fmean(timings),
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings)
+    }
+
+
+def run_benchmarks(sizes: List[str], repeat: int = 5, batch_jobs: int = 200, workers: Optional[int] = None,
+                   template_dir: str = TEMPLATES) -> Dict:
+    """
+    Lance les benchmarks pour chaque taille de profil
+
+    Returns:
+        Rapport JSON: métadonnées de l'environnement et une entrée par mesure
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            spec = SIZES[size]
+            raw_profile = synthetic_profile(**spec)
+            results.append({'size': size, 'stage': 'normalize_profile', 'template': None,
+                            **_time(lambda: Profile.from_dict(raw_profile), repeat)})
+            # Les points d'entrée produisent des profils normalisés: le rendu est mesuré sur ce format
+            profile = Profile.from_dict(raw_profile)
+            export_dir = write_synthetic_export(tmp, spec['experiences'], spec['education'], spec['skills'])
+            export_zip = write_synthetic_export(tmp, spec['experiences'], spec['education'], spec['skills'],
+                                                as_zip=True, seed=1)
+
+            generator = LinkedInCVGenerator(template_dir=template_dir)
+            for label, path in (('parse_export_dir', export_dir), ('parse_export_zip', export_zip)):
+                results.append({'size': size, 'stage': label, 'template': None,
+                                **_time(lambda: generator.parse_linkedin_export(path), repeat)})
+
+            for choix in TEMPLATE_CHOICES:
+                output = os.path.join(tmp, f'cv_{size}_{choix}.html')
+                # Générateur sans cache de fragments: coût d'un rendu complet
+                cold = LinkedInCVGenerator(template_dir=template_dir, fragment_cache_size=0)
+                cold.generate_cv(choix, profile, output)
+                results.append({'size': size, 'stage': 'generate_cv', 'template': choix,
+                                'bytes': os.path.getsize(output),
+                                **_time(lambda: cold.generate_cv(choix, profile, output), repeat)})
+                generator.generate_cv(choix, profile, output)
+                results.append({'size': size, 'stage': 'generate_cv_cached', 'template': choix,
+                                **_time(lambda: generator.generate_cv(choix, profile, output), repeat)})
+
+            jobs = [(TEMPLATE_CHOICES[i % 4], profile, os.path.join(tmp, f'batch_{i}.html'))
+                    for i in range(batch_jobs)]
+            start = time.perf_counter()
+            failed = sum(not r['ok'] for r in generator.render_many(jobs, workers=workers, ordered=False))
+            elapsed = time.perf_counter() - start
+            results.append({'size': size, 'stage': 'render_many', 'template': None, 'jobs': batch_jobs,
+                            'failed': failed, 'seconds': elapsed, 'cv_per_second': batch_jobs / elapsed})
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(report: Dict, reference: Dict, threshold: float = 0.2) -> List[str]:
+    """
+    Compare deux rapports et liste les mesures plus lentes de plus de threshold (20% par défaut)
+    """
+    def key(entry):
+        return entry['size'], entry['stage'], entry['template']
+
+    previous = {key(entry): entry for entry in reference['results']}
+    regressions = []
+    for entry in report['results']:
+        old = previous.get(key(entry))
+        if old is None:
+            continue
+        if 'median_ms' in entry and 'median_ms' in old and entry['median_ms'] > old['median_ms'] * (1 + threshold):
+            regressions.append(f"{entry['size']}/{entry['stage']}/{entry['template']}: "
+                               f"{old['median_ms']:.2f} ms -> {entry['median_ms']:.2f} ms")
+        if 'cv_per_second' in entry and 'cv_per_second' in old \
+                and entry['cv_per_second'] < old['cv_per_second'] / (1 + threshold):
+            regressions.append(f"{entry['size']}/{entry['stage']}: "
+                               f"{old['cv_per_second']:.0f} CV/s -> {entry['cv_per_second']:.0f} CV/s")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du générateur de CV")
+    parser.add_argument('--sizes', default='mock,medium,large',
+                        help=f"Tailles de profil séparées par des virgules ({', '.join(SIZES)})")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de répétitions par mesure")
+    parser.add_argument('--batch-jobs', type=int, default=200, help="Nombre de CV du lot de render_many")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='bench_results.json', help="Fichier JSON des résultats")
+    parser.add_argument('--compare', default=None, help="Rapport de référence pour détecter les régressions")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Tolérance de régression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Tailles inconnues: {', '.join(unknown)}")
+
+    report = run_benchmarks(sizes, repeat=args.repeat, batch_jobs=args.batch_jobs, workers=args.workers)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for entry in report['results']:
+        if 'median_ms' in entry:
+            template = f" template {entry['template']}" if entry['template'] else ''
+            print(f"⏱️  {entry['size']:<7} {entry['stage']}{template}: {entry['median_ms']:.2f} ms")
+        else:
+            print(f"🚀 {entry['size']:<7} {entry['stage']}: {entry['cv_per_second']:.0f} CV/s")
+    print(f"\n✅ Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"❌ Régression: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
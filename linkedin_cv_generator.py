@@ -3,48 +3,2462 @@ LinkedIn CV Generator
 Génère un CV élégant à partir de vos données LinkedIn
 """
 
+import copy
+import hashlib
+import heapq
+import io
 import os
+import queue
+import re
+import sys
+import time
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, List, Optional
-from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache, partial
+from typing import IO, TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import json
 
+# Jinja2, les pools de workers, zipfile, gzip... sont importés à leur premier
+# usage: --help, validate ou un CV déjà à jour démarrent sans les charger
+if TYPE_CHECKING:
+    import socket
+    import zipfile
+    from jinja2 import Environment
+
 ROOT = os.path.dirname(__file__)
 TEMPLATES = os.path.join(ROOT, 'templates')
 OUTPUTS = os.path.join(ROOT, 'outputs')
 DATA = os.path.join(ROOT, 'data')
+MANIFEST = os.path.join(OUTPUTS, '.build_manifest.json')
+FONTS = os.path.join(ROOT, 'assets', 'fonts')
+PHOTO_CACHE = os.path.join(ROOT, '.cache', 'photos')
+PROFILE_DB = os.path.join(DATA, 'profiles.db')
+
+TEMPLATE_TITLES = {
+    '1': "Design épuré et moderne",
+    '2': "Minimal brutaliste, typographie géométrique, noir/blanc/bleu électrique",
+    '3': "Moderne premium, gradients subtils, vert émeraude/gris anthracite",
+    '4': "Layout asymétrique, serif élégant, bordeaux/beige/or"
+}
+
+GOOGLE_FONTS_URL = re.compile(r'https://fonts\.googleapis\.com/css2\?([^"\']+)')
+FONT_FORMATS = {
+    '.woff2': ('font/woff2', 'woff2'),
+    '.woff': ('font/woff', 'woff'),
+    '.ttf': ('font/ttf', 'truetype'),
+    '.otf': ('font/otf', 'opentype')
+}
+
+# Générateur "chaud" propre à chaque worker du rendu par lots
+_worker_state = threading.local()
+
+
+def _executor_class(executor: str):
+    """Classe de pool de workers pour executor ('process' ou 'thread')"""
+    if executor == 'process':
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor
+    if executor == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor
+    raise ValueError(f"Exécuteur inconnu: {executor!r} (attendu: 'process' ou 'thread')")
+
+
+def _is_socket(value) -> bool:
+    """isinstance(value, socket.socket) sans importer socket (déjà chargé s'il y a une socket)"""
+    socket = sys.modules.get('socket')
+    return socket is not None and isinstance(value, socket.socket)
+
+
+def _json_default(value):
+    """Sérialise les objets du modèle de profil pour json.dumps"""
+    to_dict = getattr(value, 'to_dict', None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+def _content_hash(value) -> str:
+    """Hash stable du contenu d'une structure JSON (indépendant de l'ordre des clés)"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Modèle de profil
+# ---------------------------------------------------------------------------
+
+MONTHS = {
+    'fr': ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+           'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'],
+    'en': ['January', 'February', 'March', 'April', 'May', 'June',
+           'July', 'August', 'September', 'October', 'November', 'December']
+}
+PRESENT = {'fr': 'Présent', 'en': 'Present'}
+
+
+def _strip_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+
+
+# Noms de mois reconnus (sans accents, en minuscules): complets et abrégés, français et anglais
+_MONTH_NUMBERS = {}
+for _names in MONTHS.values():
+    for _number, _name in enumerate(_names, start=1):
+        _key = _strip_accents(_name).lower()
+        _MONTH_NUMBERS[_key] = _number
+        _MONTH_NUMBERS.setdefault(_key[:3], _number)
+        _MONTH_NUMBERS.setdefault(_key[:4], _number)
+_MONTH_NUMBERS['juil'] = 7
+_PRESENT_WORDS = {'present', 'aujourd\'hui', 'en cours', 'actuel', 'now', 'current', 'today'}
+
+
+@lru_cache(maxsize=4096)
+def parse_profile_date(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Convertit une date de profil en valeur triable (année, mois), mois à 0 si inconnu
+
+    Formats acceptés: 2020-03-15, 2020-03, 2020, 03/2020, "Mars 2020", "Mar 2020"
+
+    Returns:
+        (année, mois) ou None si la date est vide ou illisible
+    """
+    if not value:
+        return None
+    text = value.strip()
+    match = re.fullmatch(r'(\d{4})(?:-(\d{1,2}))?(?:-\d{1,2})?', text)
+    if match:
+        return int(match.group(1)), int(match.group(2) or 0)
+    match = re.fullmatch(r'(\d{1,2})/(\d{4})', text)
+    if match:
+        return int(match.group(2)), int(match.group(1))
+    match = re.fullmatch(r'([^\W\d]+)\.?\s+(\d{4})', text)
+    if match:
+        month = _MONTH_NUMBERS.get(_strip_accents(match.group(1)).lower())
+        if month:
+            return int(match.group(2)), month
+    return None
+
+
+@lru_cache(maxsize=4096)
+def format_profile_date(value: Optional[Tuple[int, int]], locale: str = 'fr') -> str:
+    """Date d'affichage ("Mars 2020" ou "2020"), mémorisée par langue"""
+    if value is None:
+        return ''
+    year, month = value
+    if not month:
+        return str(year)
+    return f"{MONTHS[locale][month - 1]} {year}"
+
+
+def _is_present(value: Optional[str]) -> bool:
+    return bool(value) and _strip_accents(value.strip()).lower() in _PRESENT_WORDS
+
+
+class _Record:
+    """
+    Base des objets du modèle: attributs en __slots__, accès aussi par clé
+    (record['name'], 'name' in record) pour rester compatible avec les dictionnaires
+    """
+
+    __slots__ = ()
+    # Champs exportés par to_dict (les champs dérivés ne sont pas sérialisés)
+    FIELDS = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> Dict:
+        return {field: _to_plain(getattr(self, field)) for field in self.FIELDS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _to_plain(value):
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+class PersonalInfo(_Record):
+    __slots__ = ('name', 'headline', 'email', 'phone', 'location', 'linkedin_url', 'summary', 'photo')
+    FIELDS = __slots__
+
+    def __init__(self, name: str = '', headline: str = '', email: str = '', phone: str = '', location: str = '',
+                 linkedin_url: str = '', summary: str = '', photo: str = ''):
+        self.name = name
+        self.headline = headline
+        self.email = email
+        self.phone = phone
+        self.location = location
+        self.linkedin_url = linkedin_url
+        self.summary = summary
+        self.photo = photo
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PersonalInfo':
+        return cls(**{field: data.get(field) or '' for field in cls.FIELDS})
+
+
+class Experience(_Record):
+    """Expérience: dates triables (start, end) et chaînes d'affichage précalculées"""
+
+    __slots__ = ('title', 'company', 'location', 'start_date', 'end_date', 'description', 'is_current',
+                 'start', 'end')
+    FIELDS = ('title', 'company', 'location', 'start_date', 'end_date', 'is_current', 'description')
+
+    def __init__(self, title: str = '', company: str = '', location: str = '', start: Optional[Tuple[int, int]] = None,
+                 end: Optional[Tuple[int, int]] = None, description: str = '', is_current: bool = False,
+                 start_date: str = '', end_date: str = '', locale: str = 'fr'):
+        self.title = title
+        self.company = company
+        self.location = location
+        self.start = start
+        self.end = end
+        self.description = description
+        self.is_current = is_current
+        # Une date illisible (saisie libre) est affichée telle quelle
+        self.start_date = format_profile_date(start, locale) if start else start_date
+        if is_current:
+            self.end_date = PRESENT[locale]
+        else:
+            self.end_date = format_profile_date(end, locale) if end else end_date
+
+    @classmethod
+    def from_dict(cls, data: Dict, locale: str = 'fr') -> 'Experience':
+        start_date = data.get('start_date') or ''
+        end_date = data.get('end_date') or ''
+        is_current = bool(data.get('is_current')) or _is_present(end_date)
+        return cls(title=data.get('title') or '', company=data.get('company') or '',
+                   location=data.get('location') or '', start=parse_profile_date(start_date),
+                   end=None if is_current else parse_profile_date(end_date),
+                   description=data.get('description') or '', is_current=is_current,
+                   start_date=start_date, end_date=end_date, locale=locale)
+
+    def sort_key(self) -> Tuple:
+        # Poste en cours d'abord, puis du plus récent au plus ancien
+        return self.is_current, self.end or self.start or (0, 0), self.start or (0, 0)
+
+
+class Education(_Record):
+    __slots__ = ('school', 'degree', 'field', 'start_date', 'end_date', 'description', 'start', 'end')
+    FIELDS = ('school', 'degree', 'field', 'start_date', 'end_date', 'description')
+
+    def __init__(self, school: str = '', degree: str = '', field: str = '', start: Optional[Tuple[int, int]] = None,
+                 end: Optional[Tuple[int, int]] = None, description: str = '', start_date: str = '',
+                 end_date: str = '', locale: str = 'fr'):
+        self.school = school
+        self.degree = degree
+        self.field = field
+        self.start = start
+        self.end = end
+        self.description = description
+        self.start_date = format_profile_date(start, locale) if start else start_date
+        self.end_date = format_profile_date(end, locale) if end else end_date
+
+    @classmethod
+    def from_dict(cls, data: Dict, locale: str = 'fr') -> 'Education':
+        start_date = str(data.get('start_date') or '')
+        end_date = str(data.get('end_date') or '')
+        return cls(school=data.get('school') or '', degree=data.get('degree') or '', field=data.get('field') or '',
+                   start=parse_profile_date(start_date), end=parse_profile_date(end_date),
+                   description=data.get('description') or '', start_date=start_date, end_date=end_date,
+                   locale=locale)
+
+    def sort_key(self) -> Tuple:
+        return self.end or self.start or (0, 0), self.start or (0, 0)
+
+
+class Skill(_Record):
+    __slots__ = ('name', 'endorsements')
+    FIELDS = __slots__
+
+    def __init__(self, name: str = '', endorsements: int = 0):
+        self.name = name
+        self.endorsements = endorsements
+
+    @classmethod
+    def from_dict(cls, data) -> 'Skill':
+        if isinstance(data, str):
+            return cls(data)
+        return cls(data.get('name') or '', int(data.get('endorsements') or 0))
+
+
+class Profile(_Record):
+    """
+    Profil normalisé produit par l'export LinkedIn, la saisie interactive et le
+    chargement JSON
+
+    La normalisation est faite une seule fois: dates converties en valeurs
+    triables, expériences et formations triées de la plus récente à la plus ancienne,
+    compétences classées par nombre de recommandations, chaînes d'affichage
+    précalculées pour la langue du profil. Un profil s'utilise comme un
+    dictionnaire (profile['skills'], **profile) et se sérialise en JSON au
+    format historique avec to_dict().
+    """
+
+    __slots__ = ('personal_info', 'experiences', 'education', 'skills', 'hobbies', 'generated_date',
+                 'locale', 'extra')
+    FIELDS = ('personal_info', 'experiences', 'education', 'skills', 'hobbies', 'generated_date')
+
+    def __init__(self, personal_info: Optional[PersonalInfo] = None, experiences: Optional[List[Experience]] = None,
+                 education: Optional[List[Education]] = None, skills: Optional[List[Skill]] = None,
+                 hobbies: Optional[List[str]] = None, generated_date: str = '', locale: str = 'fr',
+                 extra: Optional[Dict] = None):
+        self.personal_info = personal_info or PersonalInfo()
+        self.experiences = sorted(experiences or [], key=Experience.sort_key, reverse=True)
+        self.education = sorted(education or [], key=Education.sort_key, reverse=True)
+        self.skills = sorted(skills or [], key=lambda skill: skill.endorsements, reverse=True)
+        self.hobbies = hobbies or []
+        # Date fournie par la source uniquement: la date du jour n'est ajoutée qu'à l'affichage,
+        # pour que to_dict() et les hash de contenu restent stables d'un jour à l'autre
+        self.generated_date = generated_date
+        self.locale = locale
+        # Clés supplémentaires du JSON, transmises telles quelles aux templates
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data: Dict, locale: str = 'fr') -> 'Profile':
+        return cls(
+            personal_info=PersonalInfo.from_dict(data.get('personal_info') or {}),
+            experiences=[Experience.from_dict(exp, locale) for exp in data.get('experiences') or []],
+            education=[Education.from_dict(edu, locale) for edu in data.get('education') or []],
+            skills=[Skill.from_dict(skill) for skill in data.get('skills') or []],
+            hobbies=[str(h) for h in data.get('hobbies') or []],
+            generated_date=data.get('generated_date') or '',
+            locale=locale,
+            extra={key: value for key, value in data.items() if key not in cls.FIELDS}
+        )
+
+    @classmethod
+    def coerce(cls, data: Union['Profile', Dict], locale: str = 'fr') -> 'Profile':
+        """Profil tel quel, ou normalisé s'il s'agit d'un dictionnaire"""
+        return data if isinstance(data, Profile) else cls.from_dict(data, locale)
+
+    @classmethod
+    def load(cls, path: str, locale: str = 'fr') -> 'Profile':
+        """Charge un profil depuis un fichier JSON"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), locale)
+
+    def context(self) -> Dict:
+        """Variables transmises aux templates"""
+        context = dict(self.extra)
+        for field in self.FIELDS:
+            context[field] = getattr(self, field)
+        context['generated_date'] = self.generated_date or datetime.now().strftime('%d/%m/%Y')
+        return context
+
+    def to_dict(self) -> Dict:
+        data = super().to_dict()
+        if not self.generated_date:
+            del data['generated_date']
+        data.update(self.extra)
+        return data
+
+    def profile_id(self) -> str:
+        """
+        Identifiant stable du candidat: champ "id" du JSON, sinon identifiant
+        de l'URL LinkedIn, sinon hash du nom et de l'e-mail
+        """
+        explicit = self.extra.get('id')
+        if explicit:
+            return re.sub(r'[^\w.-]+', '-', str(explicit))
+        slug = self.personal_info.linkedin_url.rstrip('/').rsplit('/', 1)[-1]
+        if slug and slug != 'in' and '.' not in slug:
+            return re.sub(r'[^\w.-]+', '-', slug)
+        identity = f"{self.personal_info.name}\0{self.personal_info.email}"
+        return hashlib.blake2b(identity.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def validate_profile(data) -> Tuple[List[str], List[str]]:
+    """
+    Vérifie un profil JSON avant rendu, sans charger les templates
+
+    Erreurs: structure inutilisable (types incorrects, nom absent). Avertissements:
+    contenu affiché de façon dégradée (dates illisibles affichées telles quelles,
+    dates inversées, entrées sans titre).
+
+    Returns:
+        (erreurs, avertissements), messages préfixés par le chemin du champ
+    """
+    errors, warnings = [], []
+    if not isinstance(data, dict):
+        return [f"le profil doit être un objet JSON, pas {type(data).__name__}"], warnings
+
+    personal_info = data.get('personal_info')
+    if not isinstance(personal_info, dict):
+        errors.append("personal_info: objet manquant")
+    elif not str(personal_info.get('name') or '').strip():
+        errors.append("personal_info.name: nom manquant")
+
+    for field in ('experiences', 'education', 'skills', 'hobbies'):
+        if data.get(field) is not None and not isinstance(data[field], list):
+            errors.append(f"{field}: liste attendue, pas {type(data[field]).__name__}")
+
+    for section, title_keys in (('experiences', ('title', 'company')), ('education', ('school', 'degree'))):
+        entries = data.get(section)
+        if not isinstance(entries, list):
+            continue
+        for i, entry in enumerate(entries):
+            path = f"{section}[{i}]"
+            if not isinstance(entry, dict):
+                errors.append(f"{path}: objet attendu, pas {type(entry).__name__}")
+                continue
+            if not any(str(entry.get(key) or '').strip() for key in title_keys):
+                warnings.append(f"{path}: ni {title_keys[0]} ni {title_keys[1]}")
+            dates = {}
+            for key in ('start_date', 'end_date'):
+                value = entry.get(key)
+                if not value or (key == 'end_date' and _is_present(str(value))):
+                    continue
+                dates[key] = parse_profile_date(str(value))
+                if dates[key] is None:
+                    warnings.append(f"{path}.{key}: date illisible {value!r} (affichée telle quelle)")
+            start, end = dates.get('start_date'), dates.get('end_date')
+            # Un mois inconnu (0) ne compare que les années
+            if start and end and (end[0] < start[0] or (end[0] == start[0] and 0 < end[1] < start[1])):
+                warnings.append(f"{path}: end_date antérieure à start_date")
+
+    skills = data.get('skills')
+    if isinstance(skills, list):
+        for i, skill in enumerate(skills):
+            if isinstance(skill, str):
+                continue
+            if not isinstance(skill, dict) or not skill.get('name'):
+                errors.append(f"skills[{i}]: nom de compétence ou objet {{name, endorsements}} attendu")
+                continue
+            try:
+                int(skill.get('endorsements') or 0)
+            except (TypeError, ValueError):
+                errors.append(f"skills[{i}].endorsements: nombre attendu, pas {skill['endorsements']!r}")
+    return errors, warnings
+
+
+# ---------------------------------------------------------------------------
+# Estimation de mise en page A4
+# ---------------------------------------------------------------------------
+
+PT = 25.4 / 72   # 1pt en mm
+PX = 25.4 / 96   # 1px CSS en mm
+REM = 16 * PX    # 1rem en mm
+
+
+class TemplateLayout:
+    """
+    Boîtes et métriques de police d'un template, relevées dans son CSS (en mm)
+
+    Les largeurs de texte sont celles des colonnes, marges intérieures déduites.
+    char_ratio est la chasse moyenne d'un caractère de texte courant, en fraction
+    de la taille de police (≈0.45 pour un serif, ≈0.5 pour un sans-serif,
+    ≈0.6 pour une police à chasse fixe).
+    """
+
+    __slots__ = ('header_mm', 'main_padding_mm', 'main_width_mm', 'sidebar_width_mm', 'section_title_mm',
+                 'section_gap_mm', 'summary_font_mm', 'summary_line_height', 'summary_char_ratio',
+                 'summary_box_mm', 'text_font_mm', 'text_line_height', 'text_char_ratio', 'experience_mm',
+                 'education_mm', 'sidebar_section_mm', 'skill_mm', 'max_skills', 'chip_font_mm', 'chip_mm',
+                 'chip_padding_mm', 'chip_gap_mm')
+
+    def __init__(self, **metrics):
+        for name in self.__slots__:
+            setattr(self, name, metrics[name])
+
+
+TEMPLATE_LAYOUTS = {
+    # Artistique: en-tête 2.2rem, grille 1fr/300px, descriptions 0.6rem DM Sans
+    '1': TemplateLayout(header_mm=40.0, main_padding_mm=10.2, main_width_mm=110.0, sidebar_width_mm=74.3,
+                        section_title_mm=10.8, section_gap_mm=5.1, summary_font_mm=0.8 * REM,
+                        summary_line_height=1.2, summary_char_ratio=0.45, summary_box_mm=8.9,
+                        text_font_mm=0.6 * REM, text_line_height=1.5, text_char_ratio=0.5, experience_mm=26.2,
+                        education_mm=24.7, sidebar_section_mm=17.2, skill_mm=8.15, max_skills=18,
+                        chip_font_mm=0.75 * REM, chip_mm=6.9, chip_padding_mm=3.2, chip_gap_mm=1.6),
+    # Swiss: en-tête 32pt sur 30mm de marges, colonnes 130mm/80mm, Work Sans 7pt
+    '2': TemplateLayout(header_mm=59.0, main_padding_mm=4.0, main_width_mm=120.0, sidebar_width_mm=60.0,
+                        section_title_mm=12.4, section_gap_mm=6.0, summary_font_mm=8.5 * PT,
+                        summary_line_height=1.5, summary_char_ratio=0.5, summary_box_mm=10.0,
+                        text_font_mm=7 * PT, text_line_height=1.5, text_char_ratio=0.52, experience_mm=22.0,
+                        education_mm=20.0, sidebar_section_mm=18.4, skill_mm=7.7, max_skills=18,
+                        chip_font_mm=7.5 * PT, chip_mm=6.0, chip_padding_mm=4.0, chip_gap_mm=2.0),
+    # Corporate: en-tête 28pt, grille 1fr/70mm, Inter 7pt
+    '3': TemplateLayout(header_mm=50.0, main_padding_mm=4.0, main_width_mm=120.0, sidebar_width_mm=60.0,
+                        section_title_mm=12.4, section_gap_mm=8.0, summary_font_mm=8.5 * PT,
+                        summary_line_height=1.6, summary_char_ratio=0.52, summary_box_mm=12.0,
+                        text_font_mm=7 * PT, text_line_height=1.6, text_char_ratio=0.52, experience_mm=27.0,
+                        education_mm=24.0, sidebar_section_mm=24.3, skill_mm=8.2, max_skills=18,
+                        chip_font_mm=8 * PT, chip_mm=8.2, chip_padding_mm=6.0, chip_gap_mm=0.8),
+    # Editorial: en-tête 36pt, grille 125mm/1fr, Lato 7pt
+    '4': TemplateLayout(header_mm=67.0, main_padding_mm=0.0, main_width_mm=125.0, sidebar_width_mm=53.0,
+                        section_title_mm=12.9, section_gap_mm=8.0, summary_font_mm=8.5 * PT,
+                        summary_line_height=1.7, summary_char_ratio=0.45, summary_box_mm=12.0,
+                        text_font_mm=7 * PT, text_line_height=1.6, text_char_ratio=0.48, experience_mm=26.4,
+                        education_mm=24.0, sidebar_section_mm=18.2, skill_mm=9.8, max_skills=18,
+                        chip_font_mm=8 * PT, chip_mm=8.0, chip_padding_mm=6.0, chip_gap_mm=1.5)
+}
+
+A4_HEIGHT_MM = 297.0
+
+
+def _template_layout(choix: str) -> TemplateLayout:
+    try:
+        return TEMPLATE_LAYOUTS[choix]
+    except KeyError:
+        raise ValueError(f"Template inconnu: {choix!r} (attendu: {', '.join(TEMPLATE_LAYOUTS)})") from None
+
+
+def _chars_per_line(width_mm: float, font_mm: float, char_ratio: float) -> int:
+    return max(1, int(width_mm / (font_mm * char_ratio)))
+
+
+def _text_lines(text: str, chars_per_line: int) -> int:
+    """Lignes occupées par un paragraphe HTML (les espaces et retours à la ligne sont fusionnés)"""
+    if not text:
+        return 0
+    # Le retour à la ligne par mots perd en moyenne une fraction de ligne
+    return -(-len(text) * 100 // (chars_per_line * 92))
+
+
+def _trim_text(text: str, lines: int, chars_per_line: int) -> str:
+    """Coupe un texte à un nombre de lignes, sur une fin de mot"""
+    limit = max(1, lines * chars_per_line * 92 // 100 - 1)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(' ', 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip(' ,;:.') + '…'
+
+
+def estimate_page_fit(profile: Union[Profile, Dict], choix: str, margin_mm: float = 4.0) -> Dict:
+    """
+    Estime, sans rendu, la hauteur occupée par un profil dans cv_template_N
+
+    Les deux colonnes sont mesurées séparément: colonne principale (résumé,
+    expériences, formation) et barre latérale (compétences, hobbies).
+
+    Args:
+        profile: Profil (ou dictionnaire)
+        choix: Numéro du template
+        margin_mm: Marge de sécurité retirée de la hauteur disponible
+
+    Returns:
+        {template, fits, main_mm, sidebar_mm, available_mm, overflow_mm}
+    """
+    profile = Profile.coerce(profile)
+    layout = _template_layout(choix)
+    text_cpl = _chars_per_line(layout.main_width_mm, layout.text_font_mm, layout.text_char_ratio)
+    text_line_mm = layout.text_font_mm * layout.text_line_height
+
+    main = layout.main_padding_mm
+    summary = profile.personal_info.summary
+    if summary:
+        summary_cpl = _chars_per_line(layout.main_width_mm - layout.summary_box_mm, layout.summary_font_mm,
+                                      layout.summary_char_ratio)
+        main += (layout.summary_box_mm + _text_lines(summary, summary_cpl)
+                 * layout.summary_font_mm * layout.summary_line_height)
+    if profile.experiences:
+        main += layout.section_title_mm + layout.section_gap_mm
+        for exp in profile.experiences:
+            main += layout.experience_mm + _text_lines(exp.description, text_cpl) * text_line_mm
+    if profile.education:
+        main += layout.section_title_mm + layout.section_gap_mm
+        for edu in profile.education:
+            main += layout.education_mm + _text_lines(edu.description, text_cpl) * text_line_mm
+
+    sidebar = layout.main_padding_mm
+    if profile.skills:
+        sidebar += layout.sidebar_section_mm + min(len(profile.skills), layout.max_skills) * layout.skill_mm
+    if profile.hobbies:
+        # Pastilles en ligne, renvoyées à la ligne suivante quand la colonne est pleine
+        rows, row_width = 1, 0.0
+        for hobby in profile.hobbies:
+            width = len(hobby) * layout.chip_font_mm * 0.5 + layout.chip_padding_mm + layout.chip_gap_mm
+            if row_width and row_width + width > layout.sidebar_width_mm:
+                rows, row_width = rows + 1, 0.0
+            row_width += width
+        sidebar += layout.sidebar_section_mm + rows * (layout.chip_mm + layout.chip_gap_mm)
+
+    available = A4_HEIGHT_MM - layout.header_mm - margin_mm
+    overflow = max(main, sidebar) - available
+    return {
+        'template': choix,
+        'fits': overflow <= 0,
+        'main_mm': round(main, 1),
+        'sidebar_mm': round(sidebar, 1),
+        'available_mm': round(available, 1),
+        'overflow_mm': round(max(overflow, 0.0), 1)
+    }
+
+
+def fit_profile(profile: Union[Profile, Dict], choix: str, min_description_lines: int = 2,
+                min_experiences: int = 2, margin_mm: float = 4.0) -> Tuple[Profile, List[str]]:
+    """
+    Réduit un profil pour qu'il tienne sur une page A4 avec cv_template_N
+
+    Dans l'ordre, jusqu'à ce que l'estimation tienne: les descriptions les plus
+    longues perdent une ligne à la fois (jusqu'à min_description_lines), puis
+    les hobbies et les compétences les moins recommandées sont retirés si la
+    barre latérale déborde, puis les expériences les plus anciennes (jusqu'à
+    min_experiences) et leurs formations sont retirées.
+
+    Returns:
+        (profil réduit, liste des réductions appliquées). Le profil d'origine
+        n'est pas modifié; il est renvoyé tel quel s'il tient déjà.
+    """
+    profile = Profile.coerce(profile)
+    estimate = estimate_page_fit(profile, choix, margin_mm)
+    if estimate['fits']:
+        return profile, []
+
+    layout = _template_layout(choix)
+    text_cpl = _chars_per_line(layout.main_width_mm, layout.text_font_mm, layout.text_char_ratio)
+    text_line_mm = layout.text_font_mm * layout.text_line_height
+    available = estimate['available_mm']
+    main, sidebar = estimate['main_mm'], estimate['sidebar_mm']
+
+    trimmed = copy.copy(profile)
+    trimmed.experiences = [copy.copy(exp) for exp in profile.experiences]
+    trimmed.education = [copy.copy(edu) for edu in profile.education]
+    trimmed.skills = list(profile.skills)
+    trimmed.hobbies = list(profile.hobbies)
+    actions = []
+
+    # Descriptions: une ligne retirée à la fois à la plus longue (la plus ancienne à égalité)
+    items = trimmed.experiences + trimmed.education
+    lines = [_text_lines(item.description, text_cpl) for item in items]
+    heap = [(-count, -position) for position, count in enumerate(lines) if count > min_description_lines]
+    heapq.heapify(heap)
+    while main > available and heap:
+        count, position = heapq.heappop(heap)
+        position = -position
+        lines[position] -= 1
+        main -= text_line_mm
+        if lines[position] > min_description_lines:
+            heapq.heappush(heap, (-lines[position], -position))
+    for item, count in zip(items, lines):
+        original = _text_lines(item.description, text_cpl)
+        if count < original:
+            item.description = _trim_text(item.description, count, text_cpl)
+            label = item.title if isinstance(item, Experience) else item.school
+            actions.append(f"description de « {label} » réduite à {count} ligne(s) au lieu de {original}")
+
+    # Barre latérale: hobbies puis compétences les moins recommandées
+    while sidebar > available and trimmed.hobbies:
+        actions.append(f"hobby « {trimmed.hobbies.pop()} » retiré")
+        sidebar = estimate_page_fit(trimmed, choix, margin_mm)['sidebar_mm']
+    visible_skills = min(len(trimmed.skills), layout.max_skills)
+    while sidebar > available and visible_skills > 0:
+        visible_skills -= 1
+        sidebar -= layout.skill_mm
+    if visible_skills < min(len(trimmed.skills), layout.max_skills):
+        actions.append(f"compétences limitées aux {visible_skills} plus recommandées")
+        trimmed.skills = trimmed.skills[:visible_skills]
+
+    # En dernier recours: expériences les plus anciennes, puis formations
+    while main > available and len(trimmed.experiences) > min_experiences:
+        exp = trimmed.experiences.pop()
+        main -= layout.experience_mm + _text_lines(exp.description, text_cpl) * text_line_mm
+        actions.append(f"expérience « {exp.title} » ({exp.start_date}) retirée")
+    while main > available and len(trimmed.education) > 1:
+        edu = trimmed.education.pop()
+        main -= layout.education_mm + _text_lines(edu.description, text_cpl) * text_line_mm
+        actions.append(f"formation « {edu.school} » retirée")
+    return trimmed, actions
+
+
+def choose_template(profile: Union[Profile, Dict], candidates: Iterable[str] = ('1', '2', '3', '4'),
+                    margin_mm: float = 4.0) -> str:
+    """
+    Premier template (dans l'ordre de préférence) où le profil tient sans
+    réduction, sinon celui où il déborde le moins
+    """
+    profile = Profile.coerce(profile)
+    best, best_overflow = None, None
+    for choix in candidates:
+        overflow = estimate_page_fit(profile, choix, margin_mm)['overflow_mm']
+        if overflow <= 0:
+            return choix
+        if best is None or overflow < best_overflow:
+            best, best_overflow = choix, overflow
+    return best
+
+
+class FragmentCache:
+    """Cache LRU des fragments HTML rendus, borné en nombre d'entrées et en octets"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key: str, html: str) -> None:
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = html
+            self.size_bytes += size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+
+_STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s*([{};,>])\s*')
+_HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_HTML_INDENT = re.compile(r'>\s*\n\s*<')
+
+
+def minify_css(css: str) -> str:
+    """Retire commentaires et espaces superflus d'une feuille de style"""
+    css = _CSS_COMMENT.sub('', css)
+    css = ' '.join(css.split())
+    css = _CSS_SPACES.sub(r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_html(source: str) -> str:
+    """
+    Minifie la source d'un template: CSS des blocs <style>, commentaires HTML,
+    indentation entre balises. Les espaces restants sont réduits à un seul
+    (un espace entre deux éléments en ligne reste visible)
+    """
+    styles = []
+
+    def keep_style(match):
+        styles.append(minify_css(match.group(1)))
+        return f'<style>\0{len(styles) - 1}\0</style>'
+
+    source = _STYLE_BLOCK.sub(keep_style, source)
+    source = _HTML_COMMENT.sub('', source)
+    source = _HTML_INDENT.sub('><', source)
+    source = re.sub(r'\s+', ' ', source)
+    return re.sub(r'\0(\d+)\0', lambda match: styles[int(match.group(1))], source).strip()
+
+
+@lru_cache(maxsize=None)
+def _jinja():
+    """
+    Importe Jinja2 au premier rendu et définit les classes qui en dépendent
+    (FragmentCacheExtension, CVTemplateLoader), exposées aussi par le module
+
+    Returns:
+        Espace de noms {Environment, FragmentCacheExtension, CVTemplateLoader, version}
+    """
+    from types import SimpleNamespace
+    from jinja2 import BytecodeCache, Environment, FileSystemLoader, nodes
+    from jinja2 import __version__ as version
+    from jinja2.ext import Extension
+
+    class FragmentCacheExtension(Extension):
+        """
+        Balise Jinja2 {% fragment 'nom', donnees %}...{% endfragment %}
+
+        Le rendu du bloc est mis en cache sous une clé combinant le template, un
+        hash de sa source et un hash du contenu des données passées à la balise:
+        seules les sections dont les données ont changé sont re-rendues.
+        """
+
+        tags = {'fragment'}
+
+        def __init__(self, environment):
+            super().__init__(environment)
+            environment.extend(fragment_cache=None)
+            self._source_hashes = {}
+
+        def preprocess(self, source: str, name: Optional[str], filename: Optional[str] = None) -> str:
+            # Une modification du template invalide ses fragments
+            self._source_hashes[name] = hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
+            return source
+
+        def parse(self, parser):
+            lineno = next(parser.stream).lineno
+            args = [nodes.Const(f"{parser.name}:{self._source_hashes.get(parser.name, '')}"),
+                    parser.parse_expression()]
+            while parser.stream.skip_if('comma'):
+                args.append(parser.parse_expression())
+            body = parser.parse_statements(('name:endfragment',), drop_needle=True)
+            return nodes.CallBlock(self.call_method('_render_fragment', args), [], [], body).set_lineno(lineno)
+
+        def _render_fragment(self, prefix: str, name: str, *values, caller) -> str:
+            cache = self.environment.fragment_cache
+            if cache is None:
+                return caller()
+            key = f"{prefix}:{name}:{_content_hash(values)}"
+            html = cache.get(key)
+            if html is None:
+                html = caller()
+                cache.set(key, html)
+            return html
+
+    # Le code compilé retrouve l'extension par cet identifiant: il ne doit pas dépendre
+    # du nom du module (__main__ avec python -m), sans quoi le bytecode en cache est inutilisable
+    FragmentCacheExtension.identifier = 'linkedin_cv_generator.FragmentCacheExtension'
+
+    class CVTemplateLoader(FileSystemLoader):
+        """
+        Loader des templates transformant leur source avant compilation, donc une
+        seule fois par template et non à chaque rendu:
+
+        - minify: HTML et CSS minifiés (voir minify_html)
+        - external_css: le bloc <style> est remplacé par un lien vers
+          {{ stylesheet_href }}; la feuille de style et son hash sont gardés dans
+          stylesheets[nom du template] pour être écrits une seule fois à côté des CV
+        """
+
+        def __init__(self, searchpath: str, minify: bool = False, external_css: bool = False):
+            super().__init__(searchpath)
+            self.minify = minify
+            self.external_css = external_css
+            self.stylesheets = {}
+
+        def get_source(self, environment, template: str):
+            source, filename, uptodate = super().get_source(environment, template)
+            if self.external_css:
+                match = _STYLE_BLOCK.search(source)
+                if match is not None:
+                    css = match.group(1)
+                    if '{{' in css or '{%' in css:
+                        raise ValueError(f"{template}: la feuille de style contient du Jinja2 et doit rester intégrée")
+                    css = minify_css(css) if self.minify else css.strip() + '\n'
+                    digest = hashlib.blake2b(css.encode('utf-8'), digest_size=8).hexdigest()
+                    self.stylesheets[template] = (css, digest)
+                    source = (source[:match.start()] + '<link rel="stylesheet" href="{{ stylesheet_href }}">'
+                              + source[match.end():])
+            if self.minify:
+                source = minify_html(source)
+            return source, filename, uptodate
+
+    class TemplateBytecodeCache(BytecodeCache):
+        """
+        Templates compilés, persistants sur disque: un processus neuf (worker,
+        commande render) charge le bytecode au lieu de parser et compiler la source
+
+        Un fichier par template et par variante de loader (minification, feuille de
+        style partagée), dont la source transformée diffère. Le bytecode est
+        invalidé par le hash de cette source (même calcul que template_hash, donc
+        incluant la version de Jinja2) et par la version de Python (en-tête Jinja2):
+        un artefact périmé est ignoré, la source recompilée et l'artefact réécrit.
+        """
+
+        def __init__(self, directory: str, variant: str):
+            self.directory = directory
+            self.variant = variant
+
+        def get_cache_key(self, name: str, filename: Optional[str] = None) -> str:
+            return f"{name}.{self.variant}"
+
+        def get_source_checksum(self, source: str) -> str:
+            return _template_digest(source)
+
+        def path(self, key: str) -> str:
+            return os.path.join(self.directory, f"{key}.jinjac")
+
+        def load_bytecode(self, bucket) -> None:
+            try:
+                with open(self.path(bucket.key), 'rb') as f:
+                    bucket.load_bytecode(f)
+            except OSError:
+                pass
+
+        def dump_bytecode(self, bucket) -> None:
+            # Écriture atomique; un dossier de templates en lecture seule compile simplement à chaque fois
+            path = self.path(bucket.key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    bucket.write_bytecode(f)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    return SimpleNamespace(Environment=Environment, FragmentCacheExtension=FragmentCacheExtension,
+                           CVTemplateLoader=CVTemplateLoader, TemplateBytecodeCache=TemplateBytecodeCache,
+                           version=version)
+
+
+@lru_cache(maxsize=None)
+def _jinja2_version() -> str:
+    """Version de Jinja2, lue dans son __init__.py sans l'importer si possible"""
+    if 'jinja2' in sys.modules:
+        return sys.modules['jinja2'].__version__
+    from importlib.util import find_spec
+    spec = find_spec('jinja2')
+    if spec is not None and spec.origin:
+        try:
+            with open(spec.origin, encoding='utf-8') as f:
+                match = re.search(r'^__version__\s*=\s*["\']([^"\']+)', f.read(), re.M)
+            if match:
+                return match.group(1)
+        except OSError:
+            pass
+    return _jinja().version
+
+
+def _template_digest(source: str) -> str:
+    """Hash d'une source de template, incluant la version de Jinja2 qui la compile"""
+    return hashlib.blake2b(f"{_jinja2_version()}\0{source}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def __getattr__(name: str):
+    # Classes dépendant de Jinja2, définies à la demande (voir _jinja)
+    if name in ('FragmentCacheExtension', 'CVTemplateLoader', 'TemplateBytecodeCache'):
+        return getattr(_jinja(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@contextmanager
+def _atomic_output(output_path: str) -> Iterator[IO]:
+    """
+    Ouvre un fichier temporaire à côté de output_path et le renomme à la fin:
+    un lecteur ne voit jamais de CV à moitié écrit. Un chemin en .gz est
+    compressé à la volée. Le fichier est synchronisé sur disque (fsync) avant
+    le renommage, pour qu'une coupure ne laisse pas un CV vide à sa place.
+    """
+    output_path = os.fspath(output_path)
+    directory, name = os.path.split(output_path)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if output_path.endswith('.gz'):
+        import gzip
+        raw = open(tmp_path, 'xb')
+        f = gzip.open(raw, 'wt', encoding='utf-8')
+    else:
+        raw = f = open(tmp_path, 'x', encoding='utf-8')
+    try:
+        with raw:
+            try:
+                yield f
+            finally:
+                # Fin du flux gzip écrite dans le fichier, qui reste ouvert pour le fsync
+                if f is not raw:
+                    f.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_chunks(f: IO, chunks: Iterable[str], buffer_size: int) -> int:
+    """
+    Écrit les morceaux de HTML par blocs d'au moins buffer_size caractères
+
+    Returns:
+        Nombre d'octets écrits (de caractères pour une destination texte)
+    """
+    binary = not isinstance(f, io.TextIOBase)
+    buffer = []
+    buffered = 0
+    written = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= buffer_size:
+            written += _write_block(f, ''.join(buffer), binary)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        written += _write_block(f, ''.join(buffer), binary)
+    return written
+
+
+def _write_block(f: IO, block: str, binary: bool) -> int:
+    if binary:
+        block = block.encode('utf-8')
+    f.write(block)
+    return len(block)
+
+
+def _timed_chunks(chunks: Iterable[str], timings: List[float]) -> Iterator[str]:
+    """Relaie les morceaux de HTML en cumulant dans timings[0] le temps passé à les produire"""
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            timings[0] += time.perf_counter() - start
+            return
+        timings[0] += time.perf_counter() - start
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Métriques
+# ---------------------------------------------------------------------------
+
+class Metrics:
+    """
+    Interface des métriques du pipeline: compteurs et histogrammes de latence
+    étiquetés. Cette implémentation ne fait rien: c'est celle utilisée quand les
+    métriques sont désactivées. Toute classe fournissant inc/observe peut la
+    remplacer (client Prometheus, StatsD...).
+    """
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Incrémente un compteur"""
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Ajoute une mesure (en secondes) à un histogramme"""
+
+    def merge(self, snapshot: Dict) -> None:
+        """Ajoute les métriques renvoyées par un worker du rendu par lots (snapshot d'InMemoryMetrics)"""
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Mesure la durée du bloc dans un histogramme"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+NULL_METRICS = Metrics()
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Métriques agrégées en mémoire, exportables en JSON ou au format texte
+    Prometheus. Les workers du rendu par lots renvoient leurs métriques avec
+    chaque résultat (drain) et le processus principal les fusionne (merge).
+    """
+
+    enabled = True
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            # Dernière case: au-delà du plus grand seuil (+Inf)
+            position = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            histogram['counts'][position] += 1
+            histogram['sum'] += value
+
+    def snapshot(self) -> Dict:
+        """Copie sérialisable en JSON des compteurs et histogrammes"""
+        with self._lock:
+            return self._snapshot(self._counters, self._histograms)
+
+    def drain(self) -> Dict:
+        """Renvoie le snapshot et remet les métriques à zéro"""
+        with self._lock:
+            counters, histograms = self._counters, self._histograms
+            self._counters, self._histograms = {}, {}
+        return self._snapshot(counters, histograms)
+
+    def _snapshot(self, counters: Dict, histograms: Dict) -> Dict:
+        return {
+            'buckets': list(self.buckets),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'histograms': [{'name': name, 'labels': dict(labels), 'counts': list(histogram['counts']),
+                            'sum': histogram['sum'], 'count': sum(histogram['counts'])}
+                           for (name, labels), histogram in sorted(histograms.items())]
+        }
+
+    def merge(self, snapshot: Dict) -> None:
+        """Ajoute les métriques d'un snapshot (d'un worker par exemple)"""
+        if list(snapshot['buckets']) != list(self.buckets):
+            raise ValueError("Impossible de fusionner des histogrammes aux seuils différents")
+        with self._lock:
+            for counter in snapshot['counters']:
+                key = (counter['name'], tuple(sorted(counter['labels'].items())))
+                self._counters[key] = self._counters.get(key, 0) + counter['value']
+            for entry in snapshot['histograms']:
+                key = (entry['name'], tuple(sorted(entry['labels'].items())))
+                histogram = self._histograms.setdefault(key, {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0})
+                histogram['counts'] = [a + b for a, b in zip(histogram['counts'], entry['counts'])]
+                histogram['sum'] += entry['sum']
+
+
+def _prometheus_labels(labels: Dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def write_prometheus(metrics: InMemoryMetrics, path: str, prefix: str = 'cvgen_') -> None:
+    """
+    Écrit les métriques au format texte Prometheus (collecteur textfile de
+    node_exporter), de manière atomique
+    """
+    snapshot = metrics.snapshot()
+    lines = []
+    declared = set()
+    for counter in snapshot['counters']:
+        name = prefix + counter['name']
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_prometheus_labels(counter['labels'])} {counter['value']:g}")
+    for histogram in snapshot['histograms']:
+        name = prefix + histogram['name']
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(snapshot['buckets'] + ['+Inf'], histogram['counts']):
+            cumulative += count
+            le = bound if isinstance(bound, str) else f"{bound:g}"
+            lines.append(f"{name}_bucket{_prometheus_labels(histogram['labels'], le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_prometheus_labels(histogram['labels'])} {histogram['sum']:.9g}")
+        lines.append(f"{name}_count{_prometheus_labels(histogram['labels'])} {histogram['count']}")
+    with _atomic_output(path) as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def write_metrics_json(metrics: InMemoryMetrics, path: str) -> None:
+    """Écrit le snapshot des métriques en JSON, de manière atomique"""
+    with _atomic_output(path) as f:
+        json.dump(metrics.snapshot(), f, ensure_ascii=False, indent=1)
+
+
+METRICS_EXPORTERS = {
+    'prometheus': write_prometheus,
+    'json': write_metrics_json
+}
+
+
+# ---------------------------------------------------------------------------
+# Profilage
+# ---------------------------------------------------------------------------
+
+def _code_key(func) -> Tuple[str, int, str]:
+    """Clé (fichier, ligne, nom) d'une fonction dans les statistiques de cProfile"""
+    func = getattr(func, '__func__', func)
+    func = getattr(func, '__wrapped__', func)
+    code = func.__code__
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class PipelineProfiler:
+    """
+    Profilage à la demande du rendu (LinkedInCVGenerator(profiler=...) ou
+    commande profile): profil CPU (cProfile) et allocations mémoire
+    (tracemalloc) de chaque appel à generate_cv, cumulés par template demandé
+    ("auto" est regroupé à part)
+
+    write() écrit pour chaque template une pile repliée (cpu_template_N.folded,
+    pour flamegraph.pl ou speedscope), le profil brut (cpu_template_N.pstats,
+    pour pstats ou snakeviz), les sites qui allouent le plus
+    (allocations_template_N.txt) et un résumé JSON avec le temps par étape.
+    Le code compilé d'un template et ses allocations sont ramenés à leur ligne
+    dans cv_template_N.html.
+
+    Le profilage ralentit fortement le rendu (tracemalloc surtout): il sert à
+    comparer deux versions d'un template, pas à mesurer un lot (voir
+    InMemoryMetrics). Seul le thread appelant est profilé.
+    """
+
+    # Durées cumulées: une étape peut en contenir une autre (dates dans normalize,
+    # et render dans write en mode streaming). dates ne compte que les conversions
+    # hors cache: parse_profile_date et format_profile_date sont mémorisées
+    STAGES = ('normalize', 'dates', 'page_fit', 'template_load', 'photo', 'fonts', 'render', 'write')
+
+    def __init__(self, cpu: bool = True, memory: bool = True, top: int = 20, frames: int = 32):
+        """
+        Args:
+            cpu: Profil CPU avec cProfile
+            memory: Allocations avec tracemalloc (démarré et arrêté à chaque appel
+                s'il ne tourne pas déjà)
+            top: Nombre de sites d'allocation gardés par template
+            frames: Profondeur des piles enregistrées par tracemalloc
+        """
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+        self.frames = frames
+        self.templates = {}
+        # Fichier du code compilé -> Template, pour retrouver les lignes du template
+        self._compiled = {}
+        self._call = None
+
+    @contextmanager
+    def track(self, choix: str) -> Iterator[None]:
+        """Profile un appel de generate_cv avec le template choix"""
+        if self._call is not None:
+            yield
+            return
+        import tracemalloc
+        entry = self.templates.get(choix)
+        if entry is None:
+            entry = self.templates[choix] = {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0, 'profile': None,
+                                             'allocations': {}}
+        if self.cpu and entry['profile'] is None:
+            # Un profil par template, réactivé à chaque appel: les structures de cProfile
+            # ne sont allouées qu'au premier et ne faussent pas les relevés de tracemalloc
+            import cProfile
+            entry['profile'] = cProfile.Profile()
+        self._call = {'snapshot': None}
+        owned = self.memory and not tracemalloc.is_tracing()
+        if owned:
+            tracemalloc.start(self.frames)
+        elif self.memory:
+            tracemalloc.reset_peak()
+        if entry['profile'] is not None:
+            entry['profile'].enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if entry['profile'] is not None:
+                entry['profile'].disable()
+            if self.memory:
+                entry['peak_bytes'] = max(entry['peak_bytes'], tracemalloc.get_traced_memory()[1])
+                snapshot = self._call['snapshot'] or tracemalloc.take_snapshot()
+                if owned:
+                    tracemalloc.stop()
+                self._add_allocations(entry['allocations'], snapshot)
+            self._call = None
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+
+    def template_loaded(self, template) -> None:
+        """Template compilé de l'appel en cours, pour ramener son code aux lignes du template"""
+        self._compiled[template.root_render_func.__code__.co_filename] = template
+
+    def checkpoint(self) -> None:
+        """Relevé des allocations de l'appel en cours, le document rendu encore en mémoire"""
+        if self._call is not None and self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                self._call['snapshot'] = tracemalloc.take_snapshot()
+
+    def _add_allocations(self, allocations: Dict, snapshot) -> None:
+        """Cumule les blocs d'un relevé par site d'allocation"""
+        import tracemalloc
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                           tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')])
+        sites = {}
+        for trace in snapshot.traces:
+            site = sites.get(trace.traceback)
+            if site is None:
+                site = sites[trace.traceback] = self._allocation_site(trace.traceback)
+            total = allocations.get(site)
+            if total is None:
+                total = allocations[site] = [0, 0]
+            total[0] += trace.size
+            total[1] += 1
+
+    @staticmethod
+    def _stats(entry: Dict):
+        import pstats
+        return pstats.Stats(entry['profile']) if entry['profile'] is not None else None
+
+    def _allocation_site(self, traceback) -> Tuple[str, int]:
+        """Ligne du template qui alloue, sinon de ce module, sinon la plus récente de la pile"""
+        frames = list(reversed(traceback))
+        for frame in frames:
+            template = self._compiled.get(frame.filename)
+            if template is not None:
+                return template.filename, template.get_corresponding_lineno(frame.lineno)
+        for frame in frames:
+            if frame.filename == __file__:
+                return frame.filename, frame.lineno
+        return frames[0].filename, frames[0].lineno
+
+    def _frame_label(self, key: Tuple[str, int, str]) -> str:
+        filename, lineno, name = key
+        if filename == '~':
+            return name
+        template = self._compiled.get(filename)
+        if template is not None:
+            filename, lineno = template.filename, template.get_corresponding_lineno(lineno)
+        return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+    def stage_seconds(self, stats) -> Dict[str, float]:
+        """Temps cumulé par étape du pipeline d'après un profil cProfile"""
+        functions = {
+            'normalize': [Profile.from_dict],
+            'dates': [parse_profile_date, format_profile_date],
+            'page_fit': [LinkedInCVGenerator._fit_page],
+            'template_load': [LinkedInCVGenerator._load_template],
+            'photo': [LinkedInCVGenerator._photo_src],
+            'fonts': [LinkedInCVGenerator._fonts_html],
+            'write': [_write_chunks, _atomic_output]
+        }
+        stages = {_code_key(func): stage for stage, funcs in functions.items() for func in funcs}
+        seconds = dict.fromkeys(self.STAGES, 0.0)
+        for key, (_, _, _, cumulative, _) in stats.stats.items():
+            if key[2] == 'root' and key[0] in self._compiled:
+                seconds['render'] += cumulative
+            elif key in stages:
+                seconds[stages[key]] += cumulative
+        return seconds
+
+    def collapsed_stacks(self, stats, min_seconds: float = 1e-6) -> List[str]:
+        """
+        Piles repliées ("a;b;c microsecondes") reconstruites depuis les arcs
+        appelant-appelé de cProfile: le temps d'une fonction appelée depuis
+        plusieurs endroits est réparti au prorata de chaque arc
+        """
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+        samples = {}
+
+        def walk(func, path, on_path, share):
+            _, _, own, cumulative, _ = stats.stats[func]
+            path = f"{path};{self._frame_label(func)}" if path else self._frame_label(func)
+            if own * share >= min_seconds:
+                samples[path] = samples.get(path, 0.0) + own * share
+            for callee, edge_cumulative in callees.get(func, ()):
+                callee_cumulative = stats.stats[callee][3]
+                if callee in on_path or not callee_cumulative or edge_cumulative * share < min_seconds:
+                    continue
+                on_path.add(callee)
+                walk(callee, path, on_path, share * edge_cumulative / callee_cumulative)
+                on_path.discard(callee)
+
+        for func, (_, _, _, _, callers) in stats.stats.items():
+            if not callers:
+                walk(func, '', {func}, 1.0)
+        return [f"{path} {round(seconds * 1e6)}" for path, seconds in sorted(samples.items())
+                if round(seconds * 1e6)]
+
+    def summary(self) -> Dict:
+        """Résumé par template: appels, durée moyenne, temps par étape, pic mémoire, sites d'allocation"""
+        import linecache
+        summary = {}
+        for choix, entry in sorted(self.templates.items()):
+            if not entry['calls']:
+                continue
+            item = {'calls': entry['calls'], 'mean_ms': entry['seconds'] / entry['calls'] * 1000}
+            if entry['profile'] is not None:
+                item['stage_seconds'] = self.stage_seconds(self._stats(entry))
+            if self.memory:
+                item['peak_bytes'] = entry['peak_bytes']
+                top = heapq.nlargest(self.top, entry['allocations'].items(), key=lambda site: site[1][0])
+                item['allocations'] = [{'site': f"{os.path.basename(filename)}:{lineno}", 'bytes': size,
+                                        'blocks': blocks, 'code': linecache.getline(filename, lineno).strip()}
+                                       for (filename, lineno), (size, blocks) in top]
+            summary[choix] = item
+        return summary
+
+    def write(self, directory: str) -> List[str]:
+        """
+        Écrit les rapports dans directory
+
+        Returns:
+            Chemins des fichiers écrits
+        """
+        os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+        paths = []
+        for choix, entry in sorted(self.templates.items()):
+            if choix not in summary:
+                continue
+            if entry['profile'] is not None:
+                stats = self._stats(entry)
+                folded = os.path.join(directory, f'cpu_template_{choix}.folded')
+                with _atomic_output(folded) as f:
+                    f.writelines(line + '\n' for line in self.collapsed_stacks(stats))
+                raw = os.path.join(directory, f'cpu_template_{choix}.pstats')
+                stats.dump_stats(raw)
+                paths += [folded, raw]
+            if self.memory:
+                item = summary[choix]
+                allocations = os.path.join(directory, f'allocations_template_{choix}.txt')
+                with _atomic_output(allocations) as f:
+                    f.write(f"# Template {choix}: {item['calls']} appel(s), pic {item['peak_bytes'] / 1024:.1f} Kio, "
+                            f"mémoire encore allouée une fois le document rendu (cumul des appels)\n")
+                    for site in item['allocations']:
+                        f.write(f"{site['bytes'] / 1024:10.1f} Kio {site['blocks']:8d} blocs  "
+                                f"{site['site']:<32} {site['code']}\n")
+                paths.append(allocations)
+        path = os.path.join(directory, 'profile_summary.json')
+        with _atomic_output(path) as f:
+            json.dump(summary, f, ensure_ascii=False, indent=1)
+        paths.append(path)
+        return paths
+
+
+class BuildManifest:
+    """
+    Manifeste de build incrémental: pour chaque CV généré, le template utilisé,
+    le hash de sa source, le hash des données et le hash du HTML produit
+    """
+
+    def __init__(self, path: str = MANIFEST):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def _key(self, output_path: str) -> str:
+        # Chemins relatifs au manifeste pour rester valides si le dossier est déplacé
+        return os.path.relpath(os.path.abspath(output_path), os.path.dirname(os.path.abspath(self.path)))
+
+    def get(self, output_path: str) -> Optional[Dict]:
+        return self.entries.get(self._key(output_path))
+
+    def is_fresh(self, output_path: str, template_hash: str, data_hash: str) -> bool:
+        """Vrai si le CV existe et a été produit avec ce template et ces données"""
+        entry = self.get(output_path)
+        if entry is None or entry['template_hash'] != template_hash or entry['data_hash'] != data_hash:
+            return False
+        try:
+            return os.path.getsize(output_path) == entry['size']
+        except OSError:
+            return False
+
+    def record(self, output_path: str, template: str, template_hash: str, data_hash: str,
+               output_hash: str) -> None:
+        self.entries[self._key(output_path)] = {
+            'template': template,
+            'template_hash': template_hash,
+            'data_hash': data_hash,
+            'output_hash': output_hash,
+            'size': os.path.getsize(output_path)
+        }
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with _atomic_output(self.path) as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def _template_font_specs(template_source: str) -> List[Tuple[str, List[int]]]:
+    """Familles et graisses demandées à Google Fonts par un template"""
+    import urllib.parse
+
+    match = GOOGLE_FONTS_URL.search(template_source)
+    if match is None:
+        return []
+    specs = []
+    for param in match.group(1).replace('&amp;', '&').split('&'):
+        if not param.startswith('family='):
+            continue
+        family, _, axes = param[len('family='):].partition(':')
+        weights = [int(w) for w in axes.partition('@')[2].split(';') if w.isdigit()]
+        specs.append((urllib.parse.unquote_plus(family), weights or [400]))
+    return specs
+
+
+def _collect_text(value) -> str:
+    """Concatène toutes les chaînes d'une structure de données (pour le sous-ensemble de glyphes)"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return ''.join(_collect_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return ''.join(_collect_text(v) for v in value)
+    return str(value) if value is not None else ''
+
+
+class FontBundler:
+    """
+    Remplace les polices Google Fonts des templates par des polices locales
+
+    Les fichiers sont cherchés dans fonts_dir sous la forme Famille_Nom-graisse.ext
+    (ex: Crimson_Pro-400.ttf, voir fetch_fonts). Deux modes:
+    - inline: polices réduites aux glyphes du profil (si fontTools est installé)
+      et intégrées en data URI, le CV est autonome;
+    - shared: polices complètes copiées une fois dans outputs/assets/fonts et
+      référencées par une feuille de style partagée.
+    Une police absente est ignorée: le navigateur utilise la police de repli du CSS.
+    """
+
+    def __init__(self, fonts_dir: str = FONTS, cache_size: int = 256):
+        self.fonts_dir = fonts_dir
+        self._fonts = FragmentCache(max_entries=cache_size, max_bytes=64 * 1024 * 1024)
+        self._missing = set()
+
+    def font_path(self, family: str, weight: int) -> Optional[str]:
+        base = os.path.join(self.fonts_dir, f"{family.replace(' ', '_')}-{weight}")
+        for ext in FONT_FORMATS:
+            if os.path.exists(base + ext):
+                return base + ext
+        if (family, weight) not in self._missing:
+            self._missing.add((family, weight))
+            print(f"⚠️  Police locale introuvable: {family} {weight} (police de repli utilisée)")
+        return None
+
+    def inline_html(self, template_source: str, text: str) -> str:
+        """Balise <style> avec les @font-face du template en data URI"""
+        glyphs = ''.join(sorted(set(text + template_source)))
+        glyphs_hash = hashlib.blake2b(glyphs.encode('utf-8'), digest_size=16).hexdigest()
+        rules = []
+        for family, weights in _template_font_specs(template_source):
+            for weight in weights:
+                path = self.font_path(family, weight)
+                if path is None:
+                    continue
+                key = f"{path}:{glyphs_hash}"
+                src = self._fonts.get(key)
+                if src is None:
+                    font_bytes, ext = self._subset(path, glyphs)
+                    mime, fmt = FONT_FORMATS[ext]
+                    import base64
+                    encoded = base64.b64encode(font_bytes).decode('ascii')
+                    src = f"url(data:{mime};base64,{encoded}) format('{fmt}')"
+                    self._fonts.set(key, src)
+                rules.append(_font_face(family, weight, src))
+        return f"<style>{''.join(rules)}</style>"
+
+    def shared_html(self, template_name: str, template_source: str, output_dir: str) -> str:
+        """Balise <link> vers la feuille de style de polices partagée par tous les CV du dossier"""
+        asset_dir = os.path.join(output_dir, 'assets', 'fonts')
+        css_name = f"{os.path.splitext(template_name)[0]}.css"
+        css_path = os.path.join(asset_dir, css_name)
+        if not os.path.exists(css_path):
+            os.makedirs(asset_dir, exist_ok=True)
+            rules = []
+            for family, weights in _template_font_specs(template_source):
+                for weight in weights:
+                    path = self.font_path(family, weight)
+                    if path is None:
+                        continue
+                    filename = os.path.basename(path)
+                    target = os.path.join(asset_dir, filename)
+                    if not os.path.exists(target):
+                        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+                        import shutil
+                        shutil.copyfile(path, tmp_path)
+                        os.replace(tmp_path, target)
+                    fmt = FONT_FORMATS[os.path.splitext(path)[1]][1]
+                    rules.append(_font_face(family, weight, f"url('{filename}') format('{fmt}')"))
+            with _atomic_output(css_path) as f:
+                f.write('\n'.join(rules))
+        return f'<link href="assets/fonts/{css_name}" rel="stylesheet">'
+
+    def _subset(self, path: str, glyphs: str) -> Tuple[bytes, str]:
+        """Réduit la police aux glyphes utilisés; renvoie la police complète sans fontTools"""
+        try:
+            from fontTools import subset
+        except ImportError:
+            with open(path, 'rb') as f:
+                return f.read(), os.path.splitext(path)[1]
+        import importlib.util
+
+        options = subset.Options()
+        # WOFF2 nécessite brotli, WOFF (zlib) est toujours disponible
+        options.flavor = 'woff2' if importlib.util.find_spec('brotli') else 'woff'
+        font = subset.load_font(path, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=glyphs)
+        subsetter.subset(font)
+        buffer = io.BytesIO()
+        subset.save_font(font, buffer, options)
+        return buffer.getvalue(), f".{options.flavor}"
+
+
+def _font_face(family: str, weight: int, src: str) -> str:
+    return (f"@font-face{{font-family:'{family}';font-style:normal;font-weight:{weight};"
+            f"font-display:swap;src:{src}}}")
+
+
+def fetch_fonts(template_dir: str = TEMPLATES, fonts_dir: str = FONTS) -> List[str]:
+    """
+    Télécharge une fois (sur une machine connectée) les polices Google Fonts
+    utilisées par les templates vers fonts_dir, au format TrueType
+
+    Returns:
+        Liste des fichiers téléchargés
+    """
+    import urllib.request
+
+    os.makedirs(fonts_dir, exist_ok=True)
+    downloaded = []
+    for name in sorted(os.listdir(template_dir)):
+        with open(os.path.join(template_dir, name), encoding='utf-8') as f:
+            match = GOOGLE_FONTS_URL.search(f.read())
+        if match is None:
+            continue
+        # Sans User-Agent de navigateur, Google Fonts renvoie des polices TrueType complètes
+        with urllib.request.urlopen(match.group(0).replace('&amp;', '&'), timeout=30) as response:
+            css = response.read().decode('utf-8')
+        for block in re.findall(r'@font-face\s*{([^}]*)}', css):
+            family = re.search(r"font-family:\s*'([^']+)'", block).group(1)
+            style = re.search(r'font-style:\s*(\w+)', block).group(1)
+            weight = re.search(r'font-weight:\s*(\d+)', block).group(1)
+            url = re.search(r'url\(([^)]+)\)', block).group(1)
+            ext = os.path.splitext(url)[1] or '.ttf'
+            target = os.path.join(fonts_dir, f"{family.replace(' ', '_')}-{weight}{ext}")
+            if style != 'normal' or os.path.exists(target):
+                continue
+            urllib.request.urlretrieve(url, target)
+            downloaded.append(target)
+    return downloaded
+
+
+# Côté du cadre photo de chaque template, en px CSS (.photo-container)
+PHOTO_SIZES = {'1': 110, '2': 100, '3': 100, '4': 100}
+PHOTO_FORMATS = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp',
+                 '.gif': 'image/gif'}
+
+
+class PhotoProcessor:
+    """
+    Prépare la photo du profil à la taille affichée par le template
+
+    La photo est recadrée au carré (comme object-fit: cover) à scale fois la
+    taille du cadre, pour rester nette à l'impression, puis recompressée en JPEG.
+    Les variantes sont gardées dans cache_dir sous le hash du contenu source:
+    une photo déjà traitée n'est jamais relue par Pillow, même d'un lot à l'autre.
+    Sans Pillow, la photo est reprise telle quelle (sans redimensionnement).
+    Le chemin peut être relatif au CV, absolu ou une URI file://.
+    """
+
+    def __init__(self, cache_dir: str = PHOTO_CACHE, scale: int = 2, quality: int = 85, cache_size: int = 256):
+        self.cache_dir = cache_dir
+        self.scale = scale
+        self.quality = quality
+        self._photos = FragmentCache(max_entries=cache_size, max_bytes=32 * 1024 * 1024)
+        self._digests = {}
+        self._warned = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _warn(self, key: str, message: str) -> None:
+        if key not in self._warned:
+            self._warned.add(key)
+            print(f"⚠️  {message}")
+
+    def resolve(self, photo: str, base_dir: Optional[str] = None) -> Optional[str]:
+        """Chemin local de la photo, ou None si elle est introuvable (ou distante)"""
+        if photo.startswith(('http://', 'https://', 'data:')):
+            return None
+        if photo.startswith('file:'):
+            from urllib.parse import urlparse
+            from urllib.request import url2pathname
+            photo = url2pathname(urlparse(photo).path)
+        path = os.path.expanduser(photo)
+        candidates = [path] if os.path.isabs(path) else [os.path.join(base_dir or '', path), path]
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        self._warn(photo, f"Photo introuvable: {photo} (CV généré sans photo)")
+        return None
+
+    def _source_digest(self, path: str) -> str:
+        # Hash du contenu, mémorisé tant que le fichier n'est pas modifié
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(key)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(block)
+            digest = self._digests[key] = hasher.hexdigest()
+        return digest
+
+    def process(self, path: str, size: int) -> Tuple[bytes, str]:
+        """
+        Variante de la photo pour un cadre de size px CSS
+
+        Returns:
+            (contenu, extension du fichier)
+        """
+        import importlib.util
+
+        if importlib.util.find_spec('PIL') is None:
+            self._warn('PIL', "Pillow n'est pas installé: photos reprises sans redimensionnement")
+            with open(path, 'rb') as f:
+                return f.read(), os.path.splitext(path)[1].lower()
+
+        pixels = size * self.scale
+        name = f"{self._source_digest(path)}-{pixels}-q{self.quality}.jpg"
+        content = self._photos.get(name)
+        if content is not None:
+            self.hits += 1
+            return content, '.jpg'
+        cache_path = os.path.join(self.cache_dir, name)
+        try:
+            with open(cache_path, 'rb') as f:
+                content = f.read()
+            self.hits += 1
+        except FileNotFoundError:
+            self.misses += 1
+            content = self._resize(path, pixels)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, cache_path)
+        self._photos.set(name, content)
+        return content, '.jpg'
+
+    def _resize(self, path: str, pixels: int) -> bytes:
+        from PIL import Image, ImageOps
+
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            # Jamais d'agrandissement: une petite photo garde sa définition
+            pixels = min(pixels, *image.size)
+            image = ImageOps.fit(image, (pixels, pixels), Image.LANCZOS)
+            if image.mode != 'RGB':
+                # Transparence sur le fond blanc du cadre
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                image = image.convert('RGBA')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+    def inline_src(self, path: str, size: int) -> str:
+        """Photo intégrée en data URI: le CV est autonome"""
+        import base64
+        content, ext = self.process(path, size)
+        return f"data:{PHOTO_FORMATS.get(ext, 'application/octet-stream')};base64,{base64.b64encode(content).decode('ascii')}"
+
+    def shared_src(self, path: str, size: int, output_dir: str) -> str:
+        """Photo écrite une fois dans <output_dir>/assets/photos, sous son hash, et son URL relative"""
+        content, ext = self.process(path, size)
+        name = f"{hashlib.blake2b(content, digest_size=8).hexdigest()}{ext}"
+        target = os.path.join(output_dir, 'assets', 'photos', name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+        return f'assets/photos/{name}'
+
+
+# CSV de l'export LinkedIn lus par parse_linkedin_export
+EXPORT_FILES = ('Profile.csv', 'Positions.csv', 'Education.csv', 'Skills.csv', 'Endorsement_Received_Info.csv')
+# Recommandations masquées ou refusées par le titulaire du profil: non comptées
+_HIDDEN_ENDORSEMENTS = frozenset({'REJECTED', 'HIDDEN', 'PENDING'})
+
+
+def _open_export_member(export_dir: str, archive: Optional['zipfile.ZipFile'], filename: str) -> Optional[IO[bytes]]:
+    """
+    Ouvre en binaire un CSV de l'export LinkedIn, depuis le dossier extrait ou
+    directement depuis l'archive ZIP (seul ce membre est décompressé, en flux).
+    Renvoie None si le CSV est absent.
+    """
+    if archive is None:
+        path = os.path.join(export_dir, filename)
+        return open(path, 'rb') if os.path.exists(path) else None
+    # Le CSV peut se trouver à la racine ou dans un sous-dossier de l'archive
+    member = next((info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.rsplit('/', 1)[-1] == filename), None)
+    return archive.open(member) if member is not None else None
+
+
+def _iter_export_csv(export_dir: str, archive: Optional['zipfile.ZipFile'], filename: str) -> Iterator[Dict]:
+    """
+    Itère sur les lignes d'un CSV de l'export LinkedIn, lu en flux: les gros
+    fichiers de l'export ne sont jamais lus. Un CSV absent ne produit aucune ligne.
+    """
+    import csv
+
+    raw = _open_export_member(export_dir, archive, filename)
+    if raw is None:
+        return
+    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _skill_key(name: str) -> str:
+    """Nom de compétence comparable entre Skills.csv et les recommandations"""
+    return ' '.join(name.split()).casefold()
+
+
+def _count_endorsements(export_dir: str, archive: Optional['zipfile.ZipFile']) -> Dict[str, int]:
+    """
+    Nombre de recommandations reçues par compétence (clé _skill_key), en une
+    seule lecture en flux d'Endorsement_Received_Info.csv: seules les colonnes
+    utiles sont extraites et la mémoire ne dépend que du nombre de compétences
+    distinctes, pas du nombre de lignes
+    """
+    import csv
+    from collections import Counter
+
+    raw = _open_export_member(export_dir, archive, 'Endorsement_Received_Info.csv')
+    if raw is None:
+        return {}
+    counts = Counter()
+    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        if 'Skill Name' not in header:
+            return {}
+        skill = header.index('Skill Name')
+        status = header.index('Endorsement Status') if 'Endorsement Status' in header else None
+        if status is None:
+            counts.update(row[skill] for row in reader if len(row) > skill)
+        else:
+            width = max(skill, status)
+            counts.update(row[skill] for row in reader
+                          if len(row) > width and row[status].upper() not in _HIDDEN_ENDORSEMENTS)
+    # Regroupement des variantes d'écriture sur les seules compétences distinctes
+    endorsements = {}
+    for name, count in counts.items():
+        key = _skill_key(name)
+        endorsements[key] = endorsements.get(key, 0) + count
+    return endorsements
+
+
+def export_fingerprint(export_path: str) -> str:
+    """
+    Empreinte du contenu d'un export LinkedIn: hash des CSV utiles, identique
+    pour une archive ZIP et pour son dossier extrait
+    """
+    import zipfile
+    digest = hashlib.blake2b(digest_size=16)
+    archive = zipfile.ZipFile(export_path) if os.path.isfile(export_path) else None
+    try:
+        for filename in EXPORT_FILES:
+            raw = _open_export_member(export_path, archive, filename)
+            if raw is None:
+                continue
+            digest.update(filename.encode('utf-8') + b'\0')
+            with raw:
+                for block in iter(lambda: raw.read(1 << 16), b''):
+                    digest.update(block)
+            digest.update(b'\0')
+    finally:
+        if archive is not None:
+            archive.close()
+    return digest.hexdigest()
+
+
+def _iter_export_paths(drop_dir: str) -> Iterator[str]:
+    """Exports LinkedIn d'un dossier de dépôt: archives ZIP et dossiers extraits"""
+    for entry in sorted(os.scandir(drop_dir), key=lambda entry: entry.name):
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_file() and entry.name.lower().endswith('.zip'):
+            yield entry.path
+        elif entry.is_dir() and any(os.path.exists(os.path.join(entry.path, name)) for name in EXPORT_FILES):
+            yield entry.path
+
+
+class IngestIndex:
+    """
+    Index des exports déjà importés: empreinte du contenu -> export d'origine
+    et profil produit. Un export déposé une seconde fois (renommé, ou en ZIP
+    après avoir été extrait) est reconnu et n'est pas relu.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self.entries
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        return self.entries.get(fingerprint)
+
+    def record(self, fingerprint: str, source: str, output_path: str) -> None:
+        self.entries[fingerprint] = {
+            'source': os.path.abspath(source),
+            'output': os.path.abspath(output_path),
+            'ingested_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with _atomic_output(self.path) as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+# ---------------------------------------------------------------------------
+# Base de profils
+# ---------------------------------------------------------------------------
+
+_PROFILE_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    headline TEXT NOT NULL,
+    skills TEXT NOT NULL,
+    experiences TEXT NOT NULL,
+    data TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS profile_search USING fts5(
+    name, headline, skills, experiences,
+    content='profiles', content_rowid='pk', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS profiles_ai AFTER INSERT ON profiles BEGIN
+    INSERT INTO profile_search(rowid, name, headline, skills, experiences)
+    VALUES (new.pk, new.name, new.headline, new.skills, new.experiences);
+END;
+CREATE TRIGGER IF NOT EXISTS profiles_ad AFTER DELETE ON profiles BEGIN
+    INSERT INTO profile_search(profile_search, rowid, name, headline, skills, experiences)
+    VALUES ('delete', old.pk, old.name, old.headline, old.skills, old.experiences);
+END;
+CREATE TRIGGER IF NOT EXISTS profiles_au AFTER UPDATE ON profiles BEGIN
+    INSERT INTO profile_search(profile_search, rowid, name, headline, skills, experiences)
+    VALUES ('delete', old.pk, old.name, old.headline, old.skills, old.experiences);
+    INSERT INTO profile_search(rowid, name, headline, skills, experiences)
+    VALUES (new.pk, new.name, new.headline, new.skills, new.experiences);
+END;
+"""
+PROFILE_SEARCH_FIELDS = ('name', 'headline', 'skills', 'experiences')
+
+
+def _fts_query(text: str, fields: Optional[Iterable[str]] = None) -> str:
+    """
+    Requête FTS5 à partir d'un texte libre: chaque mot est cherché tel quel
+    ("C++", "node.js"), tous les mots doivent être présents; un mot terminé
+    par * est un préfixe (kube*)
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*') and len(word) > 1
+        word = word.rstrip('*') if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+    if not terms:
+        raise ValueError("Recherche vide")
+    query = ' '.join(terms)
+    if fields:
+        unknown = set(fields) - set(PROFILE_SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Champs de recherche inconnus: {', '.join(sorted(unknown))}")
+        query = f"{{{' '.join(fields)}}} : ({query})"
+    return query
+
+
+class ProfileStore:
+    """
+    Base SQLite locale des profils, indexés par Profile.profile_id()
+
+    Chaque profil est gardé en JSON avec un index plein texte (FTS5, insensible
+    aux accents) sur le nom, le titre, les compétences et les expériences
+    (intitulé, entreprise, description), tenu à jour par des triggers. Une
+    recherche ou un accès par identifiant ne lit que les lignes concernées.
+    """
+
+    def __init__(self, path: str = PROFILE_DB):
+        import sqlite3
+
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('PRAGMA cache_size=-65536')
+            self._conn.executescript(_PROFILE_STORE_SCHEMA)
+
+    @staticmethod
+    def _row(item: Union[Profile, Dict]) -> Tuple:
+        # Un dictionnaire (JSON lu) est gardé tel quel: il est normalisé à la relecture
+        profile = Profile.coerce(item)
+        data = json.dumps(item if isinstance(item, dict) else profile.to_dict(), ensure_ascii=False,
+                          sort_keys=True, default=_json_default)
+        experiences = '\n'.join(' '.join(filter(None, (exp.title, exp.company, exp.description)))
+                                for exp in profile.experiences)
+        return (profile.profile_id(), profile.personal_info.name, profile.personal_info.headline,
+                ' | '.join(skill.name for skill in profile.skills), experiences, data,
+                hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest(),
+                datetime.now().isoformat(timespec='seconds'))
+
+    def put(self, profile: Union[Profile, Dict]) -> str:
+        """Ajoute ou met à jour un profil; renvoie son identifiant"""
+        row = self._row(profile)
+        with self._lock, self._conn:
+            self._upsert([row])
+        return row[0]
+
+    def put_many(self, profiles: Iterable[Union[Profile, Dict]], batch_size: int = 1000) -> int:
+        """
+        Ajoute ou met à jour des profils dans une seule transaction (annulée en
+        cas d'erreur). Un profil identique à celui en base n'est pas réécrit et
+        son index n'est pas touché.
+
+        Returns:
+            Nombre de profils lus
+        """
+        count = 0
+        with self._lock, self._conn:
+            batch = []
+            for profile in profiles:
+                batch.append(self._row(profile))
+                if len(batch) >= batch_size:
+                    self._upsert(batch)
+                    count += len(batch)
+                    batch = []
+            self._upsert(batch)
+            count += len(batch)
+        return count
+
+    def _upsert(self, rows: List[Tuple]) -> None:
+        self._conn.executemany(
+            'INSERT INTO profiles (id, name, headline, skills, experiences, data, hash, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET name = excluded.name, headline = excluded.headline, '
+            'skills = excluded.skills, experiences = excluded.experiences, data = excluded.data, '
+            'hash = excluded.hash, updated_at = excluded.updated_at WHERE profiles.hash != excluded.hash',
+            rows)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        """Profil par identifiant, ou None"""
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+        return Profile.from_dict(json.loads(row[0])) if row else None
+
+    def delete(self, profile_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,)).rowcount > 0
+
+    def search(self, text: str, fields: Optional[Iterable[str]] = None, limit: int = 50) -> List[Dict]:
+        """
+        Profils contenant tous les mots de text, les plus pertinents d'abord
+
+        Args:
+            text: Mots cherchés (kube* pour un préfixe)
+            fields: Champs où chercher parmi PROFILE_SEARCH_FIELDS (par défaut: tous)
+            limit: Nombre maximal de résultats
+
+        Returns:
+            Liste de {id, name, headline, score}
+        """
+        query = _fts_query(text, fields)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.id, p.name, p.headline, bm25(profile_search) AS score '
+                'FROM profile_search JOIN profiles p ON p.pk = profile_search.rowid '
+                'WHERE profile_search MATCH ? ORDER BY score LIMIT ?', (query, limit)).fetchall()
+        return [{'id': id_, 'name': name, 'headline': headline, 'score': -score}
+                for id_, name, headline, score in rows]
+
+    def __contains__(self, profile_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM profiles WHERE id = ?', (profile_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM profiles').fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'ProfileStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Destinations de sortie
+# ---------------------------------------------------------------------------
+
+class OutputSink:
+    """
+    Destination des CV générés autre qu'un fichier par CV (passée à
+    generate_cv ou render_many à la place du chemin de sortie)
+
+    Les écritures sont regroupées par lots de batch_size CV: chaque lot est
+    écrit puis synchronisé sur disque (fsync) une seule fois. Un index
+    (JSON Lines, en ajout seul) associe à chaque identifiant de profil ses
+    entrées par template; il est synchronisé après les données qu'il
+    référence (sans index_path, l'index n'est tenu qu'en mémoire). Les
+    sous-classes implémentent _write_batch et _sync.
+    """
+
+    def __init__(self, index_path: Optional[str], batch_size: int = 256):
+        self.index_path = index_path
+        self.batch_size = max(1, batch_size)
+        self.index = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        if index_path is not None and os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    self.index.setdefault(entry['profile_id'], {})[entry['template']] = entry
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, profile_id: str, template: str, html: str) -> Dict:
+        """
+        Ajoute un CV au lot en cours (écrit au plus tard au prochain flush)
+
+        Returns:
+            Entrée de l'index {profile_id, template, name, sha, size, created_at}
+        """
+        content = html.encode('utf-8')
+        sha = hashlib.blake2b(content, digest_size=16).hexdigest()
+        entry = {
+            'profile_id': profile_id,
+            'template': template,
+            # Nom dérivé du contenu: un nouveau rendu n'écrase jamais le précédent
+            'name': f"{profile_id}/cv_template_{template}.{sha[:12]}.html",
+            'sha': sha,
+            'size': len(content),
+            'created_at': datetime.now().isoformat(timespec='seconds')
+        }
+        with self._lock:
+            self._pending.append((entry, content))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+        return entry
+
+    def flush(self) -> None:
+        """Écrit et synchronise le lot en cours, puis l'index"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._write_batch(batch)
+        self._sync()
+        if self.index_path is None:
+            for entry, _ in batch:
+                self.index.setdefault(entry['profile_id'], {})[entry['template']] = entry
+            return
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for entry, _ in batch:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self.index.setdefault(entry['profile_id'], {})[entry['template']] = entry
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_batch(self, batch: List[Tuple[Dict, bytes]]) -> None:
+        raise NotImplementedError
+
+    def _sync(self) -> None:
+        raise NotImplementedError
+
+
+class ZipSink(OutputSink):
+    """
+    CV ajoutés dans une seule archive ZIP (index: <archive>.index.jsonl)
+
+    L'archive est rouverte à chaque lot et son répertoire central réécrit à
+    la fermeture du lot: un arrêt brutal entre deux lots laisse une archive
+    lisible contenant tous les CV déjà référencés par l'index.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256):
+        import zipfile
+
+        self._zipfile = zipfile
+        super().__init__(f"{path}.index.jsonl", batch_size)
+        self.path = path
+        self._names = set()
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as archive:
+                self._names = set(archive.namelist())
+
+    def _write_batch(self, batch: List[Tuple[Dict, bytes]]) -> None:
+        # Même nom = même contenu: rien à réécrire
+        new = [(entry, content) for entry, content in batch if entry['name'] not in self._names]
+        if not new:
+            return
+        with self._zipfile.ZipFile(self.path, 'a', self._zipfile.ZIP_DEFLATED) as archive:
+            for entry, content in new:
+                archive.writestr(entry['name'], content)
+                self._names.add(entry['name'])
+
+    def _sync(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                os.fsync(f.fileno())
+
+
+class TarSink(OutputSink):
+    """CV ajoutés dans une seule archive tar non compressée (index: <archive>.index.jsonl)"""
+
+    def __init__(self, path: str, batch_size: int = 256):
+        import tarfile
+
+        super().__init__(f"{path}.index.jsonl", batch_size)
+        self.path = path
+        self._archive = tarfile.open(path, 'a')
+        self._names = set(self._archive.getnames())
+
+    def _write_batch(self, batch: List[Tuple[Dict, bytes]]) -> None:
+        import tarfile
+
+        for entry, content in batch:
+            if entry['name'] in self._names:
+                continue
+            info = tarfile.TarInfo(entry['name'])
+            info.size = len(content)
+            info.mtime = time.time()
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(content))
+            self._names.add(entry['name'])
+
+    def _sync(self) -> None:
+        self._archive.fileobj.flush()
+        os.fsync(self._archive.fileobj.fileno())
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._archive.close()
+
+
+class ContentStore(OutputSink):
+    """
+    Magasin adressé par contenu: chaque HTML distinct est stocké une seule fois,
+    compressé, dans un fichier pack en ajout seul (root/objects.pack), à la
+    position donnée par la table des objets (root/objects.jsonl: hash, position,
+    longueur). L'index (root/index.jsonl) associe chaque profil et template au
+    hash de son dernier rendu; les rendus précédents restent lisibles par leur hash.
+    """
+
+    def __init__(self, root: str, batch_size: int = 256):
+        import zlib
+
+        self._zlib = zlib
+        os.makedirs(root, exist_ok=True)
+        super().__init__(os.path.join(root, 'index.jsonl'), batch_size)
+        self.root = root
+        self.objects = {}
+        self.deduplicated = 0
+        self._new_objects = []
+        self._objects_path = os.path.join(root, 'objects.jsonl')
+        if os.path.exists(self._objects_path):
+            with open(self._objects_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        sha, offset, length = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.objects[sha] = (offset, length)
+        self._pack = open(os.path.join(root, 'objects.pack'), 'ab')
+
+    def _write_batch(self, batch: List[Tuple[Dict, bytes]]) -> None:
+        self._new_objects = []
+        for entry, content in batch:
+            if entry['sha'] in self.objects:
+                self.deduplicated += 1
+                continue
+            data = self._zlib.compress(content, 6)
+            offset = self._pack.tell()
+            self._pack.write(data)
+            self.objects[entry['sha']] = (offset, len(data))
+            self._new_objects.append((entry['sha'], offset, len(data)))
+
+    def _sync(self) -> None:
+        # Les objets sont durables avant que la table des objets (puis l'index) ne les référence
+        self._pack.flush()
+        os.fsync(self._pack.fileno())
+        if self._new_objects:
+            with open(self._objects_path, 'a', encoding='utf-8') as f:
+                for record in self._new_objects:
+                    f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self, profile_id: str, template: str) -> Optional[str]:
+        """Dernier CV stocké pour ce profil et ce template"""
+        entry = self.index.get(profile_id, {}).get(template)
+        return None if entry is None else self.read_object(entry['sha'])
+
+    def read_object(self, sha: str) -> str:
+        """CV stocké sous ce hash"""
+        self.flush()
+        offset, length = self.objects[sha]
+        with open(os.path.join(self.root, 'objects.pack'), 'rb') as f:
+            f.seek(offset)
+            return self._zlib.decompress(f.read(length)).decode('utf-8')
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._pack.close()
+
+
+class _CollectingSink(OutputSink):
+    """Garde le CV rendu en mémoire: les workers du rendu par lots le renvoient à la vraie destination"""
+
+    def __init__(self):
+        super().__init__(None, batch_size=1)
+        self.rendered = None
+
+    def write(self, profile_id: str, template: str, html: str) -> Dict:
+        self.rendered = (profile_id, template, html)
+        return {'profile_id': profile_id, 'template': template}
+
+    def close(self) -> None:
+        pass
+
+
+OUTPUT_SINKS = {
+    'zip': ZipSink,
+    'tar': TarSink,
+    'store': ContentStore
+}
+
+
+def open_sink(spec: str, batch_size: int = 256) -> OutputSink:
+    """Ouvre une destination décrite par zip:cvs.zip, tar:cvs.tar ou store:outputs/store"""
+    kind, _, path = spec.partition(':')
+    if kind not in OUTPUT_SINKS or not path:
+        raise ValueError(f"Destination invalide: {spec!r} (attendu: zip:FICHIER, tar:FICHIER ou store:DOSSIER)")
+    return OUTPUT_SINKS[kind](path, batch_size=batch_size)
+
 
 class LinkedInCVGenerator:
     """Générateur de CV à partir des données LinkedIn"""
     
-    def __init__(self, template_dir: str = "templates"):
+    def __init__(self, template_dir: str = "templates", fragment_cache_size: int = 1024,
+                 fragment_cache_bytes: int = 8 * 1024 * 1024, metrics: Optional[Metrics] = None,
+                 bytecode_cache: bool = True, store: Optional[ProfileStore] = None,
+                 profiler: Optional[PipelineProfiler] = None):
         """
         Initialise le générateur avec le répertoire des templates
         
         Args:
             template_dir: Chemin vers le dossier contenant les templates Jinja2
+            fragment_cache_size: Nombre maximal de sections rendues gardées en
+                cache (0 pour désactiver le cache de fragments)
+            fragment_cache_bytes: Taille maximale du cache de fragments en caractères
+            metrics: Métriques du pipeline (par défaut: désactivées, voir InMemoryMetrics)
+            bytecode_cache: Charge les templates compilés à l'avance depuis
+                <template_dir>/__pycache__ (voir compile_templates) et y garde
+                ceux compilés depuis la source
+            store: Base de profils où sont enregistrés les profils saisis,
+                importés d'un export LinkedIn ou chargés d'un JSON
+            profiler: Profilage CPU et mémoire de chaque generate_cv (voir PipelineProfiler)
         """
         self.template_dir = template_dir
-        self.env = Environment(loader=FileSystemLoader(template_dir))
+        self.store = store
+        self.compiled_dir = os.path.join(template_dir, '__pycache__') if bytecode_cache else None
+        self.fragment_cache = FragmentCache(fragment_cache_size, fragment_cache_bytes) if fragment_cache_size > 0 else None
+        # Un Environment par mode de sortie (minification, feuille de style partagée)
+        self._environments = {}
+        self._template_sources = {}
+        self._loaded_templates = {}
+        self._written_stylesheets = set()
+        self.font_bundler = FontBundler()
+        self.photo_processor = PhotoProcessor()
+        self.metrics = metrics or NULL_METRICS
+        self.profiler = profiler
     
-    def parse_linkedin_export(self, export_dir: str) -> Dict:
+    def parse_linkedin_export(self, export_dir: str) -> Optional[Profile]:
         """
         Parse l'archive d'export de données LinkedIn
         
         Pour obtenir votre archive:
         1. LinkedIn > Paramètres et confidentialité
         2. Confidentialité des données > Obtenir une copie de vos données
-        3. Sélectionnez tout ou "Profil", "Positions", "Education", "Skills"
-        4. Téléchargez et extrayez l'archive ZIP
+        3. Sélectionnez tout ou "Profil", "Positions", "Education", "Skills", "Endorsements"
+        4. Téléchargez l'archive ZIP (inutile de l'extraire)
         
         Args:
-            export_dir: Chemin vers le dossier extrait de l'archive LinkedIn
+            export_dir: Chemin vers l'archive ZIP LinkedIn ou vers son dossier extrait.
+                Seuls les CSV utiles sont lus dans l'archive, sans extraction.
             
         Returns:
-            Dictionnaire structuré pour le template
+            Profil normalisé pour le template, ou None si l'export est illisible
+        """
+        try:
+            return self.read_linkedin_export(export_dir)
+        except Exception as e:
+            print(f"❌ Erreur lors de la lecture de l'export LinkedIn: {e}")
+            print("Assurez-vous de pointer vers l'archive ZIP ou vers son dossier extrait.")
+            return None
+
+    def read_linkedin_export(self, export_dir: str) -> Profile:
+        """
+        Lit un export LinkedIn comme parse_linkedin_export, mais lève l'erreur
+        au lieu de l'afficher (import par lots, où chaque échec est rapporté)
+
+        Args:
+            export_dir: Chemin vers l'archive ZIP LinkedIn ou vers son dossier extrait
+
+        Returns:
+            Profil normalisé pour le template
         """
-        import csv
-        
         data = {
             'personal_info': {},
             'experiences': [],
@@ -53,114 +2467,84 @@ class LinkedInCVGenerator:
             'hobbies': []
         }
         
+        archive = None
+        start = time.perf_counter()
         try:
+            if os.path.isfile(export_dir):
+                import zipfile
+                archive = zipfile.ZipFile(export_dir)
+            
             # Profile.csv - Informations personnelles
-            profile_file = os.path.join(export_dir, 'Profile.csv')
-            if os.path.exists(profile_file):
-                with open(profile_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    profile = next(reader)
-                    data['personal_info'] = {
-                        'name': f"{profile.get('First Name', '')} {profile.get('Last Name', '')}",
-                        'headline': profile.get('Headline', ''),
-                        'summary': profile.get('Summary', ''),
-                        'location': profile.get('Location', ''),
-                        'email': profile.get('Email Address', ''),
-                        'phone': '',
-                        'linkedin_url': f"linkedin.com/in/{profile.get('Public Profile URL', '').split('/')[-1]}"
-                    }
+            rows = _iter_export_csv(export_dir, archive, 'Profile.csv')
+            profile = next(rows, None)
+            rows.close()
+            if profile is not None:
+                data['personal_info'] = {
+                    'name': f"{profile.get('First Name', '')} {profile.get('Last Name', '')}",
+                    'headline': profile.get('Headline', ''),
+                    'summary': profile.get('Summary', ''),
+                    'location': profile.get('Location', ''),
+                    'email': profile.get('Email Address', ''),
+                    'phone': '',
+                    'linkedin_url': f"linkedin.com/in/{profile.get('Public Profile URL', '').split('/')[-1]}"
+                }
             
             # Positions.csv - Expériences professionnelles
-            positions_file = os.path.join(export_dir, 'Positions.csv')
-            if os.path.exists(positions_file):
-                with open(positions_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        exp = {
-                            'title': row.get('Title', ''),
-                            'company': row.get('Company Name', ''),
-                            'location': row.get('Location', ''),
-                            'start_date': self._format_linkedin_export_date(row.get('Started On', '')),
-                            'end_date': self._format_linkedin_export_date(row.get('Finished On', '')) or 'Présent',
-                            'description': row.get('Description', ''),
-                            'is_current': not row.get('Finished On')
-                        }
-                        data['experiences'].append(exp)
+            for row in _iter_export_csv(export_dir, archive, 'Positions.csv'):
+                exp = {
+                    'title': row.get('Title', ''),
+                    'company': row.get('Company Name', ''),
+                    'location': row.get('Location', ''),
+                    # Dates brutes (2020-03, Mar 2020...): converties une seule fois par le modèle
+                    'start_date': row.get('Started On', ''),
+                    'end_date': row.get('Finished On', ''),
+                    'description': row.get('Description', ''),
+                    'is_current': not row.get('Finished On')
+                }
+                data['experiences'].append(exp)
             
             # Education.csv - Formation
-            education_file = os.path.join(export_dir, 'Education.csv')
-            if os.path.exists(education_file):
-                with open(education_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        edu = {
-                            'school': row.get('School Name', ''),
-                            'degree': row.get('Degree Name', ''),
-                            'field': row.get('Notes', ''),
-                            'start_date': self._format_linkedin_export_date(row.get('Start Date', '')),
-                            'end_date': self._format_linkedin_export_date(row.get('End Date', '')),
-                            'description': row.get('Activities', '')
-                        }
-                        data['education'].append(edu)
-            
-            # Skills.csv - Compétences
-            skills_file = os.path.join(export_dir, 'Skills.csv')
-            if os.path.exists(skills_file):
-                with open(skills_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        data['skills'].append({
-                            'name': row.get('Name', ''),
-                            'endorsements': 0
-                        })
+            for row in _iter_export_csv(export_dir, archive, 'Education.csv'):
+                edu = {
+                    'school': row.get('School Name', ''),
+                    'degree': row.get('Degree Name', ''),
+                    'field': row.get('Notes', ''),
+                    'start_date': row.get('Start Date', ''),
+                    'end_date': row.get('End Date', ''),
+                    'description': row.get('Activities', '')
+                }
+                data['education'].append(edu)
             
-            data['generated_date'] = datetime.now().strftime('%d/%m/%Y')
-            return data
+            # Skills.csv - Compétences, avec leurs recommandations (le profil les classe)
+            endorsements = _count_endorsements(export_dir, archive)
+            for row in _iter_export_csv(export_dir, archive, 'Skills.csv'):
+                name = row.get('Name', '')
+                data['skills'].append({
+                    'name': name,
+                    'endorsements': endorsements.get(_skill_key(name), 0)
+                })
             
-        except Exception as e:
-            print(f"❌ Erreur lors de la lecture de l'export LinkedIn: {e}")
-            print("Assurez-vous d'avoir extrait l'archive ZIP et de pointer vers le bon dossier.")
-            return None
-    
-    def _format_linkedin_export_date(self, date_str: str) -> Optional[str]:
-        """
-        Formate une date de l'export LinkedIn (format: YYYY-MM-DD ou YYYY)
-        
-        Args:
-            date_str: Date au format de l'export
+            self.metrics.observe('stage_seconds', time.perf_counter() - start, stage='parse_export')
+            with self.metrics.timer('stage_seconds', stage='normalize'):
+                normalized = Profile.from_dict(data)
+            self.metrics.inc('profiles_parsed_total')
+            self._remember(normalized)
+            return normalized
             
-        Returns:
-            Date formatée en français
-        """
-        if not date_str:
-            return None
-        
-        months_fr = [
-            'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
-            'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'
-        ]
-        
-        try:
-            # Format YYYY-MM-DD
-            if '-' in date_str:
-                parts = date_str.split('-')
-                year = parts[0]
-                if len(parts) > 1 and parts[1]:
-                    month = int(parts[1])
-                    return f"{months_fr[month-1]} {year}"
-                return year
-            # Format YYYY uniquement
-            return date_str
-        except:
-            return date_str
+        except Exception:
+            self.metrics.inc('export_failures_total')
+            raise
+        finally:
+            if archive is not None:
+                archive.close()
     
-    def generate_from_manual_input(self, output_path: str = "data.json") -> Dict:
+    def generate_from_manual_input(self, output_path: str = "data.json") -> Profile:
         """
         Génère un CV via saisie interactive
         Méthode recommandée pour les profils personnels LinkedIn
         
         Returns:
-            Dictionnaire structuré pour le template
+            Profil normalisé pour le template
         """
         print("\n" + "="*60)
         print("CRÉATION DE CV - SAISIE INTERACTIVE")
@@ -171,8 +2555,7 @@ class LinkedInCVGenerator:
             'experiences': [],
             'education': [],
             'skills': [],
-            'hobbies': [],
-            'generated_date': datetime.now().strftime('%d/%m/%Y')
+            'hobbies': []
         }
         
         # Informations personnelles
@@ -257,40 +2640,601 @@ class LinkedInCVGenerator:
                     'endorsements': 0
                 })
 
-        # Hobbies (optionnel)
-        print("\n🎲 HOBBIES (OPTIONNEL)")
-        print("Entrez vos hobbies séparés par des virgules (laisser vide si aucun):")
-        hobbies_input = input("Hobbies: ").strip()
-        if hobbies_input:
-            for h in hobbies_input.split(','):
-                item = h.strip()
-                if item:
-                    data['hobbies'].append(item)
-        
-        print("\n✅ Saisie terminée!")
+        # Hobbies (optionnel)
+        print("\n🎲 HOBBIES (OPTIONNEL)")
+        print("Entrez vos hobbies séparés par des virgules (laisser vide si aucun):")
+        hobbies_input = input("Hobbies: ").strip()
+        if hobbies_input:
+            for h in hobbies_input.split(','):
+                item = h.strip()
+                if item:
+                    data['hobbies'].append(item)
+        
+        print("\n✅ Saisie terminée!")
+
+        profile = Profile.from_dict(data)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=4)
+        self._remember(profile)
+
+        return profile
+
+    def load_profile(self, path: str) -> Profile:
+        """
+        Charge un profil JSON (- pour l'entrée standard) et l'enregistre dans
+        la base de profils du générateur
+        """
+        if path == '-':
+            profile = Profile.from_dict(json.load(sys.stdin))
+        else:
+            profile = Profile.load(path)
+        self._remember(profile)
+        return profile
+
+    def _remember(self, profile: Profile) -> None:
+        if self.store is not None:
+            self.store.put(profile)
+    
+    def generate_cv(self, choix: str, data: Union[Profile, Dict],
+                    output_path: Union[str, IO, 'socket.socket', OutputSink] = "cv.html",
+                    stream: bool = False, buffer_size: int = 64 * 1024,
+                    fonts: Optional[str] = None, fit: bool = False, minify: bool = False,
+                    styles: str = 'inline', photos: Optional[str] = None) -> Union[str, IO, 'socket.socket']:
+        """
+        Génère le CV HTML à partir des données
+        
+        Args:
+            data: Profil, ou dictionnaire au format JSON (normalisé à la volée)
+            output_path: Chemin du fichier HTML de sortie (compressé en gzip s'il
+                se termine par .gz), ou destination déjà ouverte: fichier texte
+                ou binaire, sys.stdout, gzip.GzipFile, socket, archive ou
+                magasin de CV (OutputSink, indexé par Profile.profile_id())
+            stream: Écrit le HTML au fil du rendu au lieu de construire tout le
+                document en mémoire
+            buffer_size: Taille minimale (en caractères) des blocs écrits en
+                mode streaming
+            fonts: None pour charger les polices depuis Google Fonts, "inline"
+                pour les intégrer (réduites aux glyphes du profil) dans le CV,
+                "shared" pour les référencer depuis outputs/assets/fonts
+                (voir FontBundler)
+            fit: Réduit le profil (descriptions, compétences, expériences les
+                plus anciennes) pour tenir sur une page A4, d'après l'estimation
+                de mise en page (voir fit_profile). Le template "auto" choisit
+                le premier template où le profil tient.
+            minify: Utilise le template minifié (HTML et CSS minifiés une seule
+                fois, à la compilation du template)
+            styles: "inline" pour garder la feuille de style dans le CV,
+                "shared" pour la référencer depuis outputs/assets/css, écrite
+                une seule fois sous un nom contenant son hash
+            photos: None pour garder le chemin de la photo tel quel, "inline"
+                pour l'intégrer redimensionnée au cadre du template, "shared"
+                pour l'écrire dans assets/photos à côté du CV (voir PhotoProcessor)
+            
+        Returns:
+            Chemin du fichier généré (ou la destination fournie)
+        """
+        if self.profiler is None:
+            return self._generate_cv(choix, data, output_path, stream, buffer_size, fonts, fit, minify, styles, photos)
+        with self.profiler.track(choix):
+            return self._generate_cv(choix, data, output_path, stream, buffer_size, fonts, fit, minify, styles, photos)
+
+    def _generate_cv(self, choix: str, data: Union[Profile, Dict], output_path, stream: bool, buffer_size: int,
+                     fonts: Optional[str], fit: bool, minify: bool, styles: str, photos: Optional[str]):
+        metrics = self.metrics
+        if isinstance(data, Profile) or not metrics.enabled:
+            profile = Profile.coerce(data)
+        else:
+            with metrics.timer('stage_seconds', stage='normalize'):
+                profile = Profile.coerce(data)
+        choix, profile = self._fit_page(choix, profile, fit)
+        template = self._load_template(choix, minify, styles)
+        if self.profiler is not None:
+            self.profiler.template_loaded(template)
+        context = profile.context()
+        if styles == 'shared':
+            context['stylesheet_href'] = self._shared_stylesheet(choix, minify, output_path)
+        if fonts is not None:
+            context['fonts_html'] = self._fonts_html(choix, profile, output_path, fonts)
+        if photos is not None and profile.personal_info.photo:
+            personal_info = copy.copy(profile.personal_info)
+            personal_info.photo = self._photo_src(choix, personal_info.photo, output_path, photos)
+            context['personal_info'] = personal_info
+        render_time = [0.0]
+        if stream:
+            chunks = template.generate(**context)
+            if metrics.enabled:
+                # Rendu paresseux: son temps est mesuré à la production de chaque morceau
+                chunks = _timed_chunks(chunks, render_time)
+        elif metrics.enabled:
+            start = time.perf_counter()
+            chunks = (template.render(**context),)
+            render_time[0] = time.perf_counter() - start
+        else:
+            chunks = (template.render(**context),)
+        if self.profiler is not None and not stream:
+            self.profiler.checkpoint()
+        start = time.perf_counter()
+        
+        if isinstance(output_path, (str, os.PathLike)):
+            # Écriture dans un fichier temporaire puis renommage atomique
+            with _atomic_output(output_path) as f:
+                written = _write_chunks(f, chunks, buffer_size)
+            if metrics.enabled:
+                written = os.path.getsize(output_path)
+        elif isinstance(output_path, OutputSink):
+            html = ''.join(chunks)
+            output_path.write(profile.profile_id(), choix, html)
+            written = len(html.encode('utf-8')) if metrics.enabled else 0
+        elif _is_socket(output_path):
+            with output_path.makefile('wb') as f:
+                written = _write_chunks(f, chunks, buffer_size)
+        else:
+            written = _write_chunks(output_path, chunks, buffer_size)
+            output_path.flush()
+        
+        if metrics.enabled:
+            metrics.observe('render_seconds', render_time[0], template=choix)
+            metrics.observe('stage_seconds', time.perf_counter() - start - render_time[0], stage='write')
+            metrics.inc('bytes_written_total', written)
+            metrics.inc('cvs_generated_total', template=choix)
+        return output_path
+
+    def _fit_page(self, choix: str, profile: Profile, fit: bool) -> Tuple[str, Profile]:
+        """Résout le template "auto" et, si demandé, réduit le profil à une page A4"""
+        if choix != 'auto' and not fit:
+            return choix, profile
+        with self.metrics.timer('stage_seconds', stage='page_fit'):
+            if choix == 'auto':
+                choix = choose_template(profile)
+            if fit:
+                profile, actions = fit_profile(profile, choix)
+                if actions:
+                    self.metrics.inc('profiles_trimmed_total', template=choix)
+        return choix, profile
+
+    @property
+    def env(self) -> 'Environment':
+        """Environment Jinja2 du rendu par défaut (HTML non minifié, CSS intégrée)"""
+        return self._environment(minify=False, styles='inline')
+
+    def _environment(self, minify: bool, styles: str) -> 'Environment':
+        """Environment Jinja2 d'un mode de sortie, créé au premier usage (le cache de fragments est partagé)"""
+        if styles not in ('inline', 'shared'):
+            raise ValueError(f"Mode de feuille de style inconnu: {styles!r} (attendu: 'inline' ou 'shared')")
+        env = self._environments.get((minify, styles))
+        if env is None:
+            jinja = _jinja()
+            loader = jinja.CVTemplateLoader(self.template_dir, minify=minify, external_css=styles == 'shared')
+            bytecode_cache = None
+            if self.compiled_dir:
+                variant = f"{'min' if minify else 'src'}-{styles}"
+                bytecode_cache = jinja.TemplateBytecodeCache(self.compiled_dir, variant)
+            env = jinja.Environment(loader=loader, extensions=[jinja.FragmentCacheExtension],
+                                    bytecode_cache=bytecode_cache)
+            env.fragment_cache = self.fragment_cache
+            env = self._environments.setdefault((minify, styles), env)
+        return env
+
+    def _shared_stylesheet(self, choix: str, minify: bool, output_path) -> str:
+        """Écrit (une seule fois) la feuille de style partagée du template et renvoie son URL relative"""
+        if not isinstance(output_path, (str, os.PathLike)):
+            raise ValueError("Le mode de feuille de style 'shared' nécessite un chemin de sortie")
+        loader = self._environment(minify, 'shared').loader
+        css, digest = loader.stylesheets[f'cv_template_{choix}.html']
+        css_name = f'cv_template_{choix}.{digest}.css'
+        css_path = os.path.join(os.path.dirname(os.path.abspath(output_path)), 'assets', 'css', css_name)
+        if css_path not in self._written_stylesheets:
+            if not os.path.exists(css_path):
+                os.makedirs(os.path.dirname(css_path), exist_ok=True)
+                with _atomic_output(css_path) as f:
+                    f.write(css)
+            self._written_stylesheets.add(css_path)
+        return f'assets/css/{css_name}'
+
+    def _load_template(self, choix: str, minify: bool = False, styles: str = 'inline'):
+        """Template compilé par Jinja2 (mis en cache par l'Environment), avec ses métriques"""
+        name = f'cv_template_{choix}.html'
+        env = self._environment(minify, styles)
+        if not self.metrics.enabled:
+            return env.get_template(name)
+        with self.metrics.timer('stage_seconds', stage='template_load'):
+            template = env.get_template(name)
+        # Un template recompilé (premier chargement, fichier modifié) est un nouvel objet
+        key = (name, minify, styles)
+        hit = self._loaded_templates.get(key) is template
+        self._loaded_templates[key] = template
+        self.metrics.inc('template_cache_hits_total' if hit else 'template_cache_misses_total', template=choix)
+        return template
+
+    def _template_source(self, choix: str) -> Tuple[str, str]:
+        """
+        Source d'un template et son hash (incluant la version de Jinja2 qui le
+        compile), relus uniquement quand le fichier est modifié
+        """
+        name = f'cv_template_{choix}.html'
+        cached = self._template_sources.get(name)
+        if cached is not None:
+            filename, mtime, source, digest = cached
+            try:
+                if os.stat(filename).st_mtime_ns == mtime:
+                    return source, digest
+            except OSError:
+                pass
+        # Lecture directe (sans Jinja2): un CV à jour dans le manifeste ne charge pas Jinja2
+        filename = os.path.join(self.template_dir, name)
+        with open(filename, encoding='utf-8') as f:
+            source = f.read()
+        digest = _template_digest(source)
+        self._template_sources[name] = (filename, os.stat(filename).st_mtime_ns, source, digest)
+        return source, digest
+
+    def template_hash(self, choix: str) -> str:
+        """Hash de la source d'un template, recalculé uniquement quand le fichier est modifié"""
+        return self._template_source(choix)[1]
+
+    def compile_templates(self, choices: Iterable[str] = ('1', '2', '3', '4'),
+                          variants: Iterable[Tuple[bool, str]] = ((False, 'inline'), (False, 'shared'),
+                                                                  (True, 'inline'), (True, 'shared'))
+                          ) -> List[Tuple[str, str]]:
+        """
+        Compile les templates à l'avance dans <template_dir>/__pycache__ (étape
+        de build ou de déploiement): les processus suivants chargent le bytecode
+
+        Args:
+            choices: Numéros des templates
+            variants: Couples (minify, styles) des modes de sortie à compiler
+
+        Returns:
+            Liste (artefact, statut), statut "compiled" (absent ou périmé) ou "fresh"
+        """
+        if not self.compiled_dir:
+            raise ValueError("Le cache de bytecode est désactivé (bytecode_cache=False)")
+        results = []
+        for minify, styles in variants:
+            env = self._environment(minify, styles)
+            cache = env.bytecode_cache
+            for choix in choices:
+                name = f'cv_template_{choix}.html'
+                source, filename, _ = env.loader.get_source(env, name)
+                fresh = cache.get_bucket(env, name, filename, source).code is not None
+                if not fresh:
+                    env.get_template(name)
+                path = cache.path(cache.get_cache_key(name))
+                if not os.path.exists(path):
+                    raise OSError(f"Impossible d'écrire le template compilé {path}")
+                results.append((path, 'fresh' if fresh else 'compiled'))
+        return results
+
+    def build_cv(self, choix: str, data: Union[Profile, Dict], output_path: str, manifest: BuildManifest,
+                 fit: bool = False) -> str:
+        """
+        Génère un CV de manière incrémentale à l'aide du manifeste de build
+
+        Le rendu est sauté si le template et les données n'ont pas changé depuis
+        la dernière génération, et le fichier n'est réécrit que si son contenu
+        diffère réellement.
+
+        Args:
+            choix: Numéro du template
+            data: Profil, ou dictionnaire au format JSON
+            output_path: Chemin du fichier HTML de sortie
+            manifest: Manifeste de build (à sauvegarder par l'appelant)
+            fit: Réduit le profil pour tenir sur une page A4 (voir generate_cv)
+
+        Returns:
+            "skipped" (rien à faire), "unchanged" (rendu identique, fichier
+            conservé) ou "written"
+        """
+        choix, profile = self._fit_page(choix, Profile.coerce(data), fit)
+        template_hash = self.template_hash(choix)
+        data_hash = _content_hash(profile)
+        if manifest.is_fresh(output_path, template_hash, data_hash):
+            self.metrics.inc('cvs_built_total', template=choix, status='skipped')
+            return 'skipped'
+
+        template = self._load_template(choix)
+        with self.metrics.timer('render_seconds', template=choix):
+            html_content = template.render(**profile.context())
+        output_hash = hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).hexdigest()
+        entry = manifest.get(output_path)
+        if entry is not None and entry['output_hash'] == output_hash and os.path.exists(output_path):
+            status = 'unchanged'
+        else:
+            with self.metrics.timer('stage_seconds', stage='write'):
+                with _atomic_output(output_path) as f:
+                    f.write(html_content)
+            if self.metrics.enabled:
+                self.metrics.inc('bytes_written_total', os.path.getsize(output_path))
+            status = 'written'
+        self.metrics.inc('cvs_built_total', template=choix, status=status)
+        manifest.record(output_path, f'cv_template_{choix}.html', template_hash, data_hash, output_hash)
+        return status
+
+    def _fonts_html(self, choix: str, profile: Profile, output_path, fonts: str) -> str:
+        """Balises remplaçant le chargement des polices depuis Google Fonts"""
+        source, _ = self._template_source(choix)
+        if fonts == 'inline':
+            return self.font_bundler.inline_html(source, _collect_text(profile.to_dict()))
+        if fonts == 'shared':
+            if not isinstance(output_path, (str, os.PathLike)):
+                raise ValueError("Le mode de polices 'shared' nécessite un chemin de sortie")
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            return self.font_bundler.shared_html(f'cv_template_{choix}.html', source, output_dir)
+        raise ValueError(f"Mode de polices inconnu: {fonts!r} (attendu: 'inline' ou 'shared')")
+
+    def _photo_src(self, choix: str, photo: str, output_path, photos: str) -> str:
+        """Source de la balise <img> après traitement de la photo ('' si elle est introuvable)"""
+        if photos not in ('inline', 'shared'):
+            raise ValueError(f"Mode de photo inconnu: {photos!r} (attendu: 'inline' ou 'shared')")
+        is_path = isinstance(output_path, (str, os.PathLike))
+        if photos == 'shared' and not is_path:
+            raise ValueError("Le mode de photo 'shared' nécessite un chemin de sortie")
+        output_dir = os.path.dirname(os.path.abspath(output_path)) if is_path else None
+        with self.metrics.timer('stage_seconds', stage='photo'):
+            path = self.photo_processor.resolve(photo, output_dir)
+            if path is None:
+                return photo if photo.startswith(('http://', 'https://', 'data:')) else ''
+            size = PHOTO_SIZES.get(choix, max(PHOTO_SIZES.values()))
+            if photos == 'inline':
+                return self.photo_processor.inline_src(path, size)
+            return self.photo_processor.shared_src(path, size, output_dir)
+
+    def generate_gallery(self, data: Union[Profile, Dict], output_dir: str,
+                         choices: Iterable[str] = ('1', '2', '3', '4'), workers: Optional[int] = None,
+                         **render_options) -> Dict:
+        """
+        Génère le même profil avec plusieurs templates et une page index.html
+        qui les présente côte à côte, pour comparer les designs
+
+        Le profil est normalisé une seule fois et les templates sont rendus en
+        parallèle (threads) à partir de ce même profil, avec l'Environment
+        Jinja2 déjà chargé: les variantes coûtent à peine plus que la plus
+        lente d'entre elles, au lieu d'un lancement complet par template.
+
+        Args:
+            data: Profil, ou dictionnaire au format JSON
+            output_dir: Dossier des CV (cv_N.html) et de la galerie (index.html)
+            choices: Numéros des templates
+            workers: Nombre de threads (par défaut: un par template, 1 pour
+                rendre dans le thread appelant)
+            **render_options: Options de generate_cv (fit, minify, styles, fonts, photos...)
+
+        Returns:
+            {'index': chemin de la galerie, 'variants': un résultat par template
+            {template, output_path, ok, error, duration}, dans l'ordre de choices}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        choices = list(choices)
+        profile = Profile.coerce(data)
+        os.makedirs(output_dir, exist_ok=True)
+        # Import de Jinja2 et création de l'Environment une seule fois, avant le parallélisme
+        self._environment(render_options.get('minify', False), render_options.get('styles', 'inline'))
+
+        def render(choix: str) -> Dict:
+            start = time.perf_counter()
+            output_path = os.path.join(output_dir, f'cv_{choix}.html')
+            try:
+                self.generate_cv(choix, profile, output_path, **render_options)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            return {'template': choix, 'output_path': output_path, 'ok': error is None, 'error': error,
+                    'duration': time.perf_counter() - start}
+
+        workers = workers or len(choices)
+        if workers <= 1:
+            variants = [render(choix) for choix in choices]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                variants = list(pool.map(render, choices))
+        index_path = os.path.join(output_dir, 'index.html')
+        with _atomic_output(index_path) as f:
+            f.write(_gallery_html(profile, variants))
+        return {'index': index_path, 'variants': variants}
+
+    def render_many(self, jobs: Iterable[Tuple[str, Dict, str]], workers: Optional[int] = None,
+                    executor: str = "process", ordered: bool = True,
+                    max_in_flight: Optional[int] = None, sink: Optional[OutputSink] = None,
+                    **render_options) -> Iterator[Dict]:
+        """
+        Génère un lot de CV en parallèle sur un pool de processus ou de threads
+
+        Chaque worker garde son propre générateur (et donc un Environment Jinja2
+        déjà chargé) pour toute la durée du lot. Une erreur sur un CV est
+        remontée dans son résultat sans interrompre le reste du lot.
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        Args:
+            jobs: Itérable de tuples (choix du template, données, chemin de sortie),
+                consommé au fur et à mesure (les données peuvent être une ligne
+                JSON, et le chemin contenir {profile_id}: voir _render_batch_job)
+            workers: Nombre de workers (par défaut: nombre de CPU)
+            executor: "process" ou "thread"
+            ordered: True pour renvoyer les résultats dans l'ordre des jobs,
+                False pour les renvoyer au fil de l'eau
+            max_in_flight: Nombre maximal de jobs soumis et non consommés
+                (par défaut: 2 x workers), pour garder une mémoire constante
+            sink: Archive ou magasin recevant tous les CV (les chemins de sortie
+                des jobs sont alors ignorés); output_path vaut le nom de l'entrée
+            render_options: Options transmises à generate_cv (stream, fonts...)
 
-        return data
-    
-    def generate_cv(self, choix: str, data: Dict, output_path: str = "cv.html") -> str:
+        Returns:
+            Itérateur de dictionnaires {index, profile_id, output_path, ok, error,
+            bytes, duration}; bytes est la taille du CV écrit
         """
-        Génère le CV HTML à partir des données
-        
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max(1, max_in_flight or workers * 2)
+        pool_cls = _executor_class(executor)
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        jobs_iter = enumerate(jobs)
+        pending = {}
+        done_buffer = {}
+        next_index = 0
+        exhausted = False
+
+        with pool_cls(max_workers=workers, initializer=_init_batch_worker,
+                      initargs=(self.template_dir, self.metrics.enabled)) as pool:
+            while True:
+                # Les résultats en attente de réordonnancement comptent dans la limite
+                while not exhausted and len(pending) + len(done_buffer) < max_in_flight:
+                    try:
+                        index, (choix, data, output_path) = next(jobs_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if sink is not None:
+                        output_path = None
+                    future = pool.submit(_render_batch_job, index, choix, data, output_path, render_options)
+                    pending[future] = (index, output_path)
+
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, output_path = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Échec hors du job lui-même (pickling, worker tué...)
+                        result = {'index': index, 'profile_id': None, 'output_path': output_path, 'ok': False,
+                                  'error': f"{type(e).__name__}: {e}", 'bytes': 0, 'duration': 0.0}
+                    self._merge_worker_metrics(result)
+                    rendered = result.pop('rendered', None)
+                    if rendered is not None:
+                        try:
+                            entry = sink.write(*rendered)
+                            result.update(output_path=entry['name'], bytes=entry['size'])
+                        except Exception as e:
+                            result.update(ok=False, error=f"{type(e).__name__}: {e}")
+                    if ordered:
+                        done_buffer[index] = result
+                    else:
+                        yield result
+
+                while next_index in done_buffer:
+                    yield done_buffer.pop(next_index)
+                    next_index += 1
+
+    def render_jsonl(self, lines: Iterable[str], choix: str, output_dir: Optional[str] = None,
+                     ordered: bool = False, **options) -> Iterator[Dict]:
+        """
+        Génère un CV par profil d'un flux JSON Lines (un profil JSON par ligne)
+
+        Les lignes sont lues au fil des rendus, jamais à l'avance au-delà de
+        max_in_flight: la mémoire reste constante quelle que soit la longueur du
+        flux, et un consommateur lent des résultats ralentit la lecture d'autant
+        (contre-pression jusqu'au producteur du flux). Une ligne illisible donne
+        un résultat en erreur sans interrompre le flux.
+
         Args:
-            data: Données structurées du profil
-            output_path: Chemin du fichier HTML de sortie
-            
+            lines: Flux de lignes (fichier ouvert, sys.stdin...)
+            choix: Numéro du template, ou "auto"
+            output_dir: Dossier des CV, nommés cv_<profile_id>_<template>.html
+                (inutile avec sink=)
+            ordered: Résultats dans l'ordre du flux plutôt qu'au fil de l'eau
+            options: Options de render_many (workers, executor, sink...) et de generate_cv
+
         Returns:
-            Chemin du fichier généré
+            Itérateur de résultats de render_many; index est le rang du profil dans le flux
         """
-        template = self.env.get_template(f'cv_template_{choix}.html')
-        html_content = template.render(**data)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
+        pattern = os.path.join(output_dir or OUTPUTS, f"cv_{{profile_id}}_{choix}.html")
+        jobs = ((choix, line, pattern) for line in lines if line.strip())
+        return self.render_many(jobs, ordered=ordered, **options)
+
+    def ingest_exports(self, drop_dir: str, output_dir: str, index: IngestIndex, workers: Optional[int] = None,
+                       executor: str = "process", max_in_flight: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Importe tous les exports LinkedIn (ZIP ou dossiers extraits) d'un dossier
+        de dépôt et écrit un profil JSON normalisé par export dans output_dir
+
+        Les exports sont lus en parallèle. Un export dont l'empreinte figure
+        déjà dans l'index (ou qui a déjà été vu dans ce lot) n'est pas relu.
+        Un export illisible est rapporté dans son résultat sans interrompre le lot.
+
+        Args:
+            drop_dir: Dossier contenant les exports
+            output_dir: Dossier des profils JSON produits
+            index: Index des exports déjà importés, mis à jour (à sauvegarder par l'appelant)
+            workers: Nombre de workers (par défaut: nombre de CPU)
+            executor: "process" ou "thread"
+            max_in_flight: Nombre maximal d'exports lus en même temps (par défaut: 2 x workers)
+
+        Returns:
+            Itérateur de dictionnaires {index, source, fingerprint, status, output_path,
+            error, duration}, au fil de l'eau; status vaut "ingested", "duplicate" ou "failed"
+        """
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max(1, max_in_flight or workers * 2)
+        pool_cls = _executor_class(executor)
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        os.makedirs(output_dir, exist_ok=True)
+        claimed = {entry['output'] for entry in index.entries.values()}
+        exports = enumerate(_iter_export_paths(drop_dir))
+        pending = {}
+        exhausted = False
+
+        with pool_cls(max_workers=workers, initializer=_init_ingest_worker,
+                      initargs=(self.template_dir, frozenset(index.entries), self.metrics.enabled)) as pool:
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        position, export_path = next(exports)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(_ingest_export_job, position, export_path)] = (position, export_path)
+
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    position, export_path = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'index': position, 'source': export_path, 'fingerprint': None, 'status': 'failed',
+                                  'profile': None, 'error': f"{type(e).__name__}: {e}", 'duration': 0.0}
+                    self._merge_worker_metrics(result)
+                    profile = result.pop('profile')
+                    result['output_path'] = None
+                    fingerprint = result['fingerprint']
+                    if result['status'] == 'ingested' and fingerprint in index:
+                        # Même contenu déjà importé dans ce lot
+                        result['status'] = 'duplicate'
+                    if result['status'] == 'duplicate':
+                        result['output_path'] = index.get(fingerprint)['output']
+                    elif result['status'] == 'ingested':
+                        try:
+                            output_path = self._ingest_output_path(export_path, fingerprint, output_dir, claimed)
+                            with _atomic_output(output_path) as f:
+                                json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+                        except Exception as e:
+                            result.update(status='failed', error=f"{type(e).__name__}: {e}")
+                        else:
+                            claimed.add(os.path.abspath(output_path))
+                            index.record(fingerprint, export_path, output_path)
+                            result['output_path'] = output_path
+                    yield result
+
+    def _merge_worker_metrics(self, result: Dict) -> None:
+        """Fusionne les métriques renvoyées par un worker dans celles du générateur"""
+        snapshot = result.pop('metrics', None)
+        if snapshot is not None:
+            self.metrics.merge(snapshot)
+
+    @staticmethod
+    def _ingest_output_path(export_path: str, fingerprint: str, output_dir: str, claimed: set) -> str:
+        """Profil nommé d'après l'export, suffixé par l'empreinte si ce nom est déjà pris"""
+        stem = os.path.basename(export_path.rstrip(os.sep))
+        if stem.lower().endswith('.zip'):
+            stem = stem[:-4]
+        output_path = os.path.join(output_dir, f"{stem}.json")
+        if os.path.abspath(output_path) in claimed:
+            output_path = os.path.join(output_dir, f"{stem}-{fingerprint[:8]}.json")
         return output_path
     
     def generate_from_mock_data(self, choix: str, output_path: str = "cv.html") -> str:
@@ -376,16 +3320,1410 @@ class LinkedInCVGenerator:
                 {'name': 'MLOps / MLflow', 'endorsements': 22},
                 {'name': 'Data Visualization (Tableau, Plotly)', 'endorsements': 20}
             ],
-            'hobbies': ['Photographie', 'Randonnée', 'Lecture'],
-            'generated_date': datetime.now().strftime('%d/%m/%Y')
+            'hobbies': ['Photographie', 'Randonnée', 'Lecture']
         }
         
         return self.generate_cv(choix, mock_data, output_path)
 
 
-def main():
+def _gallery_html(profile: Profile, variants: List[Dict]) -> str:
+    """Page de comparaison des variantes: chaque CV dans une iframe réduite, avec un lien vers la page entière"""
+    from html import escape
+
+    cards = []
+    for variant in variants:
+        choix = variant['template']
+        title = escape(f"{choix}. {TEMPLATE_TITLES.get(choix, f'Template {choix}')}")
+        href = escape(os.path.basename(variant['output_path']))
+        if variant['ok']:
+            body = f'<iframe src="{href}" title="{title}" loading="lazy"></iframe>'
+        else:
+            body = f'<p class="error">{escape(variant["error"])}</p>'
+        cards.append(f'<figure><figcaption><a href="{href}">{title}</a></figcaption>'
+                     f'<div class="page">{body}</div></figure>')
+    name = escape(profile.personal_info.name or profile.profile_id())
+    # Page A4 à 96 dpi (794 x 1123 px) affichée à 45 %
+    return f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{name} - comparaison des templates</title>
+<style>
+body {{ margin: 0; padding: 24px; background: #eceae6; font-family: system-ui, sans-serif; color: #222; }}
+h1 {{ font-size: 20px; font-weight: 600; margin: 0 0 20px; }}
+.gallery {{ display: flex; flex-wrap: wrap; gap: 24px; }}
+figure {{ margin: 0; }}
+figcaption {{ font-size: 14px; margin-bottom: 8px; }}
+figcaption a {{ color: inherit; }}
+.page {{ width: 357px; height: 505px; overflow: hidden; background: #fff; box-shadow: 0 2px 10px rgba(0, 0, 0, .15); }}
+.page iframe {{ width: 794px; height: 1123px; border: 0; transform: scale(.45); transform-origin: 0 0; pointer-events: none; }}
+.error {{ padding: 16px; color: #a00; font-size: 13px; }}
+</style>
+</head>
+<body>
+<h1>{name} : {len(variants)} templates</h1>
+<div class="gallery">
+{chr(10).join(cards)}
+</div>
+</body>
+</html>
+"""
+
+
+def _init_batch_worker(template_dir: str, metrics: bool = False) -> None:
+    """Initialise le générateur réutilisé par un worker du rendu par lots"""
+    _worker_state.generator = LinkedInCVGenerator(template_dir=template_dir,
+                                                  metrics=InMemoryMetrics() if metrics else None)
+
+
+def _drain_worker_metrics(result: Dict) -> Dict:
+    """Joint au résultat d'un job les métriques mesurées depuis le job précédent du worker"""
+    metrics = _worker_state.generator.metrics
+    if metrics.enabled:
+        result['metrics'] = metrics.drain()
+    return result
+
+
+def _render_batch_job(index: int, choix: str, data: Union[Profile, Dict, str, Callable[[], Profile]],
+                      output_path: Optional[str], render_options: Dict) -> Dict:
+    """
+    Génère un CV dans un worker et renvoie son résultat sans lever d'exception
+
+    data peut être une ligne JSON brute (mode flux), décodée ici en parallèle,
+    ou la fonction de chargement d'un job (voir _iter_batch_file);
+    {profile_id} dans output_path est remplacé par l'identifiant du profil.
+    """
+    start = time.perf_counter()
+    generator = _worker_state.generator
+    # Sans chemin de sortie, le CV est renvoyé au processus principal qui l'écrit dans son OutputSink
+    destination = _CollectingSink() if output_path is None else output_path
+    profile_id = None
+    written = 0
+    try:
+        if isinstance(data, Profile):
+            profile = data
+        elif callable(data):
+            with generator.metrics.timer('stage_seconds', stage='normalize'):
+                profile = data()
+        else:
+            with generator.metrics.timer('stage_seconds', stage='normalize'):
+                profile = Profile.from_dict(json.loads(data) if isinstance(data, str) else data)
+        profile_id = profile.profile_id()
+        if output_path is not None and '{profile_id}' in output_path:
+            destination = output_path = output_path.replace('{profile_id}', profile_id)
+        generator.generate_cv(choix, profile, destination, **render_options)
+        if output_path is not None and isinstance(output_path, (str, os.PathLike)):
+            written = os.path.getsize(output_path)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if output_path is not None and '{profile_id}' in output_path:
+            output_path = None
+    result = {
+        'index': index,
+        'profile_id': profile_id,
+        'output_path': output_path,
+        'ok': error is None,
+        'error': error,
+        'bytes': written,
+        'duration': time.perf_counter() - start
+    }
+    if output_path is None and error is None:
+        result['rendered'] = destination.rendered
+    return _drain_worker_metrics(result)
+
+
+def _init_ingest_worker(template_dir: str, known_fingerprints: frozenset, metrics: bool = False) -> None:
+    """Initialise un worker de l'import par lots avec les empreintes déjà importées"""
+    _init_batch_worker(template_dir, metrics)
+    _worker_state.known_fingerprints = known_fingerprints
+
+
+def _ingest_export_job(index: int, export_path: str) -> Dict:
+    """Lit un export dans un worker, sauf s'il a déjà été importé, sans lever d'exception"""
+    start = time.perf_counter()
+    fingerprint = profile = error = None
+    status = 'failed'
+    try:
+        fingerprint = export_fingerprint(export_path)
+        if fingerprint in _worker_state.known_fingerprints:
+            status = 'duplicate'
+        else:
+            profile = _worker_state.generator.read_linkedin_export(export_path)
+            status = 'ingested'
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return _drain_worker_metrics({
+        'index': index,
+        'source': export_path,
+        'fingerprint': fingerprint,
+        'status': status,
+        'profile': profile,
+        'error': error,
+        'duration': time.perf_counter() - start
+    })
+
+
+def _render_html(choix: str, data: Dict, minify: bool = False) -> str:
+    """Génère un CV en mémoire avec le générateur du worker (service HTTP)"""
+    buffer = io.StringIO()
+    _worker_state.generator.generate_cv(choix, data, buffer, minify=minify)
+    return buffer.getvalue()
+
+
+class CVRenderServer:
+    """
+    Service HTTP asyncio de génération de CV
+
+    POST /render?template=N avec le profil JSON en corps renvoie le CV HTML.
+    Les templates restent chargés dans les workers, les réponses sont gardées
+    dans un cache LRU indexé par le hash de la requête (servi aussi comme ETag,
+    avec réponse 304 sur If-None-Match) et le rendu s'exécute dans un pool borné
+    pour ne jamais bloquer la boucle d'événements. GET /health répond "ok".
+    """
+
+    def __init__(self, template_dir: str = TEMPLATES, host: str = '127.0.0.1', port: int = 8000,
+                 workers: Optional[int] = None, executor: str = 'thread', cache_size: int = 1024,
+                 cache_bytes: int = 64 * 1024 * 1024, max_body: int = 1024 * 1024, minify: bool = False):
+        """
+        Args:
+            template_dir: Dossier des templates
+            host, port: Adresse d'écoute (port 0 pour un port libre)
+            workers: Nombre de workers de rendu (par défaut: nombre de CPU)
+            executor: "thread" ou "process"
+            cache_size: Nombre de réponses gardées en cache (0 pour désactiver)
+            cache_bytes: Taille maximale du cache de réponses en caractères
+            max_body: Taille maximale d'une requête, en octets
+            minify: Sert des CV minifiés (voir CVTemplateLoader)
+        """
+        self.template_dir = template_dir
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body = max_body
+        self.minify = minify
+        self.generator = LinkedInCVGenerator(template_dir=template_dir, fragment_cache_size=0)
+        self.cache = FragmentCache(cache_size, cache_bytes) if cache_size > 0 else None
+        pool_cls = _executor_class(executor)
+        self._pool = pool_cls(max_workers=self.workers, initializer=_init_batch_worker,
+                              initargs=(template_dir,))
+        self._server = None
+        self._slots = None
+
+    async def start(self) -> Tuple[str, int]:
+        """Démarre l'écoute et renvoie l'adresse effective (host, port)"""
+        import asyncio
+
+        # Au plus 2 rendus en attente par worker: la file du pool reste bornée
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=True)
+
+    async def _handle_connection(self, reader, writer) -> None:
+        import asyncio
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._send(writer, 400, b'Requete invalide', close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                    if len(headers) > 100:
+                        break
+                length = headers.get('content-length') or '0'
+                if not length.isdigit():
+                    await self._send(writer, 400, b'Content-Length invalide', close=True)
+                    break
+                length = int(length)
+                if length > self.max_body:
+                    await self._send(writer, 413, b'Requete trop volumineuse', close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                status, extra_headers, content = await self._dispatch(method, target, headers, body)
+                await self._send(writer, status, content, extra_headers, close=not keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, headers: Dict, body: bytes) -> Tuple[int, Dict, bytes]:
+        import asyncio
+        import urllib.parse
+
+        url = urllib.parse.urlsplit(target)
+        if url.path == '/health' and method == 'GET':
+            return 200, {'Content-Type': 'text/plain; charset=utf-8'}, b'ok'
+        if url.path != '/render':
+            return 404, {}, b'Introuvable'
+        if method != 'POST':
+            return 405, {'Allow': 'POST'}, b'Methode non autorisee'
+
+        choix = urllib.parse.parse_qs(url.query).get('template', ['1'])[0]
+        try:
+            template_hash = self.generator.template_hash(choix)
+        except Exception:
+            return 404, {}, f"Template inconnu: {choix}".encode('utf-8')
+        digest = hashlib.blake2b(f"{choix}:{template_hash}:".encode('utf-8') + body, digest_size=16)
+        etag = f'"{digest.hexdigest()}"'
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+
+        html = self.cache.get(etag) if self.cache is not None else None
+        if html is None:
+            try:
+                data = json.loads(body)
+            except ValueError as e:
+                return 400, {}, f"JSON invalide: {e}".encode('utf-8')
+            if not isinstance(data, dict):
+                return 400, {}, "Le profil doit être un objet JSON".encode('utf-8')
+            async with self._slots:
+                try:
+                    loop = asyncio.get_running_loop()
+                    html = await loop.run_in_executor(self._pool, _render_html, choix, data, self.minify)
+                except Exception as e:
+                    return 500, {}, f"Erreur de rendu: {type(e).__name__}: {e}".encode('utf-8')
+            if self.cache is not None:
+                self.cache.set(etag, html)
+        response_headers['Content-Type'] = 'text/html; charset=utf-8'
+        return 200, response_headers, html.encode('utf-8')
+
+    async def _send(self, writer, status: int, content: bytes, headers: Optional[Dict] = None,
+                    close: bool = False) -> None:
+        from http import HTTPStatus
+
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(content)}")
+        if close:
+            lines.append("Connection: close")
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + content)
+        await writer.drain()
+
+
+def _iter_batch_file(jobs_file: str) -> Iterator[Tuple[str, Callable[[], Profile], Optional[str]]]:
+    """
+    Lit un fichier de jobs au format JSON Lines, une ligne par CV:
+    {"template": "1", "input": "data/data.json", "output": "outputs/cv.html"}
+    ("data" peut remplacer "input" pour fournir le profil directement, et le
+    template "auto" choisit le premier template où le profil tient sur une page;
+    "output" est facultatif quand les CV vont dans une archive ou un magasin)
+
+    Le profil n'est pas chargé ici: chaque job porte une fonction de chargement,
+    appelée au moment du rendu, pour qu'une ligne invalide ou un fichier
+    manquant ne fasse échouer que son propre job.
+    """
+    with open(jobs_file, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError:
+                job = None
+            if not isinstance(job, dict):
+                # L'erreur sera levée (et rapportée) au chargement du job
+                yield '1', partial(_load_batch_job, line), None
+                continue
+            yield str(job.get('template', '1')), partial(_load_batch_job, job), job.get('output')
+
+
+def _load_batch_job(job: Union[Dict, str]) -> Profile:
+    """Charge le profil d'un job de _iter_batch_file (job décodé, ou ligne brute invalide)"""
+    if isinstance(job, str):
+        job = json.loads(job)
+        if not isinstance(job, dict):
+            raise ValueError(f"Job invalide (objet JSON attendu): {job!r}")
+    data = job.get('data')
+    if data is not None:
+        return Profile.from_dict(data)
+    if not job.get('input'):
+        raise ValueError("Job sans 'input' ni 'data'")
+    return Profile.load(job['input'])
+
+
+class WeasyPrintEngine:
+    """Moteur PDF WeasyPrint (Python pur, sans navigateur)"""
+
+    def start(self) -> None:
+        from weasyprint import HTML
+        self._html = HTML
+
+    def render(self, html_path: str, pdf_path: str) -> None:
+        self._html(filename=html_path).write_pdf(pdf_path)
+
+    def close(self) -> None:
+        pass
+
+
+class ChromiumEngine:
+    """Moteur PDF Chromium headless (Playwright): un navigateur reste ouvert par worker"""
+
+    def start(self) -> None:
+        from playwright.sync_api import sync_playwright
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch()
+        self._page = self._browser.new_page()
+
+    def render(self, html_path: str, pdf_path: str) -> None:
+        from pathlib import Path
+        self._page.goto(Path(html_path).absolute().as_uri(), wait_until='load')
+        # Équivalent de "Graphiques d'arrière-plan" + marges nulles (voir EXPORT_PDF.md)
+        self._page.pdf(path=pdf_path, format='A4', print_background=True,
+                       margin={'top': '0', 'right': '0', 'bottom': '0', 'left': '0'})
+
+    def close(self) -> None:
+        self._browser.close()
+        self._playwright.stop()
+
+
+PDF_ENGINES = {
+    'weasyprint': WeasyPrintEngine,
+    'chromium': ChromiumEngine
+}
+
+
+def _pdf_worker_main(engine_name: str, conn) -> None:
+    """Boucle d'un worker PDF: le moteur est démarré une fois puis traite des lots de jobs"""
+    engine = PDF_ENGINES[engine_name]()
+    try:
+        engine.start()
+        startup_error = None
+    except Exception as e:
+        startup_error = f"{type(e).__name__}: {e}"
+    try:
+        while True:
+            batch = conn.recv()
+            if batch is None:
+                break
+            for index, html_path, pdf_path in batch:
+                start = time.perf_counter()
+                error = startup_error
+                if error is None:
+                    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+                    try:
+                        engine.render(html_path, tmp_path)
+                        os.replace(tmp_path, pdf_path)
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                conn.send({
+                    'index': index,
+                    'html_path': html_path,
+                    'pdf_path': pdf_path,
+                    'ok': error is None,
+                    'error': error,
+                    'duration': time.perf_counter() - start
+                })
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if startup_error is None:
+            engine.close()
+
+
+class PDFExporter:
+    """
+    Export PDF par un pool de workers persistants
+
+    Chaque worker démarre son moteur de rendu une seule fois et le garde entre
+    les jobs, qu'il reçoit par lots. Un job qui dépasse le délai fait
+    redémarrer son worker sans interrompre le reste de l'export.
+    """
+
+    def __init__(self, engine: str = 'weasyprint', workers: Optional[int] = None,
+                 timeout: float = 60.0, batch_size: int = 8):
+        """
+        Args:
+            engine: Moteur de rendu ("weasyprint" ou "chromium", voir PDF_ENGINES)
+            workers: Nombre de workers (par défaut: nombre de CPU)
+            timeout: Délai maximal par CV, en secondes
+            batch_size: Nombre de CV envoyés d'un coup à un worker
+        """
+        if engine not in PDF_ENGINES:
+            raise ValueError(f"Moteur PDF inconnu: {engine!r} (disponibles: {', '.join(PDF_ENGINES)})")
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.stats = {'ok': 0, 'failed': 0, 'timeouts': 0, 'restarts': 0, 'elapsed': 0.0, 'per_hour': 0.0}
+        self._workers = []
+
+    def __enter__(self) -> 'PDFExporter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _spawn(self) -> Dict:
+        import multiprocessing
+
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_pdf_worker_main, args=(self.engine, child_conn), daemon=True)
+        process.start()
+        child_conn.close()
+        return {'process': process, 'conn': parent_conn, 'batch': deque(), 'deadline': None}
+
+    def _kill(self, worker: Dict) -> None:
+        worker['process'].terminate()
+        worker['process'].join()
+        worker['conn'].close()
+
+    def export_many(self, jobs: Iterable[Tuple[str, str]]) -> Iterator[Dict]:
+        """
+        Convertit des CV HTML en PDF A4
+
+        Args:
+            jobs: Itérable de tuples (chemin HTML, chemin PDF), consommé au fil de l'eau
+
+        Returns:
+            Itérateur des résultats {index, html_path, pdf_path, ok, error, duration},
+            dans l'ordre de fin des jobs
+        """
+        from multiprocessing.connection import wait as wait_connections
+
+        while len(self._workers) < self.workers:
+            self._workers.append(self._spawn())
+        jobs_iter = enumerate(jobs)
+        requeued = deque()
+        exhausted = False
+        start = time.perf_counter()
+
+        def failure(job, error):
+            index, html_path, pdf_path = job
+            self.stats['failed'] += 1
+            return {'index': index, 'html_path': html_path, 'pdf_path': pdf_path,
+                    'ok': False, 'error': error, 'duration': 0.0}
+
+        def restart(worker):
+            # Les jobs restants du lot sont redistribués
+            self._kill(worker)
+            requeued.extendleft(reversed(worker['batch']))
+            self._workers[self._workers.index(worker)] = self._spawn()
+            self.stats['restarts'] += 1
+
+        while True:
+            for worker in self._workers:
+                if worker['batch']:
+                    continue
+                batch = []
+                while len(batch) < self.batch_size and (requeued or not exhausted):
+                    if requeued:
+                        batch.append(requeued.popleft())
+                        continue
+                    try:
+                        index, (html_path, pdf_path) = next(jobs_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    batch.append((index, html_path, pdf_path))
+                if batch:
+                    worker['batch'].extend(batch)
+                    worker['deadline'] = time.monotonic() + self.timeout
+                    worker['conn'].send(batch)
+
+            busy = [worker for worker in self._workers if worker['batch']]
+            if not busy:
+                break
+
+            remaining = min(worker['deadline'] for worker in busy) - time.monotonic()
+            ready = wait_connections([worker['conn'] for worker in busy], timeout=max(0.0, remaining))
+            for worker in busy:
+                if worker['conn'] in ready:
+                    try:
+                        result = worker['conn'].recv()
+                    except (EOFError, OSError):
+                        job = worker['batch'].popleft()
+                        restart(worker)
+                        yield failure(job, "Le worker PDF s'est arrêté")
+                        continue
+                    worker['batch'].popleft()
+                    worker['deadline'] = time.monotonic() + self.timeout
+                    self.stats['ok' if result['ok'] else 'failed'] += 1
+                    yield result
+                elif time.monotonic() >= worker['deadline']:
+                    job = worker['batch'].popleft()
+                    self.stats['timeouts'] += 1
+                    restart(worker)
+                    yield failure(job, f"Délai dépassé ({self.timeout:g} s)")
+
+        self.stats['elapsed'] += time.perf_counter() - start
+        if self.stats['elapsed'] > 0:
+            self.stats['per_hour'] = self.stats['ok'] * 3600 / self.stats['elapsed']
+
+    def close(self) -> None:
+        """Arrête les workers"""
+        for worker in self._workers:
+            try:
+                worker['conn'].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+                worker['process'].join()
+            worker['conn'].close()
+        self._workers = []
+
+
+def _iter_pdf_jobs(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Jobs (HTML, PDF) pour des fichiers HTML ou des dossiers: le PDF est écrit à côté du HTML"""
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.endswith('.html'))
+            html_paths = [os.path.join(path, name) for name in names]
+        else:
+            html_paths = [path]
+        for html_path in html_paths:
+            yield html_path, os.path.splitext(html_path)[0] + '.pdf'
+
+
+def _run_pdf_export(exporter: PDFExporter, jobs: Iterable[Tuple[str, str]]) -> int:
+    """Exporte les PDF, affiche chaque résultat et le débit; renvoie le nombre d'échecs"""
+    failures = 0
+    for result in exporter.export_many(jobs):
+        if result['ok']:
+            print(f"📄 {result['pdf_path']} ({result['duration'] * 1000:.0f} ms)")
+        else:
+            failures += 1
+            print(f"❌ {result['html_path']}: {result['error']}")
+    stats = exporter.stats
+    print(f"📊 {stats['ok']} PDF en {stats['elapsed']:.1f} s ({stats['per_hour']:.0f} PDF/heure), "
+          f"{stats['failed']} échec(s), {stats['restarts']} redémarrage(s) de worker")
+    return failures
+
+
+def _run_server(server: CVRenderServer) -> int:
+    """Lance le service HTTP jusqu'à Ctrl+C"""
+    import asyncio
+
+    async def run():
+        host, port = await server.start()
+        print(f"🌐 Service de génération de CV sur http://{host}:{port}/render?template=1")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Au revoir!")
+    return 0
+
+
+class CVWatcher:
+    """
+    Mode surveillance: regénère les CV dès qu'un template ou un JSON change
+
+    Seuls les CV qui dépendent du fichier modifié sont reconstruits (via le
+    manifeste de build, une sauvegarde sans changement ne réécrit rien), avec
+    le générateur et son Environment déjà chargés. Les notifications viennent de
+    watchdog (inotify, FSEvents...) s'il est installé, sinon d'un parcours léger
+    des dossiers surveillés. Les rafales d'enregistrements sont regroupées.
+    """
+
+    def __init__(self, generator: LinkedInCVGenerator, jobs: List[Dict], manifest: Optional[BuildManifest] = None,
+                 debounce: float = 0.1, backend: str = 'auto', poll_interval: float = 0.05):
+        """
+        Args:
+            generator: Générateur réutilisé pour tous les rendus
+            jobs: Liste de jobs {template, input|data, output} (voir _iter_batch_file)
+            manifest: Manifeste de build (par défaut: outputs/.build_manifest.json)
+            debounce: Délai de regroupement des modifications, en secondes
+            backend: "watchdog", "poll" ou "auto" (watchdog s'il est installé)
+        """
+        self.generator = generator
+        self.jobs = [dict(job, template=str(job.get('template', '1'))) for job in jobs]
+        self.manifest = manifest or BuildManifest()
+        self.debounce = debounce
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._events = queue.Queue()
+        self._dependents = {}
+        template_dir = os.path.abspath(generator.template_dir)
+        for index, job in enumerate(self.jobs):
+            paths = [os.path.join(template_dir, f"cv_template_{job['template']}.html")]
+            if job.get('data') is None:
+                paths.append(os.path.abspath(job['input']))
+            for path in paths:
+                self._dependents.setdefault(path, []).append(index)
+
+    def affected_jobs(self, changed_paths: Iterable[str]) -> List[int]:
+        """Indices des jobs qui dépendent d'un des fichiers modifiés"""
+        indexes = set()
+        for path in changed_paths:
+            indexes.update(self._dependents.get(os.path.abspath(path), ()))
+        return sorted(indexes)
+
+    def rebuild(self, indexes: Iterable[int]) -> List[Tuple[str, str]]:
+        """Reconstruit les jobs donnés; renvoie les couples (sortie, statut)"""
+        results = []
+        for index in indexes:
+            job = self.jobs[index]
+            try:
+                data = job.get('data')
+                profile = Profile.load(job['input']) if data is None else Profile.from_dict(data)
+                status = self.generator.build_cv(job['template'], profile, job['output'], self.manifest)
+            except Exception as e:
+                status = f"erreur: {type(e).__name__}: {e}"
+            results.append((job['output'], status))
+        self.manifest.save()
+        return results
+
+    def _start_backend(self, stop_event: threading.Event):
+        directories = sorted({os.path.dirname(path) for path in self._dependents})
+        backend = self.backend
+        if backend == 'auto':
+            import importlib.util
+            backend = 'watchdog' if importlib.util.find_spec('watchdog') else 'poll'
+        if backend == 'watchdog':
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+
+            events = self._events
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if not event.is_directory:
+                        events.put(event.src_path)
+                        if getattr(event, 'dest_path', None):
+                            events.put(event.dest_path)
+
+            observer = Observer()
+            for directory in directories:
+                observer.schedule(Handler(), directory, recursive=False)
+            observer.start()
+            return observer.stop
+        if backend != 'poll':
+            raise ValueError(f"Backend de surveillance inconnu: {backend!r}")
+
+        def poll():
+            # Un parcours par dossier surveillé, seuls les fichiers suivis sont comparés
+            watched = set(self._dependents)
+            known = {}
+            for directory in directories:
+                for entry in os.scandir(directory):
+                    if entry.path in watched:
+                        known[entry.path] = entry.stat().st_mtime_ns
+            while not stop_event.wait(self.poll_interval):
+                for directory in directories:
+                    for entry in os.scandir(directory):
+                        if entry.path not in watched:
+                            continue
+                        mtime = entry.stat().st_mtime_ns
+                        if known.get(entry.path) != mtime:
+                            known[entry.path] = mtime
+                            self._events.put(entry.path)
+
+        thread = threading.Thread(target=poll, daemon=True)
+        thread.start()
+        return lambda: None
+
+    def run(self, stop_event: Optional[threading.Event] = None, on_rebuild=None) -> None:
+        """
+        Surveille les fichiers jusqu'à stop_event (ou Ctrl+C)
+
+        Args:
+            stop_event: Événement d'arrêt
+            on_rebuild: Fonction appelée avec la liste (sortie, statut) après chaque reconstruction
+        """
+        stop_event = stop_event or threading.Event()
+        stop_backend = self._start_backend(stop_event)
+        try:
+            while not stop_event.is_set():
+                try:
+                    changed = {self._events.get(timeout=0.1)}
+                except queue.Empty:
+                    continue
+                # Regroupe les enregistrements successifs d'un même changement
+                while True:
+                    try:
+                        changed.add(self._events.get(timeout=self.debounce))
+                    except queue.Empty:
+                        break
+                indexes = self.affected_jobs(changed)
+                if not indexes:
+                    continue
+                start = time.perf_counter()
+                results = self.rebuild(indexes)
+                if on_rebuild is not None:
+                    on_rebuild(results)
+                else:
+                    for output_path, status in results:
+                        print(f"🔄 {output_path}: {status}")
+                    print(f"   ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        finally:
+            stop_event.set()
+            stop_backend()
+
+
+def _default_watch_jobs(data_dir: str = DATA, outputs_dir: str = OUTPUTS) -> List[Dict]:
+    """Sans fichier de jobs: chaque JSON de data/ avec chacun des 4 templates"""
+    jobs = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith('.json'):
+            stem = os.path.splitext(name)[0]
+            for choix in ['1', '2', '3', '4']:
+                jobs.append({'template': choix, 'input': os.path.join(data_dir, name),
+                             'output': os.path.join(outputs_dir, f"cv_{stem}_{choix}.html")})
+    return jobs
+
+
+def _read_profile_input(generator: LinkedInCVGenerator, path: str) -> Profile:
+    """
+    Profil d'une commande: JSON, export LinkedIn (ZIP ou dossier), - pour
+    l'entrée standard, ou store:ID pour un profil de la base
+    """
+    if path.startswith('store:'):
+        profile = generator.store.get(path[len('store:'):])
+        if profile is None:
+            raise KeyError(f"profil absent de {generator.store.path}")
+        return profile
+    if os.path.isdir(path) or path.lower().endswith('.zip'):
+        return generator.read_linkedin_export(path)
+    return generator.load_profile(path)
+
+
+def _iter_store_input(generator: LinkedInCVGenerator, paths: List[str]) -> Iterator[Union[Profile, Dict]]:
+    """Profils à ajouter à la base: JSON, JSON Lines, exports LinkedIn, ou - (JSON Lines)"""
+    for path in paths:
+        if path == '-' or path.endswith('.jsonl'):
+            f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        elif os.path.isdir(path) or path.lower().endswith('.zip'):
+            yield generator.read_linkedin_export(path)
+        else:
+            with open(path, encoding='utf-8') as f:
+                yield json.load(f)
+
+
+def _run_store(generator: LinkedInCVGenerator, args) -> int:
+    """Base de profils: ajout en une transaction, recherche plein texte, lecture par identifiant"""
+    store = generator.store
+    if args.store_command == 'add':
+        # Les exports sont ajoutés par put_many avec le reste, pas un par un
+        generator.store = None
+        start = time.perf_counter()
+        try:
+            count = store.put_many(_iter_store_input(generator, args.paths))
+        except Exception as e:
+            print(f"❌ {type(e).__name__}: {e} (aucun profil ajouté)", file=sys.stderr)
+            return 1
+        finally:
+            generator.store = store
+        print(f"🗃️  {count} profil(s) enregistré(s) dans {store.path} en {time.perf_counter() - start:.1f} s "
+              f"({len(store)} au total)")
+        return 0
+    if args.store_command == 'search':
+        results = store.search(args.query, args.fields, args.limit)
+        for result in results:
+            print(f"{result['id']}\t{result['name']}\t{result['headline']}")
+        return 0 if results else 1
+    profile = store.get(args.id)
+    if profile is None:
+        print(f"❌ {args.id}: profil absent de {store.path}", file=sys.stderr)
+        return 1
+    json.dump(profile.to_dict(), sys.stdout, ensure_ascii=False, indent=4)
+    sys.stdout.write('\n')
+    return 0
+
+
+def _run_render(generator: LinkedInCVGenerator, args) -> int:
+    """Génère un seul CV; avec --manifest, un CV déjà à jour ne charge même pas Jinja2"""
+    to_stdout = args.output == '-'
+    if args.manifest and (to_stdout or args.minify or args.styles == 'shared' or args.fonts or args.photos):
+        print("❌ --manifest nécessite un fichier de sortie et est incompatible avec --minify, "
+              "--styles shared, --fonts et --photos", file=sys.stderr)
+        return 2
+    try:
+        profile = _read_profile_input(generator, args.input)
+        if args.manifest:
+            manifest = BuildManifest(args.manifest)
+            status = generator.build_cv(args.template, profile, args.output, manifest, fit=args.fit)
+            manifest.save()
+        else:
+            generator.generate_cv(args.template, profile, sys.stdout if to_stdout else args.output, fonts=args.fonts,
+                                  fit=args.fit, minify=args.minify, styles=args.styles, photos=args.photos)
+            status = 'written'
+    except Exception as e:
+        print(f"❌ {args.input}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    if not to_stdout:
+        print(f"✅ {args.output}" if status == 'written' else f"⏭️  {args.output}: {status}")
+    return 0
+
+
+def _run_gallery(generator: LinkedInCVGenerator, args) -> int:
+    """Génère un profil avec plusieurs templates et la page qui les compare"""
+    try:
+        profile = _read_profile_input(generator, args.input)
+    except Exception as e:
+        print(f"❌ {args.input}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    result = generator.generate_gallery(profile, args.output, args.template, workers=args.workers, fit=args.fit,
+                                        minify=args.minify, styles=args.styles, fonts=args.fonts, photos=args.photos)
+    for variant in result['variants']:
+        if variant['ok']:
+            print(f"✅ {variant['output_path']} ({variant['duration'] * 1000:.0f} ms)")
+        else:
+            print(f"❌ Template {variant['template']}: {variant['error']}", file=sys.stderr)
+    print(f"🖼️  Galerie: {result['index']}")
+    return 0 if all(variant['ok'] for variant in result['variants']) else 1
+
+
+def _run_import(generator: LinkedInCVGenerator, input_path: str, output_path: str) -> int:
+    """Convertit un export LinkedIn en profil JSON (fichier ou sortie standard)"""
+    if not os.path.exists(input_path):
+        print(f"❌ Le chemin '{input_path}' n'existe pas.", file=sys.stderr)
+        return 1
+    try:
+        profile = generator.read_linkedin_export(input_path)
+    except Exception as e:
+        print(f"❌ {input_path}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    if output_path == '-':
+        json.dump(profile.to_dict(), sys.stdout, ensure_ascii=False, indent=4)
+        sys.stdout.write('\n')
+    else:
+        with _atomic_output(output_path) as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=4)
+        print(f"✅ {output_path}")
+    return 0
+
+
+def _run_profile(generator: LinkedInCVGenerator, args) -> int:
+    """Profile le rendu d'un échantillon de profils et écrit les rapports (voir PipelineProfiler)"""
+    cv_dir = os.path.join(args.output, 'cv')
+    # Profils passés en dictionnaires, comme dans un lot: la normalisation (dates comprises) est profilée
+    try:
+        if args.jobs:
+            jobs = [(choix, load().to_dict(), os.path.join(cv_dir, f"{index}_{os.path.basename(output or f'cv_{choix}.html')}"))
+                    for index, (choix, load, output) in enumerate(_iter_batch_file(args.jobs))]
+        else:
+            profiles = [_read_profile_input(generator, path) for path in args.input]
+            jobs = [(choix, profile.to_dict(), os.path.join(cv_dir, f'cv_{profile.profile_id()}_{choix}.html'))
+                    for choix in args.template for profile in profiles]
+    except Exception as e:
+        print(f"❌ {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    os.makedirs(cv_dir, exist_ok=True)
+    if not args.fragment_cache:
+        # Sans quoi les rendus répétés d'un même profil ne mesurent que le cache
+        generator.fragment_cache = None
+    options = dict(stream=args.stream, fit=args.fit, minify=args.minify, styles=args.styles, fonts=args.fonts,
+                   photos=args.photos)
+    # Premier rendu hors profilage: compilation des templates, polices et photos mises en cache
+    for job in jobs:
+        generator.generate_cv(*job, **options)
+    profiler = PipelineProfiler(cpu=not args.no_cpu, memory=not args.no_memory, top=args.top)
+    generator.profiler = profiler
+    try:
+        for _ in range(args.repeat):
+            for job in jobs:
+                generator.generate_cv(*job, **options)
+    finally:
+        generator.profiler = None
+    profiler.write(args.output)
+    for choix, item in profiler.summary().items():
+        line = f"⏱️  Template {choix}: {item['calls']} rendu(s), {item['mean_ms']:.2f} ms par CV"
+        if 'stage_seconds' in item:
+            slowest = sorted(item['stage_seconds'].items(), key=lambda stage: -stage[1])[:3]
+            line += ' (' + ', '.join(f"{stage} {seconds / item['calls'] * 1000:.2f} ms"
+                                     for stage, seconds in slowest) + ')'
+        if 'peak_bytes' in item:
+            line += f", pic mémoire {item['peak_bytes'] / 1024:.0f} Kio"
+        print(line)
+    print(f"📊 Rapports écrits dans {args.output} (piles repliées *.folded, allocations_template_N.txt)")
+    return 0
+
+
+def _run_validate(input_path: str, template: Optional[str]) -> int:
+    """Vérifie un profil JSON sans rien rendre: code de sortie 1 en cas d'erreur"""
+    try:
+        if input_path == '-':
+            data = json.load(sys.stdin)
+        else:
+            with open(input_path, encoding='utf-8') as f:
+                data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ {input_path}: {e}", file=sys.stderr)
+        return 1
+    errors, warnings = validate_profile(data)
+    for message in errors:
+        print(f"❌ {message}")
+    for message in warnings:
+        print(f"⚠️  {message}")
+    if template and not errors:
+        profile = Profile.from_dict(data)
+        choix = choose_template(profile) if template == 'auto' else template
+        fit = estimate_page_fit(profile, choix)
+        used = max(fit['main_mm'], fit['sidebar_mm'])
+        if fit['fits']:
+            print(f"📄 Template {choix}: tient sur une page ({used:.0f}/{fit['available_mm']:.0f} mm)")
+        else:
+            print(f"⚠️  Template {choix}: dépasse la page de {fit['overflow_mm']:.0f} mm (--fit pour réduire)")
+    print(f"{'❌' if errors else '✅'} {input_path}: {len(errors)} erreur(s), {len(warnings)} avertissement(s)")
+    return 1 if errors else 0
+
+
+@contextmanager
+def _reserved_stdout() -> Iterator[IO]:
+    """
+    Réserve la sortie standard à un flux de résultats: renvoie ce flux et détourne
+    tout autre affichage vers stderr, y compris celui des workers (qui héritent
+    du descripteur 1)
+    """
+    sys.stdout.flush()
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        # Sortie standard sans descripteur (capturée): seul ce processus est détourné
+        from contextlib import redirect_stdout
+        results = sys.stdout
+        with redirect_stdout(sys.stderr):
+            yield results
+        return
+    saved = os.dup(fd)
+    results = os.fdopen(os.dup(fd), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), fd)
+    try:
+        yield results
+    finally:
+        results.close()
+        sys.stdout.flush()
+        os.dup2(saved, fd)
+        os.close(saved)
+
+
+def _run_stream(generator: LinkedInCVGenerator, args) -> int:
+    """Flux JSON Lines: un résultat écrit (et vidé) dès qu'un CV est terminé"""
+    if args.sink and args.photos == 'shared':
+        print("❌ --sink est incompatible avec --photos shared (fichiers requis)", file=sys.stderr)
+        return 2
+    if not args.sink:
+        os.makedirs(args.output_dir, exist_ok=True)
+    counts = {'ok': 0, 'failed': 0}
+    start = time.perf_counter()
+    with (open(args.input, encoding='utf-8') if args.input != '-' else nullcontext(sys.stdin)) as lines, \
+            (_atomic_output(args.results) if args.results != '-' else _reserved_stdout()) as results, \
+            (open_sink(args.sink, args.sink_batch_size) if args.sink else nullcontext()) as sink:
+        for result in generator.render_jsonl(lines, args.template, args.output_dir, ordered=args.ordered,
+                                             workers=args.workers, executor=args.executor,
+                                             max_in_flight=args.max_in_flight, sink=sink, fit=args.fit,
+                                             minify=args.minify, photos=args.photos):
+            counts['ok' if result['ok'] else 'failed'] += 1
+            results.write(json.dumps(result, ensure_ascii=False) + '\n')
+            # Écriture bloquante: un lecteur lent des résultats suspend les rendus et la lecture du flux
+            results.flush()
+    print(f"📦 {counts['ok']} CV généré(s), {counts['failed']} en erreur en {time.perf_counter() - start:.1f} s",
+          file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+
+def _run_build(generator: LinkedInCVGenerator, jobs_file: str, manifest_path: str, fit: bool = False) -> int:
+    """Build incrémental d'un fichier de jobs, avec sauvegarde du manifeste"""
+    manifest = BuildManifest(manifest_path)
+    counts = {'written': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    try:
+        for index, (choix, load, output_path) in enumerate(_iter_batch_file(jobs_file)):
+            try:
+                status = generator.build_cv(choix, load(), output_path, manifest, fit=fit)
+            except Exception as e:
+                status = 'failed'
+                print(f"❌ {output_path or f'[{index}]'}: {type(e).__name__}: {e}")
+            counts[status] += 1
+            if status == 'written':
+                print(f"✅ {output_path}")
+    finally:
+        manifest.save()
+    print(f"📦 {counts['written']} écrit(s), {counts['unchanged']} identique(s), "
+          f"{counts['skipped']} à jour, {counts['failed']} en erreur")
+    return 1 if counts['failed'] else 0
+
+
+def _run_ingest(generator: LinkedInCVGenerator, drop_dir: str, output_dir: str, workers: Optional[int],
+                executor: str, report_path: Optional[str], jobs_path: Optional[str], template: str) -> int:
+    """Import par lots d'un dossier d'exports, avec rapport JSON et fichier de jobs optionnel"""
+    index = IngestIndex(os.path.join(output_dir, '.ingest_index.json'))
+    counts = {'ingested': 0, 'duplicate': 0, 'failed': 0}
+    results = []
+    started_at = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+    try:
+        for result in generator.ingest_exports(drop_dir, output_dir, index, workers=workers, executor=executor):
+            counts[result['status']] += 1
+            results.append(result)
+            if result['status'] == 'ingested':
+                print(f"✅ {result['source']} -> {result['output_path']} ({result['duration'] * 1000:.1f} ms)")
+            elif result['status'] == 'duplicate':
+                print(f"⏭️  {result['source']}: déjà importé ({result['output_path']})")
+            else:
+                print(f"❌ {result['source']}: {result['error']}")
+    finally:
+        index.save()
+    duration = time.perf_counter() - start
+    results.sort(key=lambda result: result['index'])
+
+    report_path = report_path or os.path.join(output_dir, 'ingest_report.json')
+    with _atomic_output(report_path) as f:
+        json.dump({'drop_dir': os.path.abspath(drop_dir), 'started_at': started_at, 'duration': duration,
+                   'counts': counts, 'exports': results}, f, ensure_ascii=False, indent=2)
+    if jobs_path:
+        # Jobs prêts pour les commandes batch et build
+        with _atomic_output(jobs_path) as f:
+            for result in results:
+                if result['status'] == 'ingested':
+                    stem = os.path.splitext(os.path.basename(result['output_path']))[0]
+                    f.write(json.dumps({'template': template, 'input': result['output_path'],
+                                        'output': os.path.join(OUTPUTS, f"cv_{stem}_{template}.html")}) + '\n')
+
+    print(f"📦 {counts['ingested']} importé(s), {counts['duplicate']} doublon(s), "
+          f"{counts['failed']} en erreur en {duration:.1f} s - rapport: {report_path}")
+    return 1 if counts['failed'] else 0
+
+
+def _run_cli(argv: List[str]) -> int:
+    """Mode ligne de commande non interactif"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='linkedin_cv_generator', description="Générateur de CV LinkedIn")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render = subparsers.add_parser('render', help="Génère un CV à partir d'un profil JSON ou d'un export LinkedIn")
+    render.add_argument('-t', '--template', choices=['1', '2', '3', '4', 'auto'], default='1',
+                        help="Numéro du template, ou auto pour le premier où le profil tient sur une page")
+    render.add_argument('-i', '--input', required=True,
+                        help="Profil JSON, export LinkedIn (ZIP ou dossier), - pour l'entrée standard, "
+                             "ou store:ID pour un profil de la base")
+    render.add_argument('-o', '--output', default='-', help="Fichier HTML (.html.gz compressé), - pour la sortie standard")
+    render.add_argument('--fit', action='store_true', help="Réduit le profil pour tenir sur une page A4")
+    render.add_argument('--minify', action='store_true', help="Minifie le HTML et le CSS")
+    render.add_argument('--styles', choices=['inline', 'shared'], default='inline',
+                        help="Feuille de style dans le CV, ou partagée dans assets/css à côté du CV")
+    render.add_argument('--fonts', choices=['inline', 'shared'], default=None,
+                        help="Polices locales intégrées ou partagées (aucun accès réseau au rendu)")
+    render.add_argument('--photos', choices=['inline', 'shared'], default=None,
+                        help="Photo redimensionnée au cadre du template, intégrée ou écrite dans assets/photos")
+    render.add_argument('--manifest', default=None,
+                        help="Manifeste de build: le rendu est sauté si le CV est déjà à jour")
+    render.add_argument('--store', default=None,
+                        help=f"Base de profils où enregistrer le profil lu (défaut pour store:ID: {PROFILE_DB})")
+    render.add_argument('--template-dir', default=TEMPLATES)
+
+    gallery = subparsers.add_parser('gallery', help="Génère un profil avec chaque template et une page pour les comparer")
+    gallery.add_argument('-i', '--input', required=True,
+                         help="Profil JSON, export LinkedIn (ZIP ou dossier), - pour l'entrée standard, ou store:ID")
+    gallery.add_argument('-o', '--output', default=os.path.join(OUTPUTS, 'galerie'),
+                         help="Dossier des CV (cv_N.html) et de la galerie (index.html)")
+    gallery.add_argument('-t', '--template', nargs='+', choices=['1', '2', '3', '4'], default=['1', '2', '3', '4'])
+    gallery.add_argument('--workers', type=int, default=None, help="Nombre de threads (défaut: un par template)")
+    gallery.add_argument('--fit', action='store_true', help="Réduit le profil pour tenir sur une page A4")
+    gallery.add_argument('--minify', action='store_true')
+    gallery.add_argument('--styles', choices=['inline', 'shared'], default='inline')
+    gallery.add_argument('--fonts', choices=['inline', 'shared'], default=None)
+    gallery.add_argument('--photos', choices=['inline', 'shared'], default=None)
+    gallery.add_argument('--store', default=None, help="Base de profils où enregistrer le profil lu")
+    gallery.add_argument('--template-dir', default=TEMPLATES)
+
+    import_ = subparsers.add_parser('import', help="Convertit un export LinkedIn en profil JSON")
+    import_.add_argument('-i', '--input', required=True, help="Archive ZIP LinkedIn ou son dossier extrait")
+    import_.add_argument('-o', '--output', default='-', help="Profil JSON, - pour la sortie standard")
+    import_.add_argument('--store', default=None, help="Base de profils où enregistrer aussi le profil")
+
+    validate = subparsers.add_parser('validate', help="Vérifie un profil JSON (structure, dates, taille sur une page)")
+    validate.add_argument('-i', '--input', required=True, help="Profil JSON, ou - pour l'entrée standard")
+    validate.add_argument('-t', '--template', choices=['1', '2', '3', '4', 'auto'], default=None,
+                          help="Estime aussi si le profil tient sur une page A4 avec ce template")
+
+    batch = subparsers.add_parser('batch', help="Génère un lot de CV à partir d'un fichier JSON Lines")
+    batch.add_argument('jobs', help="Fichier JSON Lines: une ligne {template, input|data, output} par CV")
+    batch.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: nombre de CPU)")
+    batch.add_argument('--executor', choices=['process', 'thread'], default='process')
+    batch.add_argument('--unordered', action='store_true', help="Affiche les résultats au fil de l'eau")
+    batch.add_argument('--max-in-flight', type=int, default=None)
+    batch.add_argument('--stream', action='store_true', help="Écrit chaque CV au fil du rendu")
+    batch.add_argument('--fonts', choices=['inline', 'shared'], default=None,
+                       help="Polices locales intégrées ou partagées (aucun accès réseau au rendu)")
+    batch.add_argument('--photos', choices=['inline', 'shared'], default=None,
+                       help="Photos redimensionnées au cadre du template (traitées une fois, en cache)")
+    batch.add_argument('--pdf', choices=sorted(PDF_ENGINES), default=None,
+                       help="Exporte aussi chaque CV en PDF avec ce moteur")
+    batch.add_argument('--minify', action='store_true', help="Minifie le HTML et le CSS (une fois par template)")
+    batch.add_argument('--styles', choices=['inline', 'shared'], default='inline',
+                       help="Feuille de style dans chaque CV, ou partagée dans outputs/assets/css")
+    batch.add_argument('--sink', default=None, metavar='TYPE:CHEMIN',
+                       help="Écrit tous les CV dans une archive ou un magasin: zip:cvs.zip, tar:cvs.tar, store:DOSSIER")
+    batch.add_argument('--sink-batch-size', type=int, default=256, help="CV écrits (et synchronisés) par lot")
+    batch.add_argument('--fit', action='store_true',
+                       help="Réduit les profils trop longs pour tenir sur une page A4 (estimation sans navigateur)")
+    batch.add_argument('--template-dir', default=TEMPLATES)
+    _add_metrics_arguments(batch)
+
+    stream = subparsers.add_parser('stream', help="Génère un CV par profil d'un flux JSON Lines, résultats en JSON Lines")
+    stream.add_argument('-i', '--input', default='-', help="Flux JSON Lines, un profil par ligne (défaut: entrée standard)")
+    stream.add_argument('-t', '--template', choices=['1', '2', '3', '4', 'auto'], default='1')
+    stream.add_argument('-o', '--output-dir', default=OUTPUTS, help="Dossier des CV (cv_<profil>_<template>.html)")
+    stream.add_argument('--results', default='-', help="Résultats JSON Lines, un par profil (défaut: sortie standard)")
+    stream.add_argument('--ordered', action='store_true', help="Résultats dans l'ordre du flux (défaut: au fil de l'eau)")
+    stream.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: nombre de CPU)")
+    stream.add_argument('--executor', choices=['process', 'thread'], default='process')
+    stream.add_argument('--max-in-flight', type=int, default=None,
+                        help="Profils lus et non encore rapportés (défaut: 2 x workers)")
+    stream.add_argument('--fit', action='store_true', help="Réduit les profils trop longs pour tenir sur une page A4")
+    stream.add_argument('--minify', action='store_true', help="Minifie le HTML et le CSS")
+    stream.add_argument('--photos', choices=['inline', 'shared'], default=None)
+    stream.add_argument('--sink', default=None, metavar='TYPE:CHEMIN',
+                        help="Écrit les CV dans une archive ou un magasin: zip:cvs.zip, tar:cvs.tar, store:DOSSIER")
+    stream.add_argument('--sink-batch-size', type=int, default=256)
+    stream.add_argument('--template-dir', default=TEMPLATES)
+    _add_metrics_arguments(stream)
+
+    build = subparsers.add_parser('build', help="Génère un lot de CV en sautant ceux qui n'ont pas changé")
+    build.add_argument('jobs', help="Fichier JSON Lines: une ligne {template, input|data, output} par CV")
+    build.add_argument('--manifest', default=MANIFEST, help="Manifeste de build (défaut: outputs/.build_manifest.json)")
+    build.add_argument('--fit', action='store_true', help="Réduit les profils trop longs pour tenir sur une page A4")
+    build.add_argument('--template-dir', default=TEMPLATES)
+    _add_metrics_arguments(build)
+
+    ingest = subparsers.add_parser('ingest', help="Importe tous les exports LinkedIn d'un dossier de dépôt")
+    ingest.add_argument('drop_dir', help="Dossier contenant les exports (archives ZIP ou dossiers extraits)")
+    ingest.add_argument('--output-dir', default=os.path.join(DATA, 'ingested'),
+                        help="Dossier des profils JSON produits (défaut: data/ingested)")
+    ingest.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: nombre de CPU)")
+    ingest.add_argument('--executor', choices=['process', 'thread'], default='process')
+    ingest.add_argument('--report', default=None, help="Rapport JSON (défaut: <output-dir>/ingest_report.json)")
+    ingest.add_argument('--jobs', default=None, help="Écrit aussi un fichier de jobs pour batch/build")
+    ingest.add_argument('--template', choices=['1', '2', '3', '4'], default='1', help="Template des jobs écrits")
+    ingest.add_argument('--template-dir', default=TEMPLATES)
+    _add_metrics_arguments(ingest)
+
+    serve = subparsers.add_parser('serve', help="Démarre le service HTTP de génération de CV")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: nombre de CPU)")
+    serve.add_argument('--executor', choices=['process', 'thread'], default='process')
+    serve.add_argument('--cache-size', type=int, default=1024, help="Nombre de réponses en cache (0: désactivé)")
+    serve.add_argument('--minify', action='store_true', help="Sert des CV minifiés")
+    serve.add_argument('--template-dir', default=TEMPLATES)
+
+    watch = subparsers.add_parser('watch', help="Regénère les CV à chaque modification d'un template ou d'un JSON")
+    watch.add_argument('jobs', nargs='?', default=None,
+                       help="Fichier JSON Lines de jobs (défaut: chaque JSON de data/ avec les 4 templates)")
+    watch.add_argument('--manifest', default=MANIFEST)
+    watch.add_argument('--debounce', type=float, default=0.1, help="Regroupement des modifications, en secondes")
+    watch.add_argument('--template-dir', default=TEMPLATES)
+
+    pdf = subparsers.add_parser('pdf', help="Exporte des CV HTML en PDF A4")
+    pdf.add_argument('paths', nargs='+', help="Fichiers HTML ou dossiers les contenant")
+    pdf.add_argument('--engine', choices=sorted(PDF_ENGINES), default='weasyprint')
+    pdf.add_argument('--workers', type=int, default=None, help="Nombre de workers (défaut: nombre de CPU)")
+    pdf.add_argument('--timeout', type=float, default=60.0, help="Délai maximal par CV, en secondes")
+    pdf.add_argument('--batch-size', type=int, default=8, help="Nombre de CV envoyés d'un coup à un worker")
+
+    store = subparsers.add_parser('store', help="Base locale de profils: ajout en masse, recherche, lecture")
+    store.add_argument('--db', dest='store', default=PROFILE_DB, help="Fichier SQLite de la base")
+    store_commands = store.add_subparsers(dest='store_command', required=True)
+    store_add = store_commands.add_parser('add', help="Ajoute ou met à jour des profils en une transaction")
+    store_add.add_argument('paths', nargs='+',
+                           help="Profils JSON, fichiers JSON Lines, exports LinkedIn, ou - (JSON Lines sur l'entrée standard)")
+    store_search = store_commands.add_parser('search', help="Recherche plein texte (compétences, expériences...)")
+    store_search.add_argument('query', help="Mots cherchés, tous requis (kube* pour un préfixe)")
+    store_search.add_argument('--fields', nargs='+', choices=PROFILE_SEARCH_FIELDS, default=None)
+    store_search.add_argument('--limit', type=int, default=20)
+    store_show = store_commands.add_parser('show', help="Affiche le profil JSON d'un identifiant")
+    store_show.add_argument('id')
+
+    profile = subparsers.add_parser('profile', help="Profile le rendu (CPU et allocations par template)")
+    profile.add_argument('-i', '--input', nargs='+', default=[os.path.join(DATA, 'data.json')],
+                         help="Profils JSON, exports LinkedIn ou store:ID (défaut: data/data.json)")
+    profile.add_argument('--jobs', default=None, help="Rejoue un fichier de jobs JSON Lines (comme batch) à la place")
+    profile.add_argument('-t', '--template', nargs='+', choices=['1', '2', '3', '4', 'auto'],
+                         default=['1', '2', '3', '4'])
+    profile.add_argument('-n', '--repeat', type=int, default=20, help="Nombre de rendus profilés par CV")
+    profile.add_argument('-o', '--output', default=os.path.join(OUTPUTS, 'profile'), help="Dossier des rapports")
+    profile.add_argument('--top', type=int, default=20, help="Nombre de sites d'allocation par template")
+    profile.add_argument('--no-cpu', action='store_true', help="Sans profil CPU (cProfile)")
+    profile.add_argument('--no-memory', action='store_true', help="Sans relevé des allocations (tracemalloc)")
+    profile.add_argument('--fragment-cache', action='store_true',
+                         help="Garde le cache de fragments (désactivé: chaque rendu passe par tout le template)")
+    profile.add_argument('--stream', action='store_true', help="Rendu en streaming (generate au lieu de render)")
+    profile.add_argument('--fit', action='store_true')
+    profile.add_argument('--minify', action='store_true')
+    profile.add_argument('--styles', choices=['inline', 'shared'], default='inline')
+    profile.add_argument('--fonts', choices=['inline', 'shared'], default=None)
+    profile.add_argument('--photos', choices=['inline', 'shared'], default=None)
+    profile.add_argument('--template-dir', default=TEMPLATES)
+
+    compile_ = subparsers.add_parser('compile', help="Compile les templates à l'avance (templates/__pycache__)")
+    compile_.add_argument('--template-dir', default=TEMPLATES)
+
+    fetch = subparsers.add_parser('fetch-fonts', help="Télécharge les polices des templates dans assets/fonts")
+    fetch.add_argument('--fonts-dir', default=FONTS)
+    fetch.add_argument('--template-dir', default=TEMPLATES)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'validate':
+        return _run_validate(args.input, args.template)
+
+    if args.command == 'fetch-fonts':
+        for path in fetch_fonts(args.template_dir, args.fonts_dir):
+            print(f"✅ {path}")
+        return 0
+
+    if args.command == 'serve':
+        return _run_server(CVRenderServer(args.template_dir, args.host, args.port, workers=args.workers,
+                                          executor=args.executor, cache_size=args.cache_size,
+                                          minify=args.minify))
+
+    if args.command == 'pdf':
+        with PDFExporter(args.engine, workers=args.workers, timeout=args.timeout,
+                         batch_size=args.batch_size) as exporter:
+            return _run_pdf_export(exporter, _iter_pdf_jobs(args.paths))
+
+    if args.command in ('render', 'gallery') and args.input.startswith('store:') and not args.store:
+        args.store = PROFILE_DB
+    store_path = getattr(args, 'store', None)
+    metrics = InMemoryMetrics() if getattr(args, 'metrics', None) else None
+    generator = LinkedInCVGenerator(template_dir=getattr(args, 'template_dir', TEMPLATES), metrics=metrics,
+                                    store=ProfileStore(store_path) if store_path else None)
+    try:
+        return _run_generator_command(generator, args)
+    finally:
+        if generator.store is not None:
+            generator.store.close()
+        if metrics is not None:
+            _export_metrics(metrics, args.metrics, args.metrics_format)
+
+
+def _add_metrics_arguments(parser) -> None:
+    parser.add_argument('--metrics', default=None, metavar='FICHIER',
+                        help="Écrit les métriques du pipeline (compteurs, latences par étape) dans ce fichier")
+    parser.add_argument('--metrics-format', choices=sorted(METRICS_EXPORTERS), default=None,
+                        help="Format des métriques (défaut: json pour un fichier .json, prometheus sinon)")
+
+
+def _export_metrics(metrics: InMemoryMetrics, path: str, metrics_format: Optional[str]) -> None:
+    metrics_format = metrics_format or ('json' if path.endswith('.json') else 'prometheus')
+    METRICS_EXPORTERS[metrics_format](metrics, path)
+    print(f"📈 Métriques écrites dans {path}")
+
+
+def _run_generator_command(generator: LinkedInCVGenerator, args) -> int:
+    """
+    Commandes qui utilisent un générateur: render, gallery, import, store,
+    profile, compile, build, ingest, watch et batch
+    """
+    if args.command == 'compile':
+        results = generator.compile_templates()
+        for path, status in results:
+            print(f"✅ {path}" if status == 'compiled' else f"⏭️  {path}: à jour")
+        print(f"📦 {sum(status == 'compiled' for _, status in results)} template(s) compilé(s), "
+              f"{sum(status == 'fresh' for _, status in results)} à jour")
+        return 0
+    if args.command == 'render':
+        return _run_render(generator, args)
+    if args.command == 'gallery':
+        return _run_gallery(generator, args)
+    if args.command == 'import':
+        return _run_import(generator, args.input, args.output)
+    if args.command == 'store':
+        return _run_store(generator, args)
+    if args.command == 'profile':
+        return _run_profile(generator, args)
+    if args.command == 'stream':
+        return _run_stream(generator, args)
+    if args.command == 'build':
+        return _run_build(generator, args.jobs, args.manifest, args.fit)
+    if args.command == 'ingest':
+        return _run_ingest(generator, args.drop_dir, args.output_dir, args.workers, args.executor,
+                           args.report, args.jobs, args.template)
+    if args.command == 'watch':
+        if args.jobs:
+            with open(args.jobs, encoding='utf-8') as f:
+                jobs = [json.loads(line) for line in f if line.strip()]
+        else:
+            jobs = _default_watch_jobs()
+        watcher = CVWatcher(generator, jobs, BuildManifest(args.manifest), debounce=args.debounce)
+        watcher.rebuild(range(len(jobs)))
+        print(f"👀 Surveillance de {len(jobs)} CV (Ctrl+C pour arrêter)")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print("\n👋 Au revoir!")
+        return 0
+
+    if args.sink and (args.pdf or args.styles == 'shared' or args.fonts == 'shared' or args.photos == 'shared'):
+        print("❌ --sink est incompatible avec --pdf, --styles shared, --fonts shared et --photos shared "
+              "(fichiers requis)")
+        return 2
+    failures = 0
+    rendered = []
+    with (open_sink(args.sink, args.sink_batch_size) if args.sink else nullcontext()) as sink:
+        for result in generator.render_many(_iter_batch_file(args.jobs), workers=args.workers,
+                                            executor=args.executor, ordered=not args.unordered,
+                                            max_in_flight=args.max_in_flight, sink=sink, stream=args.stream,
+                                            fonts=args.fonts, fit=args.fit, minify=args.minify,
+                                            styles=args.styles, photos=args.photos):
+            if result['ok']:
+                print(f"✅ [{result['index']}] {result['output_path']} ({result['duration'] * 1000:.1f} ms)")
+                rendered.append(result['output_path'])
+            else:
+                failures += 1
+                print(f"❌ [{result['index']}] {result['output_path']}: {result['error']}")
+    if args.pdf:
+        with PDFExporter(args.pdf, workers=args.workers) as exporter:
+            failures += _run_pdf_export(exporter, _iter_pdf_jobs(rendered))
+    return 1 if failures else 0
+
+
+def main(argv: Optional[List[str]] = None):
     """Fonction principale avec menu interactif"""
-    generator = LinkedInCVGenerator(template_dir=TEMPLATES)
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return _run_cli(argv)
+
+    generator = LinkedInCVGenerator(template_dir=TEMPLATES, store=ProfileStore(PROFILE_DB))
     
     print("\n" + "="*70)
     print(" 🎨 GÉNÉRATEUR DE CV LINKEDIN - FORMAT A4")
@@ -399,10 +4737,8 @@ def main():
     print("   - Pour un CV rapide, utilisez l'option 4 (données de démonstration)")
 
     print("\nVous avez le choix du template.")
-    print("  1. Design épuré et moderne (par défaut)")
-    print("  2. Minimal brutaliste, typographie géométrique, noir/blanc/bleu électrique")
-    print("  3. Moderne premium, gradients subtils, vert émeraude/gris anthracite")
-    print("  4. Layout asymétrique, serif élégant, bordeaux/beige/or")
+    for choix, title in TEMPLATE_TITLES.items():
+        print(f"  {choix}. {title}{' (par défaut)' if choix == '1' else ''}")
 
     type_template = input("\nVotre choix (1-4): ").strip()
 
@@ -416,9 +4752,10 @@ def main():
     print("  2. Importer depuis export LinkedIn")
     print("  3. Charger un json")
     print("  4. Générer avec données de démonstration")
+    print("  5. Comparer les 4 templates à partir d'un json (galerie)")
     print("  0. Quitter")
     
-    choice = input("\nVotre choix (1-4): ").strip()
+    choice = input("\nVotre choix (1-5): ").strip()
     
     if choice == '1':
         # Saisie interactive
@@ -438,9 +4775,9 @@ def main():
         print("\nPour obtenir votre archive:")
         print("  1. LinkedIn > Paramètres > Confidentialité des données (lien : https://www.linkedin.com/mypreferences/d/download-my-data)")
         print("  2. 'Obtenir une copie de vos données'")
-        print("  3. Téléchargez et extrayez le ZIP")
+        print("  3. Téléchargez le ZIP (l'extraction est facultative)")
         print()
-        export_path = input("Chemin vers le dossier extrait: ").strip()
+        export_path = input("Chemin vers l'archive ZIP ou le dossier extrait: ").strip()
         
         if os.path.exists(export_path):
             data = generator.parse_linkedin_export(export_path)
@@ -448,14 +4785,13 @@ def main():
                 output_file = generator.generate_cv(type_template, data, os.path.join(OUTPUTS, f"cv_{type_template}.html"))
                 print(f"\n✅ CV généré avec succès: {output_file}")
         else:
-            print(f"❌ Le dossier '{export_path}' n'existe pas.")
+            print(f"❌ Le chemin '{export_path}' n'existe pas.")
     elif choice == '3':
         # loading
         print("\n📦 IMPORT de json en local")
         export_path = input("Chemin vers le dossier extrait: ").strip()
         if os.path.exists(export_path):
-            with open(export_path, encoding='utf-8') as json_data:
-                output_file = generator.generate_cv(type_template, json.load(json_data), os.path.join(OUTPUTS, f"cv_{type_template}.html"))
+            output_file = generator.generate_cv(type_template, generator.load_profile(export_path), os.path.join(OUTPUTS, f"cv_{type_template}.html"))
         print(f"✅ CV de démo généré: {output_file}")
         print("\n💡 Vous pouvez maintenant:")
         print("   - Ouvrir le CV et le modifier manuellement")
@@ -469,9 +4805,21 @@ def main():
         print("   - Ouvrir le CV et le modifier manuellement")
         print("   - Ou relancer avec l'option 1 pour vos vraies données")
     
+    elif choice == '5':
+        # Un seul chargement du profil pour les 4 templates
+        print("\n🖼️  GALERIE DES TEMPLATES")
+        export_path = input(f"Chemin vers le json (vide: {os.path.join(DATA, 'data.json')}): ").strip()
+        export_path = export_path or os.path.join(DATA, 'data.json')
+        if os.path.exists(export_path):
+            result = generator.generate_gallery(generator.load_profile(export_path), os.path.join(OUTPUTS, 'galerie'))
+            print(f"✅ Galerie générée: {result['index']}")
+            print("\n💡 Ouvrez-la dans un navigateur pour comparer les designs, puis cliquez sur un CV pour l'ouvrir.")
+        else:
+            print(f"❌ Le chemin '{export_path}' n'existe pas.")
+    
     else:
         print("\n👋 Au revoir!")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -140,3 +140,876 @@ def test_generate_interactive_simulated(monkeypatch, tmp_path):
     # render
     path = gen.generate_cv('1', data, out_file)
     assert os.path.exists(path)
+
+
+def test_photos_resized_and_cached_by_content_hash(tmp_path):
+    import base64
+    Image = pytest.importorskip('PIL.Image')
+    photo = tmp_path / 'photos' / 'moi.png'
+    photo.parent.mkdir()
+    Image.new('RGBA', (2400, 1600), (200, 30, 30, 255)).save(photo)
+    sample = {'personal_info': {'name': 'Photo User', 'photo': photo.as_uri()}}
+
+    gen = Generator(template_dir=TEMPLATES)
+    gen.photo_processor = mod.PhotoProcessor(cache_dir=str(tmp_path / 'cache'))
+    html = gen.generate_cv('1', sample, io.StringIO(), photos='inline').getvalue()
+    encoded = html.split('src="data:image/jpeg;base64,', 1)[1].split('"', 1)[0]
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as thumbnail:
+        assert thumbnail.size == (220, 220)
+    assert gen.photo_processor.misses == 1
+
+    # Autre processus, même contenu sous un autre nom: variante relue depuis le cache
+    copy = tmp_path / 'copie.png'
+    copy.write_bytes(photo.read_bytes())
+    other = Generator(template_dir=TEMPLATES)
+    other.photo_processor = mod.PhotoProcessor(cache_dir=str(tmp_path / 'cache'))
+    out = tmp_path / 'out' / 'cv.html'
+    out.parent.mkdir()
+    other.generate_cv('1', dict(sample, personal_info={'name': 'Copie', 'photo': str(copy)}), str(out),
+                      photos='shared')
+    assert (other.photo_processor.hits, other.photo_processor.misses) == (1, 0)
+    assert 'src="assets/photos/' in out.read_text(encoding='utf-8')
+    assert len(os.listdir(out.parent / 'assets' / 'photos')) == 1
+
+    # Chemin introuvable (ex: chemin Windows d'un autre poste): CV sans photo
+    html = gen.generate_cv('1', {'personal_info': {'name': 'X', 'photo': 'C:\\Users\\x\\Moi.jpg'}},
+                           io.StringIO(), photos='inline').getvalue()
+    assert '<img' not in html
+
+
+def test_render_many_reports_per_job_errors(tmp_path):
+    gen = Generator(template_dir=TEMPLATES)
+    sample = {'personal_info': {'name': 'Batch User'}, 'experiences': [], 'education': [], 'skills': [], 'hobbies': []}
+    jobs = [(str(i % 4 + 1), sample, os.path.join(tmp_path, f'cv_{i}.html')) for i in range(6)]
+    # template inexistant: le job échoue sans interrompre le lot
+    jobs.insert(2, ('9', sample, os.path.join(tmp_path, 'cv_bad.html')))
+    results = list(gen.render_many(jobs, workers=2, executor='thread', max_in_flight=3))
+    assert [r['index'] for r in results] == list(range(7))
+    assert not results[2]['ok'] and 'cv_template_9' in results[2]['error']
+    assert all(r['ok'] for i, r in enumerate(results) if i != 2)
+    assert os.path.exists(os.path.join(tmp_path, 'cv_5.html'))
+
+
+def test_render_jsonl_stream_with_backpressure(tmp_path, capsys):
+    read = []
+
+    def lines():
+        for i in range(40):
+            read.append(i)
+            yield 'pas du json\n' if i == 3 else json.dumps({'id': f'p{i}', 'personal_info': {'name': f'P {i}'}}) + '\n'
+
+    gen = Generator(template_dir=TEMPLATES)
+    results = gen.render_jsonl(lines(), '2', str(tmp_path), workers=2, executor='thread', max_in_flight=3)
+    for consumed, result in enumerate(results, start=1):
+        # Lecture bornée par les résultats consommés: mémoire constante, contre-pression
+        assert len(read) <= consumed + 3
+        if result['index'] == 3:
+            assert not result['ok'] and 'JSONDecodeError' in result['error'] and result['output_path'] is None
+        else:
+            assert result['ok'] and result['output_path'] == str(tmp_path / f"cv_p{result['index']}_2.html")
+            assert result['bytes'] == os.path.getsize(result['output_path'])
+    assert consumed == 40
+
+    stream = tmp_path / 'profils.jsonl'
+    stream.write_text('{"id": "ana", "personal_info": {"name": "Ana"}}\n\n[1, 2]\n', encoding='utf-8')
+    assert mod.main(['stream', '-i', str(stream), '-o', str(tmp_path / 'out'), '--executor', 'thread',
+                     '--ordered']) == 1
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(r['profile_id'], r['ok']) for r in records] == [('ana', True), (None, False)]
+
+
+def test_profile_store_bulk_upsert_search_and_render(tmp_path, capsys):
+    db = str(tmp_path / 'profiles.db')
+    profiles = [{'id': f'p{i}', 'personal_info': {'name': f'Personne {i}', 'headline': 'Ingénieur'},
+                 'skills': [{'name': 'Kubernetes' if i % 2 else 'Rust'}],
+                 'experiences': [{'title': 'Dev', 'company': 'ACME',
+                                  'description': 'Migration vers Élasticsearch' if i == 7 else 'Maintenance'}]}
+                for i in range(20)]
+    with mod.ProfileStore(db) as store:
+        assert store.put_many(profiles, batch_size=6) == 20 and len(store) == 20
+        # un profil inchangé n'est pas réécrit, un profil modifié l'est
+        profiles[3]['skills'] = [{'name': 'Haskell'}]
+        store._conn.execute("UPDATE profiles SET updated_at = 'avant'")
+        store.put_many(profiles)
+        assert dict(store._conn.execute("SELECT id, updated_at FROM profiles WHERE updated_at != 'avant'")).keys() == {'p3'}
+        assert [r['id'] for r in store.search('haskell')] == ['p3']
+        assert len(store.search('kube*', ['skills'], limit=50)) == 9
+        assert [r['id'] for r in store.search('elasticsearch', ['experiences'])] == ['p7']
+        assert store.search('elasticsearch', ['skills']) == []
+        assert store.get('p7').personal_info.name == 'Personne 7' and store.get('absent') is None
+
+        # les points d'entrée existants alimentent la base
+        gen = Generator(template_dir=TEMPLATES, store=store)
+        profile = gen.load_profile(os.path.join(ROOT, 'data', 'data.json'))
+        assert profile.profile_id() in store
+
+    out = tmp_path / 'cv.html'
+    assert mod.main(['render', '-i', f'store:{profile.profile_id()}', '--store', db, '-o', str(out)]) == 0
+    assert profile.personal_info.name in out.read_text(encoding='utf-8')
+    assert mod.main(['render', '-i', 'store:absent', '--store', db, '-o', str(out)]) == 1
+    capsys.readouterr()
+    assert mod.main(['store', '--db', db, 'search', 'haskell']) == 0
+    assert capsys.readouterr().out.startswith('p3\t')
+
+
+def test_pipeline_profiler_cpu_and_allocation_reports(tmp_path, capsys):
+    with open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    profiler = mod.PipelineProfiler(top=10)
+    gen = Generator(template_dir=TEMPLATES, profiler=profiler)
+    for _ in range(2):
+        gen.generate_cv('2', data, str(tmp_path / 'cv.html'))
+        gen.generate_cv('auto', data, str(tmp_path / 'auto.html'), stream=True)
+    paths = profiler.write(str(tmp_path / 'profile'))
+    assert {os.path.basename(p) for p in paths} >= {'cpu_template_2.folded', 'cpu_template_2.pstats',
+                                                     'allocations_template_2.txt', 'cpu_template_auto.folded',
+                                                     'profile_summary.json'}
+
+    summary = profiler.summary()
+    assert summary['2']['calls'] == 2 and summary['auto']['calls'] == 2
+    stages = summary['2']['stage_seconds']
+    assert stages['render'] > 0 and stages['normalize'] > 0 and stages['write'] > 0
+    assert summary['auto']['stage_seconds']['page_fit'] > 0
+    # Code et allocations du template ramenés à ses lignes (sections {% fragment %})
+    assert summary['2']['peak_bytes'] > 0
+    assert any(site['site'].startswith('cv_template_2.html:') for site in summary['2']['allocations'])
+    folded = (tmp_path / 'profile' / 'cpu_template_2.folded').read_text(encoding='utf-8').splitlines()
+    assert folded and all(line.rsplit(' ', 1)[1].isdigit() for line in folded)
+    assert any('(cv_template_2.html:' in line for line in folded)
+
+    assert mod.main(['profile', '-t', '1', '-n', '2', '--no-memory', '-o', str(tmp_path / 'cli')]) == 0
+    assert 'Template 1: 2 rendu(s)' in capsys.readouterr().out
+    assert (tmp_path / 'cli' / 'cpu_template_1.folded').exists()
+    assert not (tmp_path / 'cli' / 'allocations_template_1.txt').exists()
+
+
+def test_gallery_renders_all_templates_from_one_profile(tmp_path, monkeypatch, capsys):
+    with open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    data['personal_info']['name'] = 'Ana <Lopes>'
+    calls = []
+    from_dict = mod.Profile.from_dict.__func__
+    monkeypatch.setattr(mod.Profile, 'from_dict',
+                        classmethod(lambda cls, *args: calls.append(1) or from_dict(cls, *args)))
+
+    gen = Generator(template_dir=TEMPLATES)
+    result = gen.generate_gallery(data, str(tmp_path / 'galerie'), choices=['1', '2', '3', '4', '9'])
+    assert len(calls) == 1
+    assert [(v['template'], v['ok']) for v in result['variants']] == [
+        ('1', True), ('2', True), ('3', True), ('4', True), ('9', False)]
+    for choix in '1234':
+        reference = gen.generate_cv(choix, data, io.StringIO()).getvalue()
+        assert (tmp_path / 'galerie' / f'cv_{choix}.html').read_text(encoding='utf-8') == reference
+
+    index = (tmp_path / 'galerie' / 'index.html').read_text(encoding='utf-8')
+    assert all(f'<iframe src="cv_{choix}.html"' in index for choix in '1234')
+    assert 'Ana &lt;Lopes&gt;' in index and 'TemplateNotFound' in index
+
+    assert mod.main(['gallery', '-i', os.path.join(ROOT, 'data', 'data.json'), '-o', str(tmp_path / 'cli'),
+                     '-t', '2', '4', '--workers', '1']) == 0
+    assert sorted(os.listdir(tmp_path / 'cli')) == ['cv_2.html', 'cv_4.html', 'index.html']
+    assert 'Galerie' in capsys.readouterr().out
+
+
+def test_fragment_cache_rerenders_only_changed_sections(tmp_path):
+    gen = Generator(template_dir=TEMPLATES)
+    uncached = Generator(template_dir=TEMPLATES, fragment_cache_size=0)
+    with open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    out_file = os.path.join(tmp_path, 'cv.html')
+    ref_file = os.path.join(tmp_path, 'ref.html')
+    for choice in ['1', '2', '3', '4']:
+        gen.generate_cv(choice, data, out_file)
+    misses = gen.fragment_cache.misses
+    data['experiences'][1]['description'] = 'Nouvelle description'
+    for choice in ['1', '2', '3', '4']:
+        gen.generate_cv(choice, data, out_file)
+        uncached.generate_cv(choice, data, ref_file)
+        with open(out_file, encoding='utf-8') as a, open(ref_file, encoding='utf-8') as b:
+            assert a.read() == b.read()
+    # une seule expérience modifiée: un seul fragment re-rendu par template
+    assert gen.fragment_cache.misses == misses + 4
+
+
+def test_fragment_cache_lru_eviction():
+    cache = mod.FragmentCache(max_entries=2, max_bytes=10)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    assert cache.get('a') == 'xxxx'
+    cache.set('c', 'zz')
+    assert cache.get('b') is None
+    cache.set('d', 'wwwwwwww')
+    assert cache.get('a') is None
+    assert len(cache) == 2 and cache.size_bytes == 10
+
+
+def test_generate_cv_streaming_destinations(tmp_path, monkeypatch):
+    import gzip
+    import socket
+    gen = Generator(template_dir=TEMPLATES)
+    with open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8') as f:
+        data = json.load(f)
+    ref_file = os.path.join(tmp_path, 'ref.html')
+    gen.generate_cv('3', data, ref_file)
+    with open(ref_file, encoding='utf-8') as f:
+        reference = f.read()
+
+    gz_dir = tmp_path / 'gz'
+    gz_dir.mkdir()
+    gz_file = os.path.join(gz_dir, 'cv.html.gz')
+    # fichier complet (fin du flux gzip comprise) synchronisé sur disque avant le renommage
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'fsync', lambda fd: (events.append(('fsync', os.fstat(fd).st_size)), real_fsync(fd)))
+        patch.setattr(os, 'replace', lambda src, dst: (events.append(('replace', dst)), real_replace(src, dst)))
+        gen.generate_cv('3', data, gz_file, stream=True, buffer_size=512)
+    assert events == [('fsync', os.path.getsize(gz_file)), ('replace', gz_file)]
+    with gzip.open(gz_file, 'rt', encoding='utf-8') as f:
+        assert f.read() == reference
+    # renommage atomique: aucun fichier temporaire ne reste dans le dossier
+    assert os.listdir(gz_dir) == ['cv.html.gz']
+
+    buffer = io.StringIO()
+    gen.generate_cv('3', data, buffer, stream=True, buffer_size=1)
+    assert buffer.getvalue() == reference
+
+    left, right = socket.socketpair()
+    with left, right:
+        gen.generate_cv('3', data, left, stream=True)
+        left.shutdown(socket.SHUT_WR)
+        received = b''.join(iter(lambda: right.recv(65536), b''))
+    assert received.decode('utf-8') == reference
+
+
+EXPORT_CSVS = {
+    'Profile.csv': 'First Name,Last Name,Headline,Summary,Location,Email Address,Public Profile URL\n'
+                   'Jean,Dupont,Dev,Résumé,Paris,jd@example.com,https://www.linkedin.com/in/jdupont\n',
+    'Positions.csv': 'Company Name,Title,Description,Location,Started On,Finished On\n'
+                     'ACME,DevOps,"Faire, des choses",Paris,2020-01,\n'
+                     'Initech,Stagiaire,,Lyon,2018-06,2019-02\n',
+    'Education.csv': 'School Name,Start Date,End Date,Notes,Degree Name,Activities\n'
+                     'Université Savoie Mont Blanc,2015,2018,Informatique,DUT,\n',
+    'Skills.csv': 'Name\nPython\nDocker\n',
+}
+
+
+def write_export(export_dir):
+    os.makedirs(export_dir, exist_ok=True)
+    for name, content in EXPORT_CSVS.items():
+        with open(os.path.join(export_dir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return str(export_dir)
+
+
+def test_profile_serialization_stable_without_generated_date(monkeypatch):
+    sample = {'personal_info': {'name': 'Date User'}, 'skills': [{'name': 'Python', 'endorsements': 3}]}
+    first = mod.Profile.from_dict(sample)
+    assert 'generated_date' not in first.to_dict()
+
+    # le lendemain, le même profil garde le même hash de contenu
+    hashed = mod._content_hash(first)
+
+    class Tomorrow(mod.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return mod.datetime(2099, 1, 2)
+
+    monkeypatch.setattr(mod, 'datetime', Tomorrow)
+    second = mod.Profile.from_dict(sample)
+    assert mod._content_hash(second) == hashed
+    assert second.context()['generated_date'] == '02/01/2099'
+
+    # une date fournie par la source est conservée telle quelle
+    dated = mod.Profile.from_dict(dict(sample, generated_date='01/01/2030'))
+    assert dated.to_dict()['generated_date'] == '01/01/2030'
+    assert dated.context()['generated_date'] == '01/01/2030'
+
+
+def test_profile_date_parsing_formats():
+    parse = mod.parse_profile_date
+    assert parse('2020-03-15') == (2020, 3)
+    assert parse('2020-03') == (2020, 3)
+    assert parse('2020') == (2020, 0)
+    assert parse('03/2020') == (2020, 3)
+    assert parse('Mars 2020') == (2020, 3)
+    assert parse('Mar 2020') == (2020, 3)
+    assert parse('juil. 2019') == (2019, 7)
+    assert parse('Février 2021') == (2021, 2)
+    assert parse('') is None
+    assert parse('un jour') is None
+
+
+def test_profile_sorting_and_skill_ranking():
+    profile = mod.Profile.from_dict({
+        'experiences': [
+            {'title': 'Ancien', 'start_date': '2015-01', 'end_date': '2017-06'},
+            {'title': 'Actuel', 'start_date': '2021-02', 'end_date': "Aujourd'hui"},
+            {'title': 'Récent', 'start_date': '2017-09', 'end_date': 'Déc 2020'},
+        ],
+        'education': [
+            {'school': 'Lycée', 'start_date': '2008', 'end_date': '2011'},
+            {'school': 'Master', 'start_date': '2013', 'end_date': '2015'},
+            {'school': 'Licence', 'start_date': '2011', 'end_date': '2013'},
+        ],
+        'skills': [{'name': 'SQL', 'endorsements': 4}, 'Bash', {'name': 'Python', 'endorsements': 12}],
+    })
+    assert [exp.title for exp in profile.experiences] == ['Actuel', 'Récent', 'Ancien']
+    assert profile.experiences[0].end_date == 'Présent'
+    assert profile.experiences[1].end_date == 'Décembre 2020'
+    assert [edu.school for edu in profile.education] == ['Master', 'Licence', 'Lycée']
+    assert [skill.name for skill in profile.skills] == ['Python', 'SQL', 'Bash']
+
+
+def test_display_dates_memoized_per_locale():
+    mod.format_profile_date.cache_clear()
+    for _ in range(3):
+        assert mod.format_profile_date((2020, 3), 'fr') == 'Mars 2020'
+        assert mod.format_profile_date((2020, 3), 'en') == 'March 2020'
+    info = mod.format_profile_date.cache_info()
+    assert (info.misses, info.hits) == (2, 4)
+
+    english = mod.Profile.from_dict({'experiences': [{'title': 'Dev', 'start_date': '2019-05', 'end_date': 'present'}]},
+                                    locale='en')
+    assert (english.experiences[0].start_date, english.experiences[0].end_date) == ('May 2019', 'Present')
+
+
+def test_parse_linkedin_export_from_zip(tmp_path, monkeypatch):
+    import zipfile
+    gen = Generator(template_dir=TEMPLATES)
+    from_dir = gen.parse_linkedin_export(write_export(tmp_path / 'export'))
+    assert from_dir['personal_info']['name'] == 'Jean Dupont'
+    assert from_dir['experiences'][0]['start_date'] == 'Janvier 2020'
+    assert from_dir['experiences'][0]['is_current']
+    assert [s['name'] for s in from_dir['skills']] == ['Python', 'Docker']
+
+    zip_path = tmp_path / 'export.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name, content in EXPORT_CSVS.items():
+            archive.writestr(f'Basic_LinkedInDataExport/{name}', content)
+        archive.writestr('Basic_LinkedInDataExport/messages.csv', 'x' * 100000)
+    opened = []
+    real_open = zipfile.ZipFile.open
+
+    def tracking_open(self, name, *args, **kwargs):
+        opened.append(getattr(name, 'filename', name))
+        return real_open(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, 'open', tracking_open)
+    from_zip = gen.parse_linkedin_export(str(zip_path))
+    assert from_zip == from_dir
+    assert not any(name.endswith('messages.csv') for name in opened)
+
+
+def test_export_endorsements_counted_per_skill(tmp_path):
+    import zipfile
+    export_dir = write_export(tmp_path / 'export')
+    fingerprint = mod.export_fingerprint(export_dir)
+    rows = ['Endorsement Date,Skill Name,Endorser First Name,Endorser Last Name,Endorser Public Url,Endorsement Status']
+    rows += [f'2021/03/0{i % 9 + 1} 10:00:00 UTC,Docker,A,B{i},https://www.linkedin.com/in/b{i},ACCEPTED'
+             for i in range(3000)]
+    rows += [f'2021/03/01 10:00:00 UTC,{name},A,C,,{status}'
+             for name, status in [('python ', 'ACCEPTED'), ('Python', 'ACCEPTED'), ('Python', 'REJECTED'),
+                                  ('Rust', 'ACCEPTED')]]
+    rows += ['', 'ligne,incomplète']
+    with open(os.path.join(export_dir, 'Endorsement_Received_Info.csv'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(rows) + '\n')
+
+    gen = Generator(template_dir=TEMPLATES)
+    profile = gen.read_linkedin_export(export_dir)
+    # Classées par recommandations reçues; refusées et compétences absentes de Skills.csv ignorées
+    assert [(s.name, s.endorsements) for s in profile.skills] == [('Docker', 3000), ('Python', 2)]
+    assert mod.export_fingerprint(export_dir) != fingerprint
+
+    zip_path = tmp_path / 'export.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name in os.listdir(export_dir):
+            archive.write(os.path.join(export_dir, name), f'Basic_LinkedInDataExport/{name}')
+    assert gen.read_linkedin_export(str(zip_path)).skills == profile.skills
+
+
+def test_ingest_exports_dedups_and_reports_failures(tmp_path):
+    import zipfile
+    drop = tmp_path / 'drop'
+    write_export(drop / 'jean')
+    # Même contenu, déposé en ZIP: reconnu comme doublon
+    with zipfile.ZipFile(drop / 'jean_bis.zip', 'w') as archive:
+        for name, content in EXPORT_CSVS.items():
+            archive.writestr(f'Basic_LinkedInDataExport/{name}', content)
+    (drop / 'corrompu.zip').write_bytes(b'not a zip')
+    (drop / 'notes.txt').write_text('ignoré')
+    out = tmp_path / 'ingested'
+
+    assert mod.main(['ingest', str(drop), '--output-dir', str(out), '--executor', 'thread',
+                     '--workers', '1', '--jobs', str(tmp_path / 'jobs.jsonl')]) == 1
+    report = json.loads((out / 'ingest_report.json').read_text(encoding='utf-8'))
+    statuses = {os.path.basename(e['source']): e['status'] for e in report['exports']}
+    assert statuses == {'corrompu.zip': 'failed', 'jean': 'ingested', 'jean_bis.zip': 'duplicate'}
+    assert report['counts'] == {'ingested': 1, 'duplicate': 1, 'failed': 1}
+    assert 'BadZipFile' in next(e['error'] for e in report['exports'] if e['status'] == 'failed')
+    assert mod.Profile.load(str(out / 'jean.json'))['personal_info']['name'] == 'Jean Dupont'
+    job = json.loads((tmp_path / 'jobs.jsonl').read_text(encoding='utf-8'))
+    assert job['input'] == str(out / 'jean.json')
+
+    # Second passage: l'index évite de relire les exports déjà importés
+    gen = Generator(template_dir=TEMPLATES)
+    index = mod.IngestIndex(str(out / '.ingest_index.json'))
+    (drop / 'corrompu.zip').unlink()
+    results = list(gen.ingest_exports(str(drop), str(out), index, executor='thread'))
+    assert {r['status'] for r in results} == {'duplicate'}
+
+
+def test_cli_import_validate_render(tmp_path, capsys):
+    import subprocess
+    profile_path = tmp_path / 'profil.json'
+    assert mod.main(['import', '-i', write_export(tmp_path / 'export'), '-o', str(profile_path)]) == 0
+    assert mod.main(['validate', '-i', str(profile_path), '-t', 'auto']) == 0
+    assert 'tient sur une page' in capsys.readouterr().out
+
+    bad = tmp_path / 'bad.json'
+    bad.write_text(json.dumps({'personal_info': {}, 'skills': 'Python',
+                               'experiences': [{'title': 'Dev', 'start_date': 'bientôt'}]}), encoding='utf-8')
+    assert mod.main(['validate', '-i', str(bad)]) == 1
+    out = capsys.readouterr().out
+    assert 'personal_info.name' in out and 'skills: liste attendue' in out
+    assert "experiences[0].start_date: date illisible 'bientôt'" in out
+
+    assert mod.main(['render', '-i', str(profile_path), '-t', '3']) == 0
+    assert 'Jean Dupont' in capsys.readouterr().out
+    cv = tmp_path / 'cv.html'
+    manifest = str(tmp_path / 'manifest.json')
+    assert mod.main(['render', '-i', str(profile_path), '-o', str(cv), '--manifest', manifest]) == 0
+    assert 'Jean Dupont' in cv.read_text(encoding='utf-8')
+
+    # Aide, validation et CV à jour démarrent sans importer Jinja2
+    script = ("import sys, runpy; sys.argv = ['cv'] + sys.argv[1:]\n"
+              "try:\n    runpy.run_path(%r, run_name='__main__')\nexcept SystemExit:\n    pass\n"
+              "assert 'jinja2' not in sys.modules, sys.argv" % os.path.join(ROOT, 'linkedin_cv_generator.py'))
+    for args in (['--help'], ['validate', '-i', str(profile_path)],
+                 ['render', '-i', str(profile_path), '-o', str(cv), '--manifest', manifest]):
+        subprocess.run([sys.executable, '-c', script, *args], check=True, capture_output=True)
+
+
+def test_metrics_collected_from_workers_and_exported(tmp_path):
+    metrics = mod.InMemoryMetrics()
+    gen = Generator(template_dir=TEMPLATES, metrics=metrics)
+    data = json.load(open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8'))
+    jobs = [(choix, data, str(tmp_path / f'cv_{i}.html')) for i, choix in enumerate(['1', '2', '1'])]
+    results = list(gen.render_many(jobs, workers=1, executor='thread', stream=True))
+    assert all(r['ok'] and 'metrics' not in r for r in results)
+    gen.parse_linkedin_export(write_export(tmp_path / 'export'))
+
+    snapshot = metrics.snapshot()
+    counters = {(c['name'], tuple(c['labels'].items())): c['value'] for c in snapshot['counters']}
+    assert counters[('cvs_generated_total', (('template', '1'),))] == 2
+    assert counters[('template_cache_misses_total', (('template', '1'),))] == 1
+    assert counters[('template_cache_hits_total', (('template', '1'),))] == 1
+    assert counters[('bytes_written_total', ())] == sum(os.path.getsize(path) for _, _, path in jobs)
+    assert counters[('profiles_parsed_total', ())] == 1
+    stages = {h['labels'].get('stage') for h in snapshot['histograms'] if h['name'] == 'stage_seconds'}
+    assert {'parse_export', 'normalize', 'template_load', 'write'} <= stages
+
+    mod.write_prometheus(metrics, str(tmp_path / 'cv.prom'))
+    prom = (tmp_path / 'cv.prom').read_text()
+    assert 'cvgen_render_seconds_count{template="1"} 2' in prom
+    assert 'cvgen_render_seconds_bucket{template="1",le="+Inf"} 2' in prom
+    mod.write_metrics_json(metrics, str(tmp_path / 'cv.json'))
+    assert json.loads((tmp_path / 'cv.json').read_text()) == metrics.snapshot()
+
+
+def test_page_fit_trims_long_profiles(tmp_path):
+    data = json.load(open(os.path.join(ROOT, 'data', 'data.json'), encoding='utf-8'))
+    short = mod.Profile.from_dict(data)
+    assert mod.estimate_page_fit(short, mod.choose_template(short))['fits']
+    assert mod.fit_profile(short, mod.choose_template(short)) == (short, [])
+
+    long_data = dict(data, experiences=[dict(data['experiences'][0], title=f'Poste {i}', description='mot ' * 150,
+                                             start_date=f'{2020 - i}-01', end_date=f'{2021 - i}-01', is_current=False)
+                                        for i in range(10)])
+    long = mod.Profile.from_dict(long_data)
+    for choix in ['1', '2', '3', '4']:
+        estimate = mod.estimate_page_fit(long, choix)
+        assert not estimate['fits'] and estimate['overflow_mm'] > 0
+        trimmed, actions = mod.fit_profile(long, choix)
+        assert actions and mod.estimate_page_fit(trimmed, choix)['fits']
+        # Les expériences retirées sont les plus anciennes; le profil d'origine est intact
+        assert [e.title for e in trimmed.experiences] == [e.title for e in long.experiences][:len(trimmed.experiences)]
+        assert len(long.experiences) == 10 and long.experiences[0].description == 'mot ' * 150
+
+    for estimate in (mod.estimate_page_fit, mod.fit_profile):
+        with pytest.raises(ValueError, match="Template inconnu: '9'"):
+            estimate(long, '9')
+
+    gen = Generator(template_dir=TEMPLATES)
+    full = io.StringIO()
+    gen.generate_cv('1', long, full)
+    fitted = io.StringIO()
+    gen.generate_cv('auto', long, fitted, fit=True)
+    assert 'Poste 9' in full.getvalue() and 'Poste 9' not in fitted.getvalue()
+
+
+def test_minified_and_shared_stylesheet_outputs(tmp_path):
+    import re
+    gen = Generator(template_dir=TEMPLATES)
+    data = mod.Profile.load(os.path.join(ROOT, 'data', 'data.json'))
+
+    def visible_text(html):
+        html = re.sub(r'<style>.*?</style>', '', html, flags=re.S)
+        return ''.join(re.sub(r'<[^>]+>', ' ', html).split())
+
+    for choix in ['1', '2', '3', '4']:
+        full = open(gen.generate_cv(choix, data, str(tmp_path / f'cv_{choix}.html')), encoding='utf-8').read()
+        small = open(gen.generate_cv(choix, data, str(tmp_path / f'cv_{choix}.min.html'), minify=True),
+                     encoding='utf-8').read()
+        assert len(small) < len(full) * 0.6
+        assert visible_text(small) == visible_text(full)
+        assert '<!--' not in small and '\n' not in small
+
+        shared = [open(gen.generate_cv(choix, data, str(tmp_path / f'cv_{choix}_{i}.css.html'), styles='shared'),
+                       encoding='utf-8').read() for i in range(2)]
+        href = re.search(r'<link rel="stylesheet" href="(assets/css/cv_template_\d\.[0-9a-f]{16}\.css)">', shared[0])
+        assert href and href.group(1) in shared[1] and '<style>' not in shared[0]
+        assert len(shared[0]) < len(full) * 0.6
+        css = (tmp_path / href.group(1)).read_text(encoding='utf-8')
+        assert css.strip() == re.search(r'<style>(.*?)</style>', full, re.S).group(1).strip()
+    assert len(os.listdir(tmp_path / 'assets' / 'css')) == 4
+
+    with pytest.raises(ValueError):
+        gen.generate_cv('1', data, io.StringIO(), styles='shared')
+
+
+def test_output_sinks_archive_and_content_store(tmp_path):
+    import zipfile
+    gen = Generator(template_dir=TEMPLATES)
+    data = mod.Profile.load(os.path.join(ROOT, 'data', 'data.json'))
+    other = mod.Profile.from_dict(dict(data.to_dict(), id='candidat-2'))
+    jobs = [('1', data, None), ('2', data, None), ('1', other, None), ('1', data, None)]
+    reference = io.StringIO()
+    gen.generate_cv('1', data, reference)
+
+    store_dir = str(tmp_path / 'store')
+    with mod.ContentStore(store_dir, batch_size=2) as store:
+        results = list(gen.render_many(jobs, workers=2, executor='thread', sink=store))
+        assert all(r['ok'] for r in results)
+        assert results[0]['output_path'] == results[3]['output_path']
+        assert results[0]['output_path'].startswith(data.profile_id() + '/cv_template_1.')
+    # Rendu identique pour les deux profils avec le template 1 et pour le doublon: 2 objets distincts seulement
+    reopened = mod.ContentStore(store_dir)
+    assert len(reopened.objects) == 2 and reopened.deduplicated == 0
+    assert set(reopened.index) == {data.profile_id(), 'candidat-2'}
+    assert reopened.read(data.profile_id(), '1') == reference.getvalue()
+    assert reopened.read('candidat-2', '2') is None
+    reopened.close()
+
+    zip_path = str(tmp_path / 'cvs.zip')
+    for _ in range(2):
+        with mod.open_sink(f'zip:{zip_path}') as sink:
+            gen.generate_cv('1', data, sink)
+            gen.generate_cv('3', data, sink)
+    with zipfile.ZipFile(zip_path) as archive:
+        names = archive.namelist()
+        assert len(names) == 2
+        assert archive.read(names[0]).decode('utf-8') == reference.getvalue()
+    with open(zip_path + '.index.jsonl', encoding='utf-8') as f:
+        assert len(f.readlines()) == 4
+    with pytest.raises(ValueError):
+        mod.open_sink('rar:cvs.rar')
+
+
+def test_zip_sink_survives_kill_between_batches(tmp_path):
+    import subprocess
+    import zipfile
+    zip_path = str(tmp_path / 'cvs.zip')
+    with mod.ZipSink(zip_path) as sink:
+        sink.write('ancien', '1', '<html>run précédent</html>')
+    # Un lot de 2 CV écrit, le troisième en attente, puis arrêt brutal avant close()
+    script = (
+        "import os, signal, sys\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        "import linkedin_cv_generator as mod\n"
+        f"sink = mod.ZipSink({zip_path!r}, batch_size=2)\n"
+        "for i in range(3):\n"
+        "    sink.write(f'p{i}', '1', f'<html>{i}</html>')\n"
+        "os.kill(os.getpid(), signal.SIGKILL)\n"
+    )
+    assert subprocess.run([sys.executable, '-c', script]).returncode != 0
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        names = sorted(name.split('/')[0] for name in archive.namelist())
+    assert names == ['ancien', 'p0', 'p1']
+    with mod.ZipSink(zip_path) as sink:
+        assert set(sink.index) == {'ancien', 'p0', 'p1'}
+        sink.write('p2', '1', '<html>2</html>')
+    with zipfile.ZipFile(zip_path) as archive:
+        assert len(archive.namelist()) == 4
+
+
+def test_batch_and_build_report_bad_jobs_without_stopping(tmp_path, capsys):
+    sample = {'personal_info': {'name': 'Job User'}}
+    jobs = tmp_path / 'jobs.jsonl'
+    jobs.write_text('\n'.join([
+        json.dumps({'template': '1', 'data': sample, 'output': str(tmp_path / 'cv_0.html')}),
+        json.dumps({'template': '2', 'input': str(tmp_path / 'absent.json'), 'output': str(tmp_path / 'cv_1.html')}),
+        '{"template": "1", "data": ',
+        json.dumps({'template': '3', 'data': sample, 'output': str(tmp_path / 'cv_3.html')}),
+    ]), encoding='utf-8')
+
+    assert mod.main(['batch', str(jobs), '--executor', 'thread', '--workers', '2']) == 1
+    out = capsys.readouterr().out
+    assert 'FileNotFoundError' in out and 'JSONDecodeError' in out
+    assert (tmp_path / 'cv_0.html').exists() and (tmp_path / 'cv_3.html').exists()
+
+    os.remove(tmp_path / 'cv_3.html')
+    assert mod.main(['build', str(jobs), '--manifest', str(tmp_path / 'manifest.json')]) == 1
+    out = capsys.readouterr().out
+    assert '2 écrit(s)' in out and '2 en erreur' in out
+    assert (tmp_path / 'cv_3.html').exists()
+
+
+def test_build_cv_skips_unchanged_outputs(tmp_path):
+    import shutil
+    template_dir = tmp_path / 'templates'
+    shutil.copytree(TEMPLATES, template_dir)
+    gen = Generator(template_dir=str(template_dir))
+    manifest = mod.BuildManifest(str(tmp_path / 'manifest.json'))
+    sample = {'personal_info': {'name': 'Build User'}, 'experiences': [], 'education': [], 'skills': [], 'hobbies': []}
+    outputs = {choice: str(tmp_path / f'cv_{choice}.html') for choice in ['1', '2']}
+
+    assert [gen.build_cv(c, sample, p, manifest) for c, p in outputs.items()] == ['written', 'written']
+    manifest.save()
+    manifest = mod.BuildManifest(str(tmp_path / 'manifest.json'))
+    assert [gen.build_cv(c, sample, p, manifest) for c, p in outputs.items()] == ['skipped', 'skipped']
+
+    # données modifiées sans effet sur le rendu: le fichier n'est pas réécrit
+    sample['generated_date'] = '01/01/2030'
+    mtime = os.stat(outputs['1']).st_mtime_ns
+    assert gen.build_cv('1', sample, outputs['1'], manifest) == 'unchanged'
+    assert os.stat(outputs['1']).st_mtime_ns == mtime
+
+    # une modification du template 2 n'invalide que les CV qui l'utilisent
+    with open(template_dir / 'cv_template_2.html', 'a', encoding='utf-8') as f:
+        f.write('<!-- modifié -->')
+    os.utime(template_dir / 'cv_template_2.html', ns=(mtime + 10**9, mtime + 10**9))
+    assert gen.build_cv('1', sample, outputs['1'], manifest) == 'skipped'
+    assert gen.build_cv('2', sample, outputs['2'], manifest) == 'written'
+
+
+def test_precompiled_templates_and_stale_artifacts(tmp_path, monkeypatch):
+    import shutil
+    template_dir = tmp_path / 'templates'
+    shutil.copytree(TEMPLATES, template_dir, ignore=shutil.ignore_patterns('__pycache__'))
+    sample = {'personal_info': {'name': 'AOT User'}, 'skills': ['Python']}
+    results = Generator(template_dir=str(template_dir)).compile_templates(choices=['1', '2'])
+    assert len(results) == 8 and {status for _, status in results} == {'compiled'}
+    assert {status for _, status in Generator(template_dir=str(template_dir)).compile_templates(['1', '2'])} == {'fresh'}
+
+    # Un processus neuf charge le bytecode sans recompiler la source
+    compiled = []
+    real_compile = mod._jinja().Environment.compile
+    monkeypatch.setattr(mod._jinja().Environment, 'compile',
+                        lambda self, *args, **kwargs: compiled.append(args[1]) or real_compile(self, *args, **kwargs))
+    gen = Generator(template_dir=str(template_dir))
+    html = gen.generate_cv('1', sample, io.StringIO()).getvalue()
+    assert compiled == []
+    expected = Generator(template_dir=str(template_dir), bytecode_cache=False).generate_cv('1', sample,
+                                                                                      io.StringIO())
+    assert html == expected.getvalue()
+    # Bytecode compilé par le module importé, relu par le script lancé en __main__
+    import subprocess
+    profile_path = tmp_path / 'profil.json'
+    profile_path.write_text(json.dumps(sample), encoding='utf-8')
+    subprocess.run([sys.executable, os.path.join(ROOT, 'linkedin_cv_generator.py'), 'render', '-t', '1',
+                    '-i', str(profile_path), '-o', str(tmp_path / 'cv.html'), '--template-dir', str(template_dir)],
+                   check=True, capture_output=True)
+
+    # Source modifiée: l'artefact est périmé (hash), recompilé puis réécrit
+    with open(template_dir / 'cv_template_1.html', 'a', encoding='utf-8') as f:
+        f.write('<!-- modifié -->')
+    compiled.clear()
+    assert 'modifié' in Generator(template_dir=str(template_dir)).generate_cv('1', sample,
+                                                                             io.StringIO()).getvalue()
+    assert compiled == ['cv_template_1.html']
+    # Les autres variantes: src-shared est périmée, les minifiées (commentaire retiré) restent à jour
+    statuses = {os.path.basename(path): status
+                for path, status in Generator(template_dir=str(template_dir)).compile_templates(['1'])}
+    assert statuses == {'cv_template_1.html.src-inline.jinjac': 'fresh', 'cv_template_1.html.src-shared.jinjac': 'compiled',
+                        'cv_template_1.html.min-inline.jinjac': 'fresh', 'cv_template_1.html.min-shared.jinjac': 'fresh'}
+
+
+def make_test_font(path, family):
+    fontBuilder = pytest.importorskip('fontTools.fontBuilder')
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    glyphs = ['.notdef'] + [f'uni{ord(c):04X}' for c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ']
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0)); pen.lineTo((0, 500)); pen.lineTo((400, 500)); pen.closePath()
+    fb = fontBuilder.FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(glyphs)
+    fb.setupCharacterMap({int(g[3:], 16): g for g in glyphs[1:]})
+    fb.setupGlyf({g: pen.glyph() for g in glyphs})
+    fb.setupHorizontalMetrics({g: (500, 0) for g in glyphs})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({'familyName': family, 'styleName': 'Regular'})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.save(str(path))
+
+
+def test_generate_cv_with_local_fonts(tmp_path):
+    import base64
+    from fontTools.ttLib import TTFont
+    fonts_dir = tmp_path / 'fonts'
+    fonts_dir.mkdir()
+    make_test_font(fonts_dir / 'Crimson_Pro-400.ttf', 'Crimson Pro')
+    gen = Generator(template_dir=TEMPLATES)
+    gen.font_bundler = mod.FontBundler(str(fonts_dir))
+    sample = {'personal_info': {'name': 'ABC'}, 'experiences': [], 'education': [], 'skills': [], 'hobbies': []}
+
+    out_file = os.path.join(tmp_path, 'inline.html')
+    gen.generate_cv('1', sample, out_file, fonts='inline')
+    with open(out_file, encoding='utf-8') as f:
+        html = f.read()
+    assert 'fonts.googleapis.com' not in html
+    encoded = html.split("url(data:font/woff;base64,")[1].split(')')[0]
+    font = TTFont(io.BytesIO(base64.b64decode(encoded)))
+    # sous-ensemble: seules les majuscules présentes dans le template et le profil sont conservées
+    assert ord('A') in font.getBestCmap() and ord('Q') not in font.getBestCmap()
+
+    out_dir = tmp_path / 'shared'
+    out_dir.mkdir()
+    gen.generate_cv('1', sample, str(out_dir / 'cv.html'), fonts='shared')
+    with open(out_dir / 'cv.html', encoding='utf-8') as f:
+        assert '<link href="assets/fonts/cv_template_1.css" rel="stylesheet">' in f.read()
+    assert (out_dir / 'assets' / 'fonts' / 'Crimson_Pro-400.ttf').exists()
+
+
+class FakePDFEngine:
+    started = 0
+
+    def start(self):
+        FakePDFEngine.started += 1
+        self.pid = os.getpid()
+
+    def render(self, html_path, pdf_path):
+        import time
+        if 'slow' in html_path:
+            time.sleep(30)
+        if 'broken' in html_path:
+            raise ValueError('HTML invalide')
+        with open(pdf_path, 'w') as f:
+            f.write(f'%PDF-fake {self.pid}')
+
+    def close(self):
+        pass
+
+
+def test_pdf_exporter_persistent_workers_and_timeouts(tmp_path, monkeypatch):
+    monkeypatch.setitem(mod.PDF_ENGINES, 'fake', FakePDFEngine)
+    names = ['a', 'b', 'slow', 'c', 'broken', 'd', 'e']
+    jobs = [(str(tmp_path / f'{n}.html'), str(tmp_path / f'{n}.pdf')) for n in names]
+    with mod.PDFExporter('fake', workers=2, timeout=1.0, batch_size=3) as exporter:
+        results = {r['html_path']: r for r in exporter.export_many(jobs)}
+        assert len(results) == len(names)
+        assert 'Délai' in results[jobs[2][0]]['error']
+        assert 'HTML invalide' in results[jobs[4][0]]['error']
+        ok = [n for n in names if results[str(tmp_path / f'{n}.html')]['ok']]
+        assert ok == ['a', 'b', 'c', 'd', 'e']
+        # les workers sont réutilisés d'un job à l'autre: au plus 3 processus (2 + 1 redémarrage)
+        pids = {(tmp_path / f'{n}.pdf').read_text() for n in ok}
+        assert len(pids) <= 3
+        assert exporter.stats['timeouts'] == 1 and exporter.stats['ok'] == 5
+
+
+def test_render_server_over_loopback():
+    import asyncio
+
+    async def request(port, method, target, body=b'', headers=''):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+                     f'{headers}Connection: close\r\n\r\n'.encode() + body)
+        raw = await reader.read()
+        writer.close()
+        head, _, content = raw.partition(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        response_headers = dict(line.split(': ', 1) for line in lines[1:])
+        return int(lines[0].split()[1]), response_headers, content
+
+    async def scenario():
+        server = mod.CVRenderServer(TEMPLATES, port=0, workers=2, executor='thread')
+        _, port = await server.start()
+        try:
+            profile = json.dumps({'personal_info': {'name': 'Serveur Test'}, 'experiences': [],
+                                  'education': [], 'skills': [], 'hobbies': []}).encode()
+            status, headers, content = await request(port, 'POST', '/render?template=2', profile)
+            assert status == 200 and 'Serveur Test' in content.decode()
+            etag = headers['ETag']
+            status, _, content = await request(port, 'POST', '/render?template=2', profile,
+                                               f'If-None-Match: {etag}\r\n')
+            assert status == 304 and content == b''
+            status, headers, _ = await request(port, 'POST', '/render?template=2', profile)
+            assert status == 200 and headers['ETag'] == etag
+            assert server.cache.hits == 1
+            assert (await request(port, 'POST', '/render?template=1', profile))[1]['ETag'] != etag
+            assert (await request(port, 'POST', '/render?template=2', b'{oops'))[0] == 400
+            assert (await request(port, 'POST', '/render?template=9', profile))[0] == 404
+            assert (await request(port, 'GET', '/health'))[2] == b'ok'
+            for length in ('abc', '-5'):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(f'POST /render HTTP/1.1\r\nContent-Length: {length}\r\n\r\n'.encode())
+                assert (await reader.read()).startswith(b'HTTP/1.1 400 ')
+                writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_benchmark_suite_smoke(tmp_path):
+    bench_spec = importlib.util.spec_from_file_location('bench_generator', os.path.join(ROOT, 'benchmarks', 'bench_generator.py'))
+    bench = importlib.util.module_from_spec(bench_spec)
+    bench_spec.loader.exec_module(bench)
+    export_zip = bench.write_synthetic_export(str(tmp_path), experiences=5, education=2, skills=30, as_zip=True)
+    data = Generator(template_dir=TEMPLATES).parse_linkedin_export(export_zip)
+    assert len(data['experiences']) == 5 and len(data['skills']) == 30
+
+    report = bench.run_benchmarks(['mock'], repeat=1, batch_jobs=4, workers=1)
+    stages = {(entry['stage'], entry['template']) for entry in report['results']}
+    assert ('generate_cv', '4') in stages and ('render_many', None) in stages
+    assert json.loads(json.dumps(report)) == report
+    assert bench.compare(report, report) == []
+
+
+@pytest.mark.parametrize('backend', ['poll', 'watchdog'])
+def test_watch_rebuilds_only_affected_outputs(tmp_path, backend):
+    import queue
+    import shutil
+    import threading
+    if backend == 'watchdog':
+        pytest.importorskip('watchdog')
+    template_dir = tmp_path / 'templates'
+    shutil.copytree(TEMPLATES, template_dir)
+    data_file = tmp_path / 'profile.json'
+    data_file.write_text(json.dumps({'personal_info': {'name': 'Watch User'}, 'experiences': [],
+                                     'education': [], 'skills': [], 'hobbies': []}), encoding='utf-8')
+    jobs = [{'template': choice, 'input': str(data_file), 'output': str(tmp_path / f'cv_{choice}.html')}
+            for choice in ['1', '2']]
+    gen = Generator(template_dir=str(template_dir))
+    watcher = mod.CVWatcher(gen, jobs, mod.BuildManifest(str(tmp_path / 'manifest.json')), backend=backend)
+    assert watcher.rebuild(range(2)) == [(jobs[0]['output'], 'written'), (jobs[1]['output'], 'written')]
+
+    rebuilds = queue.Queue()
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop, rebuilds.put))
+    thread.start()
+    try:
+        import time
+        time.sleep(0.3)
+        with open(template_dir / 'cv_template_2.html', 'a', encoding='utf-8') as f:
+            f.write('<!-- modifié -->')
+        assert rebuilds.get(timeout=5) == [(jobs[1]['output'], 'written')]
+        data_file.write_text(data_file.read_text(encoding='utf-8').replace('Watch User', 'Nouveau Nom'),
+                             encoding='utf-8')
+        assert sorted(rebuilds.get(timeout=5)) == [(jobs[0]['output'], 'written'), (jobs[1]['output'], 'written')]
+    finally:
+        stop.set()
+        thread.join()
+    assert 'Nouveau Nom' in (tmp_path / 'cv_1.html').read_text(encoding='utf-8')